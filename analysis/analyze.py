@@ -1,54 +1,274 @@
+import contextlib
+import sqlite3
+import numpy as np
 import pandas as pd
 import plotly.express as px
+from storage.database import PRICE_CENTS_SQL, apply_dtypes, load_summary, load_top, price_cents, read_db
 
-def get_avg_price_by_rating(books_df):
+# The get_* functions below accept any of:
+#   - a DataFrame: computed with pandas,
+#   - a table name or sqlite3 connection: the aggregation runs as SQL and
+#     only the small result is read (a connection uses the default table),
+#   - None: read from the summary tables the database keeps up to date.
+# All three paths return identical frames. Average prices come from whole
+# cents (see storage.database.PRICE_CENTS_SQL), so they match exactly.
+
+PRICE_BINS = 20
+
+def _sql_source(source, default_table):
+    """
+    (connection context, table) when `source` asks for SQL pushdown, else
+    None. A table name borrows a pooled read connection (see read_db).
+    """
+    if isinstance(source, str):
+        return read_db(), source
+    if isinstance(source, sqlite3.Connection):
+        return contextlib.nullcontext(source), default_table
+    return None
+
+def _average_price(cents, count):
+    """Average price from a sum of whole cents; NaN when nothing was priced."""
+    return cents / count / 100 if count else float('nan')
+
+def _by_average_price(groups):
+    """
+    ['rating', 'price'] from per-rating 'price_cents' sums and 'price_n'
+    counts sorted by rating, most expensive first. Ratings whose prices are
+    all missing stay, with a NaN price, last.
+    """
+    groups = apply_dtypes(groups.astype({'price_cents': float}), "scraped_books")
+    groups['price'] = [_average_price(c, n) for c, n in zip(groups['price_cents'], groups['price_n'])]
+    return groups[['rating', 'price']].sort_values('price', ascending=False, kind='stable').reset_index(drop=True)
+
+def get_avg_price_by_rating(books_df=None):
     """
     Returns a DataFrame with average price per rating.
     """
+    sql = _sql_source(books_df, "scraped_books")
+    if sql:
+        connect, table = sql
+        with connect as conn:
+            groups = pd.read_sql_query(
+                f"SELECT rating, COUNT(price) AS price_n, TOTAL({PRICE_CENTS_SQL.format('price')}) AS price_cents "
+                f"FROM {table} WHERE rating IS NOT NULL GROUP BY rating ORDER BY rating",
+                conn,
+            )
+        return _by_average_price(groups) if not groups.empty else pd.DataFrame()
+        
+    if books_df is None:
+        stats = load_summary("book_rating_stats")
+        # Rating 0 is the group of books without a rating
+        stats = stats[stats['rating'] > 0].sort_values('rating') if not stats.empty else stats
+        return _by_average_price(stats) if not stats.empty else pd.DataFrame()
+        
     if books_df.empty:
         return pd.DataFrame()
     
-    return books_df.groupby('rating')['price'].mean().reset_index().sort_values('price', ascending=False)
+    prices = books_df[['rating']].assign(
+        price_n=books_df['price'].notna(), price_cents=price_cents(books_df['price'])
+    )
+    groups = prices.groupby('rating', observed=True)[['price_n', 'price_cents']].sum().reset_index()
+    return _by_average_price(groups) if not groups.empty else pd.DataFrame()
 
-def get_top_5_expensive_books(books_df):
+def get_top_5_expensive_books(books_df=None):
     """
-    Returns the top 5 highest priced items.
+    Returns the top 5 highest priced items (ties keep table order). Books
+    without a price are left out.
     """
+    sql = _sql_source(books_df, "scraped_books")
+    if sql:
+        connect, table = sql
+        with connect as conn:
+            top = pd.read_sql_query(
+                f"SELECT title, price, rating FROM {table} WHERE price IS NOT NULL ORDER BY price DESC, id LIMIT 5", conn
+            )
+        return apply_dtypes(top, "scraped_books") if not top.empty else pd.DataFrame()
+        
+    if books_df is None:
+        top = load_top("scraped_books", "price", 5, columns=['title', 'price', 'rating'])
+        return top[['title', 'price', 'rating']] if not top.empty else pd.DataFrame()
+        
     if books_df.empty:
         return pd.DataFrame()
         
-    return books_df.sort_values('price', ascending=False).head(5)[['title', 'price', 'rating']]
+    top = books_df.dropna(subset=['price']).sort_values('price', ascending=False, kind='stable').head(5)
+    return top[['title', 'price', 'rating']].reset_index(drop=True)
 
-def get_author_counts(quotes_df):
+def get_author_counts(quotes_df=None):
     """
-    Returns the count of quotes per author.
+    Returns the count of quotes per author (ties in order of first appearance).
     """
+    sql = _sql_source(quotes_df, "scraped_quotes")
+    if sql:
+        connect, table = sql
+        with connect as conn:
+            counts = pd.read_sql_query(
+                f"SELECT author, COUNT(*) AS count FROM {table} WHERE author IS NOT NULL "
+                f"GROUP BY author ORDER BY count DESC, MIN(id)",
+                conn,
+            )
+        return counts if not counts.empty else pd.DataFrame()
+        
+    if quotes_df is None:
+        stats = load_summary("quote_author_stats")
+        stats = stats[stats['missing'] == 0] if not stats.empty else stats
+        if stats.empty:
+            return pd.DataFrame()
+        stats = stats.rename(columns={'n': 'count'}).sort_values(['count', 'first_id'], ascending=[False, True])
+        return stats[['author', 'count']].reset_index(drop=True)
+        
     if quotes_df.empty:
         return pd.DataFrame()
         
-    return quotes_df['author'].value_counts().reset_index(name='count').rename(columns={'index': 'author'})
+    # Unsorted counts come in order of first appearance (for categoricals:
+    # category order, see apply_dtypes); a stable sort keeps it for ties
+    counts = quotes_df['author'].value_counts(sort=False)
+    counts = counts[counts > 0].sort_values(ascending=False, kind='stable')
+    counts.index = counts.index.astype(str)
+    return counts.reset_index(name='count').rename(columns={'index': 'author'})
+
+def _price_bins(counts, lo, width, bins):
+    """Equal-width bin table from {bin index: count}."""
+    edges = lo + width * np.arange(bins + 1)
+    return pd.DataFrame({
+        'bin_start': edges[:-1],
+        'bin_end': edges[1:],
+        'count': [int(counts.get(i, 0)) for i in range(bins)],
+    })
 
-def analyze_prices(books_df):
+def _bin_width(lo, hi, bins):
+    """(lo, width) of `bins` equal-width bins over [lo, hi], as floats."""
+    lo, hi = float(lo), float(hi)
+    return lo, (hi - lo) / bins if hi > lo else 1.0
+
+def get_price_histogram(books_df=None, bins=PRICE_BINS):
+    """
+    Returns the price histogram as a DataFrame with 'bin_start', 'bin_end'
+    and 'count': `bins` equal-width bins over [min, max] price, the last one
+    closed. Bin of a price = floor((price - min) / width), clamped to the last
+    bin; SQL and pandas evaluate the same expression.
+    None reads the default table with SQL.
     """
-    Generates a histogram of book prices.
+    if books_df is None:
+        books_df = "scraped_books"
+        
+    sql = _sql_source(books_df, "scraped_books")
+    if sql:
+        connect, table = sql
+        with connect as conn:
+            # Two scalar subqueries: each is one seek on the price index
+            lo, hi = conn.execute(
+                f"SELECT (SELECT MIN(price) FROM {table}), (SELECT MAX(price) FROM {table})"
+            ).fetchone()
+            if lo is None:
+                return pd.DataFrame()
+            lo, width = _bin_width(lo, hi, bins)
+            rows = conn.execute(
+                f"SELECT MIN(CAST((price - ?) / ? AS INTEGER), ?) AS bin, COUNT(*) FROM {table} "
+                f"WHERE price IS NOT NULL GROUP BY bin",
+                (lo, width, bins - 1),
+            ).fetchall()
+        return _price_bins(dict(rows), lo, width, bins)
+        
+    prices = books_df['price'].dropna() if 'price' in books_df.columns else pd.Series(dtype=float)
+    if prices.empty:
+        return pd.DataFrame()
+    lo, width = _bin_width(prices.min(), prices.max(), bins)
+    index = ((prices.astype(float) - lo) / width).astype(np.int64).clip(upper=bins - 1)
+    return _price_bins(index.value_counts().to_dict(), lo, width, bins)
+
+def get_book_kpis(books_df=None):
+    """
+    Returns the Books dashboard KPIs: {'count', 'avg_price', 'titles'}.
+    Titles are unique in the table, so their non-null count is the number
+    of distinct titles.
+    """
+    sql = _sql_source(books_df, "scraped_books")
+    if sql:
+        connect, table = sql
+        with connect as conn:
+            count, price_n, cents, titles = conn.execute(
+                f"SELECT COUNT(*), COUNT(price), TOTAL({PRICE_CENTS_SQL.format('price')}), COUNT(title) FROM {table}"
+            ).fetchone()
+        return {'count': count, 'avg_price': _average_price(cents, price_n), 'titles': titles}
+        
+    if books_df is None:
+        stats = load_summary("book_rating_stats")
+        if stats.empty:
+            return {'count': 0, 'avg_price': float('nan'), 'titles': 0}
+        return {
+            'count': int(stats['n'].sum()),
+            'avg_price': _average_price(int(stats['price_cents'].sum()), int(stats['price_n'].sum())),
+            'titles': int(stats['title_n'].sum()),
+        }
+        
+    prices = books_df['price'] if 'price' in books_df.columns else pd.Series(dtype=float)
+    return {
+        'count': len(books_df),
+        'avg_price': _average_price(int(price_cents(prices).sum()), int(prices.count())),
+        'titles': books_df['title'].nunique() if 'title' in books_df.columns else 0,
+    }
+
+def get_quote_kpis(quotes_df=None):
+    """
+    Returns the Quotes dashboard KPIs: {'count', 'authors'}.
+    """
+    sql = _sql_source(quotes_df, "scraped_quotes")
+    if sql:
+        connect, table = sql
+        with connect as conn:
+            count, authors = conn.execute(f"SELECT COUNT(*), COUNT(DISTINCT author) FROM {table}").fetchone()
+        return {'count': count, 'authors': authors}
+        
+    if quotes_df is None:
+        stats = load_summary("quote_author_stats")
+        if stats.empty:
+            return {'count': 0, 'authors': 0}
+        return {'count': int(stats['n'].sum()), 'authors': int((stats['missing'] == 0).sum())}
+        
+    return {
+        'count': len(quotes_df),
+        'authors': quotes_df['author'].nunique() if 'author' in quotes_df.columns else 0,
+    }
+
+def price_histogram_figure(hist, **kwargs):
+    """
+    Plotly bar chart of a get_price_histogram() table, drawn like a histogram.
+    Extra keyword arguments go to px.bar.
     Returns: Plotly Figure
     """
-    if books_df.empty:
+    hist = hist.assign(
+        price=(hist['bin_start'] + hist['bin_end']) / 2,
+        width=hist['bin_end'] - hist['bin_start'],
+    )
+    fig = px.bar(hist, x='price', y='count', hover_data=['bin_start', 'bin_end'], **kwargs)
+    fig.update_traces(width=hist['width'])
+    fig.update_layout(bargap=0)
+    return fig
+
+def analyze_prices(books_df=None):
+    """
+    Generates a histogram of book prices. Binning runs in SQL for a table
+    name, connection or None (see get_price_histogram).
+    Returns: Plotly Figure
+    """
+    hist = get_price_histogram(books_df)
+    if hist.empty:
         return None
         
-    fig = px.histogram(books_df, x="price", nbins=20, title="Price Frequency Coaster (GBP)")
+    fig = price_histogram_figure(hist, title="Price Frequency Coaster (GBP)")
     return fig
 
-def analyze_authors(quotes_df):
+def analyze_authors(quotes_df=None):
     """
     Generates a bar chart of top authors.
     Returns: Plotly Figure
     """
-    if quotes_df.empty:
+    top_authors = get_author_counts(quotes_df)
+    if top_authors.empty:
         return None
         
-    top_authors = get_author_counts(quotes_df).head(10)
-    fig = px.bar(top_authors, x='count', y='author', orientation='h', title="Most Quoted Authors")
+    fig = px.bar(top_authors.head(10), x='count', y='author', orientation='h', title="Most Quoted Authors")
     return fig
 
 def analyze_ratings_vs_price(books_df):
@@ -59,10 +279,7 @@ def analyze_ratings_vs_price(books_df):
     if books_df.empty:
         return None
         
-    # Ensure numeric
-    df = books_df.copy()
-    df['rating_num'] = pd.to_numeric(df['rating'], errors='coerce')
-    
-    fig = px.scatter(df, x="price", y="rating_num", title="Do expensive books have better ratings?",
-                     labels={"rating_num": "Star Rating (1-5)", "price": "Price (£)"})
+    # rating is already an integer column (see storage.database.DTYPES)
+    fig = px.scatter(books_df, x="price", y="rating", title="Do expensive books have better ratings?",
+                     labels={"rating": "Star Rating (1-5)", "price": "Price (£)"})
     return fig
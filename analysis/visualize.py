@@ -1,44 +1,136 @@
-import matplotlib.pyplot as plt
+import matplotlib
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.figure import Figure
 import seaborn as sns
+import pandas as pd
+import hashlib
 import io
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 
-def plot_price_distribution(books_df):
+# Rendered PNGs kept in memory, least recently used evicted first
+RENDER_CACHE_SIZE = 32
+
+_cache = OrderedDict()
+_cache_lock = threading.Lock()
+_pending = {}
+_executor = None
+
+def _fingerprint(data, *params):
+    """Content hash of the plotted data plus the plot parameters."""
+    digest = hashlib.sha1(repr(params).encode())
+    digest.update(pd.util.hash_pandas_object(data, index=False).values.tobytes())
+    return digest.hexdigest()
+
+def _cache_get(key):
+    with _cache_lock:
+        png = _cache.get(key)
+        if png is not None:
+            _cache.move_to_end(key)
+        return png
+
+def _cache_put(key, png):
+    with _cache_lock:
+        _cache[key] = png
+        _cache.move_to_end(key)
+        while len(_cache) > RENDER_CACHE_SIZE:
+            _cache.popitem(last=False)
+
+def clear_render_cache():
+    """Drop all cached report images."""
+    with _cache_lock:
+        _cache.clear()
+
+def _render(draw, figsize=(10, 6)):
+    """
+    Draw on a fresh Agg-backed Figure and return the PNG bytes.
+    Uses the object-oriented API instead of pyplot's global state, so it is
+    safe to run off the main thread.
+    """
+    fig = Figure(figsize=figsize)
+    FigureCanvasAgg(fig)
+    draw(fig.add_subplot())
+    buf = io.BytesIO()
+    fig.savefig(buf, format='png')
+    return buf.getvalue()
+
+def _cached_render(key, draw, background):
+    """
+    Return a BytesIO of the cached PNG for `key`, rendering it on a miss.
+    With background=True a miss starts the render on a worker thread and
+    returns None; a later call returns the image once it is ready.
+    """
+    global _executor
+    png = _cache_get(key)
+    if png is not None:
+        return io.BytesIO(png)
+    if not background:
+        png = _render(draw)
+        _cache_put(key, png)
+        return io.BytesIO(png)
+
+    with _cache_lock:
+        if key not in _pending:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="report-render")
+            _pending[key] = _executor.submit(_render_pending, key, draw)
+    return None
+
+def _render_pending(key, draw):
+    try:
+        _cache_put(key, _render(draw))
+    except Exception as e:
+        print(f"Error rendering report: {e}")
+    finally:
+        with _cache_lock:
+            _pending.pop(key, None)
+
+def is_rendering():
+    """True while background renders are queued or running."""
+    with _cache_lock:
+        return bool(_pending)
+
+def plot_price_distribution(books_df, bins=20, kde=True, background=False):
     """
     Generates a static histogram of prices using Matplotlib/Seaborn.
-    Returns: BytesIO object identifying the image.
+    Images are cached by data content and parameters.
+    Returns: BytesIO object identifying the image (None while a
+    background=True render is still running).
     """
     if books_df.empty:
         return None
-    
-    plt.figure(figsize=(10, 6))
-    sns.histplot(books_df['price'], bins=20, kde=True)
-    plt.title('Price Distribution')
-    plt.xlabel('Price (£)')
-    plt.ylabel('Count')
-    
-    buf = io.BytesIO()
-    plt.savefig(buf, format='png')
-    buf.seek(0)
-    plt.close()
-    return buf
 
-def plot_top_authors(quotes_df):
+    prices = books_df['price']
+
+    def draw(ax):
+        sns.histplot(prices, bins=bins, kde=kde, ax=ax)
+        ax.set_title('Price Distribution')
+        ax.set_xlabel('Price (£)')
+        ax.set_ylabel('Count')
+
+    key = _fingerprint(prices, 'price_distribution', bins, kde, matplotlib.__version__)
+    return _cached_render(key, draw, background)
+
+def plot_top_authors(quotes_df, top=10, background=False):
     """
     Generates a static bar chart of top authors.
-    Returns: BytesIO object identifying the image.
+    Images are cached by data content and parameters.
+    Returns: BytesIO object identifying the image (None while a
+    background=True render is still running).
     """
     if quotes_df.empty:
         return None
-        
-    top_authors = quotes_df['author'].value_counts().head(10)
-    
-    plt.figure(figsize=(10, 6))
-    sns.barplot(x=top_authors.values, y=top_authors.index)
-    plt.title('Top 10 Authors by Quote Count')
-    plt.xlabel('Number of Quotes')
-    
-    buf = io.BytesIO()
-    plt.savefig(buf, format='png')
-    buf.seek(0)
-    plt.close()
-    return buf
+
+    counts = quotes_df['author'].value_counts()
+    # Categorical columns also count categories with no rows left
+    top_authors = counts[counts > 0].head(top)
+    top_authors.index = top_authors.index.astype(object)
+
+    def draw(ax):
+        sns.barplot(x=top_authors.values, y=top_authors.index, ax=ax)
+        ax.set_title(f'Top {top} Authors by Quote Count')
+        ax.set_xlabel('Number of Quotes')
+
+    key = _fingerprint(top_authors.reset_index(), 'top_authors', top, matplotlib.__version__)
+    return _cached_render(key, draw, background)
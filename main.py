@@ -1,14 +1,19 @@
 import streamlit as st
 import pandas as pd
 import plotly.express as px
-from storage.database import init_db, save_data, load_data, clear_data, query_data, DB_NAME
-from scraper.parser import parse_books, parse_quotes, parse_jobs
-from scraper.cleaner import clean_books_df, clean_quotes_df, clean_jobs_df
+from storage.database import (
+    init_db, load_data, load_page, count_rows, clear_data, query_data, get_tag_counts,
+    export_file, available_export_formats, EXPORT_FORMATS, load_jobs, DB_NAME
+)
+from pipeline.runner import SOURCES, stage_summary, fetch_summary
+from pipeline.jobs import get_job_manager
+from monitoring.metrics import to_prometheus, REGISTRY
 from analysis.analyze import (
     analyze_prices, analyze_authors, analyze_ratings_vs_price,
-    get_avg_price_by_rating, get_top_5_expensive_books, get_author_counts
+    get_avg_price_by_rating, get_top_5_expensive_books, get_author_counts,
+    get_book_kpis, get_quote_kpis, get_price_histogram, price_histogram_figure
 )
-from analysis.visualize import plot_price_distribution, plot_top_authors
+from analysis.visualize import plot_price_distribution, plot_top_authors, is_rendering
 
 # --- PAGE CONFIGURATION ---
 st.set_page_config(
@@ -159,6 +164,9 @@ def get_custom_css(theme_name):
 
 # --- INITIALIZATION ---
 init_db()
+# Start the job worker with the app, so jobs left queued or running by a
+# previous server process resume without waiting for a new submission
+job_manager = get_job_manager()
 
 # --- SIDEBAR ---
 with st.sidebar:
@@ -251,6 +259,7 @@ with tabs[1]:
             st.caption("Single page scrape.")
             
         limit_items = st.number_input("Max Items Limit", min_value=10, max_value=500, value=20, step=10)
+        incremental = st.checkbox("Incremental crawl", help="Skip pages unchanged since the last run and stop after a few of them in a row.")
         
         run_btn = st.button("▶️ Start Extraction", type="primary")
 
@@ -258,51 +267,76 @@ with tabs[1]:
         st.subheader("Execution Log")
         log_container = st.container()
         
+        # Jobs run on background threads and report progress to SQLite, so
+        # they keep going across reruns and page reloads
         if run_btn:
-            with st.status("Initializing Pipeline...", expanded=True) as status:
-                st.write(f"🚀 **Starting Job:** {source_type} Scraper")
-                st.write(f"🔗 **Target:** `{target_url}`")
-                
-                try:
-                    if source_type == "Books":
-                        st.write("📥 Fetching raw HTML...")
-                        raw_books = parse_books(limit=limit_items, base_url=target_url)
-                        
-                        st.write(f"🧩 Parsed {len(raw_books)} items. Cleaning data...")
-                        clean_books = clean_books_df(raw_books)
-                        
-                        st.write("💾 Upserting to database...")
-                        save_data(clean_books, "scraped_books")
-                        st.session_state['active_dataset'] = "Books"
-                        
-                    elif source_type == "Quotes":
-                        st.write("📥 Fetching raw HTML...")
-                        raw_quotes = parse_quotes(limit=limit_items, base_url=target_url)
-                        
-                        st.write(f"🧩 Parsed {len(raw_quotes)} items. Cleaning data...")
-                        clean_quotes = clean_quotes_df(raw_quotes)
-                        
-                        st.write("💾 Upserting to database...")
-                        save_data(clean_quotes, "scraped_quotes")
-                        st.session_state['active_dataset'] = "Quotes"
+            job_id = job_manager.submit(
+                source_type.lower(), limit=int(limit_items), base_url=target_url, incremental=incremental
+            )
+            st.session_state['active_dataset'] = source_type
+            st.toast(f"Job #{job_id} queued: {source_type} scraper", icon="🚀")
+            
+        def show_jobs():
+            jobs = load_jobs(limit=5)
+            if not jobs:
+                st.caption("No jobs yet. Configure a source and start an extraction.")
+            for job in jobs:
+                label = SOURCES[job['source']]['label']
+                summary = (
+                    f"🧩 Parsed {job['items_parsed']} items · "
+                    f"💾 {job['inserted']} new, {job['updated']} updated, "
+                    f"{job['unchanged']} unchanged ({job['batches']} batches)"
+                )
+                st.markdown(f"**#{job['id']} {label}** · `{job['params'].get('base_url') or ''}` · {job['status']}")
+                if job['status'] == 'failed':
+                    st.error(f"Pipeline Failed: {job['error']}")
+                else:
+                    limit = job['params'].get('limit') or 1
+                    done = 1.0 if job['status'] == 'done' else min(job['items_parsed'] / limit, 1.0)
+                    st.progress(done, text=f"📄 {job['pages']} pages parsed, {job['pages_skipped']} unchanged skipped")
+                st.markdown(summary)
+            if not any(job['status'] in ('queued', 'running') for job in jobs) and st.session_state.get('jobs_active'):
+                # Last job just finished: refresh the whole page so other tabs see the new data
+                st.session_state['jobs_active'] = False
+                st.rerun(scope="app")
+            
+        st.session_state['jobs_active'] = run_btn or bool(load_jobs(statuses=("queued", "running"), limit=1))
+        with log_container:
+            # Poll while jobs are queued or running
+            st.fragment(show_jobs, run_every=1.0 if st.session_state['jobs_active'] else None)()
 
-                    elif source_type == "Jobs":
-                        st.write("📥 Fetching raw HTML...")
-                        raw_jobs = parse_jobs(limit=limit_items, base_url=target_url)
-                        
-                        st.write(f"🧩 Parsed {len(raw_jobs)} items. Cleaning data...")
-                        clean_jobs = clean_jobs_df(raw_jobs)
-                        
-                        st.write("💾 Upserting to database...")
-                        save_data(clean_jobs, "scraped_jobs")
-                        st.session_state['active_dataset'] = "Jobs"
-                    
-                    status.update(label="Pipeline Completed Successfully", state="complete", expanded=False)
-                    st.balloons()
-                    
-                except Exception as e:
-                    st.error(f"Pipeline Failed: {str(e)}")
-                    status.update(label="Pipeline Failed", state="error")
+    # Stage timings of the jobs run by this server process (monitoring.metrics)
+    def show_metrics():
+        st.subheader("Stage Metrics")
+        stages = stage_summary()
+        if stages.empty:
+            st.caption("No pipeline activity recorded yet.")
+            return
+        st.dataframe(
+            stages,
+            hide_index=True,
+            use_container_width=True,
+            column_config={
+                "seconds": st.column_config.NumberColumn("Seconds", format="%.2f"),
+                "mean_ms": st.column_config.NumberColumn("Mean (ms)", format="%.1f"),
+                "p95_ms": st.column_config.NumberColumn("p95 (ms)", format="%.1f"),
+                "calls_per_s": st.column_config.NumberColumn("Calls/s", format="%.1f"),
+                "units_per_s": st.column_config.NumberColumn("Units/s", format="%.1f"),
+            },
+        )
+        fetches = fetch_summary()
+        statuses = " · ".join(f"{status}: {n}" for status, n in fetches['statuses'].items()) or "none"
+        st.caption(
+            f"🌐 HTTP responses {statuses} · {fetches['retries']} retries · "
+            f"{fetches['failures']} failed URLs · {fetches['cache_hits']} cache hits"
+        )
+        m1, m2 = st.columns(2)
+        m1.download_button(
+            "⬇️ Prometheus metrics", to_prometheus(), "pipeline_metrics.prom", "text/plain", key="metrics_export"
+        )
+        m2.button("♻️ Reset metrics", on_click=REGISTRY.reset)
+
+    st.fragment(show_metrics, run_every=1.0 if st.session_state['jobs_active'] else None)()
 
 # --- TAB 3: DATA EXPLORER ---
 with tabs[2]:
@@ -317,26 +351,35 @@ with tabs[2]:
     default_idx = options.index(st.session_state.get('active_dataset', "Books")) if st.session_state.get('active_dataset') in options else 0
     dataset = st.selectbox("Select Collection", options, index=default_idx)
     
-    # Load Data
+    # Only the page being viewed is read (keyset pagination on id)
     if dataset == "Books":
-        df = load_data("scraped_books")
+        collection = "scraped_books"
         config = {
             "price": st.column_config.NumberColumn("Price (£)", format="£%.2f"),
             "rating": st.column_config.NumberColumn("Rating", format="%d ⭐"),
             "url": st.column_config.LinkColumn("Product Link")
         }
     elif dataset == "Quotes":
-        df = load_data("scraped_quotes")
+        collection = "scraped_quotes"
         config = {
             "tags": st.column_config.ListColumn("Tags")
         }
     else: # Jobs
-        df = load_data("scraped_jobs")
+        collection = "scraped_jobs"
         config = {
             "apply_link": st.column_config.LinkColumn("Apply Here")
         }
+    config["id"] = None # used as the page cursor, not displayed
 
-    if not df.empty:
+    total = count_rows(collection)
+    if total:
+        page_size = st.selectbox("Rows per page", [50, 100, 250, 500], index=1)
+        
+        # Stack of page start cursors (the last id before each visited page)
+        cursor_key = f"explorer_cursors_{collection}_{page_size}"
+        cursors = st.session_state.setdefault(cursor_key, [0])
+        df = load_page(collection, after_id=cursors[-1], limit=page_size)
+        
         st.dataframe(
             df, 
             use_container_width=True, 
@@ -344,12 +387,29 @@ with tabs[2]:
             hide_index=True
         )
         
-        st.download_button(
-            "📥 Export to CSV", 
-            df.to_csv(index=False).encode('utf-8'),
-            f"{dataset.lower()}_data.csv",
-            "text/csv"
-        )
+        page_no = len(cursors)
+        n_pages = max(1, -(-total // page_size))
+        c_prev, c_info, c_next = st.columns([1, 2, 1])
+        if c_prev.button("⬅️ Previous", disabled=page_no == 1, use_container_width=True):
+            cursors.pop()
+            st.rerun()
+        c_info.caption(f"Page {page_no} of {n_pages} · {total:,} rows")
+        if c_next.button("Next ➡️", disabled=len(df) < page_size or df.empty, use_container_width=True):
+            cursors.append(int(df['id'].iloc[-1]))
+            st.rerun()
+        
+        # The export is generated only when the download button is clicked,
+        # streamed from SQLite in chunks
+        c_fmt, c_dl = st.columns([1, 2])
+        export_fmt = c_fmt.selectbox("Export format", available_export_formats(), label_visibility="collapsed")
+        extension, mime = EXPORT_FORMATS[export_fmt]
+        with c_dl:
+            st.download_button(
+                f"📥 Export to {export_fmt.upper()}", 
+                lambda: export_file(collection, export_fmt),
+                f"{dataset.lower()}_data{extension}",
+                mime
+            )
     else:
         st.info(f"No data found for {dataset}. Run the orchestration pipeline first.")
 
@@ -393,6 +453,8 @@ with tabs[3]:
         if job_q: mongo_query["title"] = {"$regex": job_q, "$options": "i"}
         if company_q: mongo_query["company"] = {"$regex": company_q, "$options": "i"}
 
+    show_plan = st.checkbox("Show query plan", help="Display SQLite's EXPLAIN QUERY PLAN and timing for this filter.")
+    
     if st.button("Run Search Query", type="primary"):
         coll_map = {"Books": "scraped_books", "Quotes": "scraped_quotes", "Jobs": "scraped_jobs"}
         
@@ -404,6 +466,12 @@ with tabs[3]:
             st.dataframe(res, use_container_width=True)
         else:
             st.warning("No matches found matching your criteria.")
+            
+        if show_plan:
+            report = query_data(coll_map[search_dataset], mongo_query, limit=50, explain=True)
+            if isinstance(report, dict):
+                st.caption(f"⏱️ {report['elapsed_ms']:.2f} ms · {report['rows']} rows")
+                st.code("\n".join(report['plan']) + f"\n\n{report['sql']}", language="sql")
 
 # --- TAB 5: ANALYTICS ---
 with tabs[4]:
@@ -412,20 +480,19 @@ with tabs[4]:
     insight_ds = st.selectbox("Analyze Dataset", ["Books", "Quotes"], key="analytics_select")
     
     if insight_ds == "Books":
-        df_books = load_data("scraped_books")
-        if not df_books.empty and 'price' in df_books.columns:
+        # KPIs, top 5 and price by rating come from the summary tables
+        kpis = get_book_kpis()
+        if kpis['count']:
             # KPIS
             k1, k2, k3 = st.columns(3)
-            k1.metric("Total Inventory", len(df_books))
-            k2.metric("Average Price", f"£{df_books['price'].mean():.2f}")
-            k3.metric("Catalog Variety", f"{df_books['title'].nunique()} Titles")
+            k1.metric("Total Inventory", kpis['count'])
+            k2.metric("Average Price", f"£{kpis['avg_price']:.2f}")
+            k3.metric("Catalog Variety", f"{kpis['titles']} Titles")
             
             st.markdown("### 📊 Price Landscape")
-            # Interactive Plotly Chart
-            fig = px.histogram(
-                df_books, 
-                x="price", 
-                nbins=20, 
+            # Binned in SQL: only the 20 bin counts are read
+            fig = price_histogram_figure(
+                get_price_histogram(), 
                 title="Price Distribution",
                 color_discrete_sequence=[t_code['accent']],
                 template="plotly_dark" if theme_choice=="Dark" else "plotly_white"
@@ -436,24 +503,29 @@ with tabs[4]:
             c1, c2 = st.columns(2)
             with c1:
                 st.markdown("#### Top 5 Most Expensive")
-                st.table(get_top_5_expensive_books(df_books))
+                st.table(get_top_5_expensive_books())
             with c2:
                 st.markdown("#### Price by Rating")
-                avg_r = get_avg_price_by_rating(df_books)
+                avg_r = get_avg_price_by_rating()
                 st.bar_chart(avg_r.set_index('rating'), color=t_code['accent'])
         else:
             st.warning("No book analytics available. Please run the pipeline.")
 
     else: # Quotes
-        df_quotes = load_data("scraped_quotes")
-        if not df_quotes.empty:
+        kpis = get_quote_kpis()
+        if kpis['count']:
             k1, k2 = st.columns(2)
-            k1.metric("Total Quotes", len(df_quotes))
-            k2.metric("Unique Authors", df_quotes['author'].nunique())
+            k1.metric("Total Quotes", kpis['count'])
+            k2.metric("Unique Authors", kpis['authors'])
             
             st.markdown("### 🗣️ Author Dominance")
-            author_counts = get_author_counts(df_quotes)
+            author_counts = get_author_counts()
             st.bar_chart(author_counts.set_index('author').head(10), color=t_code['accent'])
+            
+            st.markdown("### 🏷️ Top Tags")
+            tag_counts = get_tag_counts(limit=10)
+            if not tag_counts.empty:
+                st.bar_chart(tag_counts.set_index('tag'), color=t_code['accent'])
         else:
             st.warning("No quote analytics available. Please run the pipeline.")
 
@@ -466,14 +538,18 @@ with tabs[5]:
     
     col_r1, col_r2 = st.columns(2)
     
+    # Reports are rendered off the script thread and cached by data content,
+    # so reruns never wait on matplotlib
     with col_r1:
         if rep_ds == "Books":
             df = load_data("scraped_books")
             if not df.empty and 'price' in df.columns:
-                buf = plot_price_distribution(df)
+                buf = plot_price_distribution(df, background=True)
                 if buf:
                     st.image(buf, caption="Price Distribution Histogeam", use_container_width=True)
                     st.download_button("⬇️ Download PNG", buf, "price_dist.png", "image/png")
+                else:
+                    st.info("⏳ Rendering report...")
             else:
                 st.warning("No data.")
                 
@@ -481,9 +557,14 @@ with tabs[5]:
         if rep_ds == "Quotes":
             df = load_data("scraped_quotes")
             if not df.empty:
-                buf = plot_top_authors(df)
+                buf = plot_top_authors(df, background=True)
                 if buf:
                     st.image(buf, caption="Top Authors Bar Chart", use_container_width=True)
                     st.download_button("⬇️ Download PNG", buf, "author_dist.png", "image/png")
+                else:
+                    st.info("⏳ Rendering report...")
             else:
                 st.warning("No data.")
+                
+    if is_rendering():
+        st.button("🔄 Refresh reports")
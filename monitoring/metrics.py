@@ -0,0 +1,242 @@
+import bisect
+import math
+import threading
+import time
+from contextlib import contextmanager
+
+# Histogram bucket upper bounds in seconds: per-page parse times (ms) up to slow fetches
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+# Content type of the text exposition format written by to_prometheus
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+def _escape(value, quote=True):
+    value = str(value).replace("\\", "\\\\").replace("\n", "\\n")
+    return value.replace('"', '\\"') if quote else value
+
+def _format_number(value):
+    if isinstance(value, float):
+        if math.isinf(value):
+            return "+Inf" if value > 0 else "-Inf"
+        return repr(value)
+    return str(value)
+
+def _format_labels(names, values, extra=()):
+    pairs = [*zip(names, values), *extra]
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in pairs) + "}"
+
+class Metric:
+    """
+    Base of Counter and Histogram: a named metric with one value per
+    combination of label values. Updates take a per-metric lock, so
+    instrumented code may run on any thread.
+
+    Args:
+        name (str): Prometheus metric name.
+        help (str): One-line description (# HELP).
+        labelnames (tuple): Label names; every update passes them as keywords.
+    """
+
+    kind = None
+
+    def __init__(self, name, help, labelnames=()):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def _key(self, labels):
+        return tuple(str(labels.get(name, "")) for name in self.labelnames)
+
+    def _matches(self, key, labels):
+        return all(key[self.labelnames.index(name)] == str(value) for name, value in labels.items())
+
+    def labelsets(self):
+        """The label values seen so far, as dicts."""
+        with self._lock:
+            keys = list(self._values)
+        return [dict(zip(self.labelnames, key)) for key in keys]
+
+    def reset(self):
+        with self._lock:
+            self._values.clear()
+
+class Counter(Metric):
+    """A monotonically increasing count (requests, bytes, rows...)."""
+
+    kind = "counter"
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def total(self, **labels):
+        """Sum over all label sets matching the given labels (all of them by default)."""
+        with self._lock:
+            return sum(value for key, value in self._values.items() if self._matches(key, labels))
+
+    def samples(self):
+        """[(labels dict, value)]"""
+        with self._lock:
+            items = list(self._values.items())
+        return [(dict(zip(self.labelnames, key)), value) for key, value in items]
+
+    def _exposition(self):
+        items = self.samples()
+        if not items and not self.labelnames:
+            items = [({}, 0)]
+        return [
+            f"{self.name}{_format_labels(self.labelnames, labels.values())} {_format_number(value)}"
+            for labels, value in items
+        ]
+
+class Histogram(Metric):
+    """
+    Distribution of observed values (durations) in cumulative buckets,
+    plus their count and sum.
+
+    Args:
+        buckets (tuple): Bucket upper bounds; +Inf is implied.
+    """
+
+    kind = "histogram"
+
+    def __init__(self, name, help, labelnames=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, help, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value, **labels):
+        key = self._key(labels)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                state = self._values[key] = [[0] * (len(self.buckets) + 1), 0, 0.0]
+            state[0][index] += 1
+            state[1] += 1
+            state[2] += value
+
+    @contextmanager
+    def time(self, **labels):
+        """Observe the wall time of the `with` block."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+    def stats(self, **labels):
+        """
+        (count, sum, bucket counts) over the label sets matching `labels`.
+        Bucket counts are per bucket (not cumulative), the last one is +Inf.
+        """
+        counts = [0] * (len(self.buckets) + 1)
+        count, total = 0, 0.0
+        with self._lock:
+            for key, (buckets, n, s) in self._values.items():
+                if self._matches(key, labels):
+                    counts = [a + b for a, b in zip(counts, buckets)]
+                    count += n
+                    total += s
+        return count, total, counts
+
+    def quantile(self, q, **labels):
+        """
+        Estimate the q-quantile from the buckets, interpolating linearly
+        inside the bucket (as PromQL's histogram_quantile). NaN when empty.
+        """
+        count, _, counts = self.stats(**labels)
+        if not count:
+            return float("nan")
+        rank = q * count
+        seen = 0
+        for i, n in enumerate(counts):
+            if seen + n >= rank and n:
+                if i == len(self.buckets):
+                    return self.buckets[-1]
+                lower = self.buckets[i - 1] if i else 0.0
+                return lower + (self.buckets[i] - lower) * (rank - seen) / n
+            seen += n
+        return self.buckets[-1]
+
+    def _exposition(self):
+        with self._lock:
+            items = [(key, list(state[0]), state[1], state[2]) for key, state in self._values.items()]
+        lines = []
+        for key, counts, count, total in items:
+            cumulative = 0
+            for bound, n in zip(self.buckets + (float("inf"),), counts):
+                cumulative += n
+                le = _format_labels(self.labelnames, key, [("le", _format_number(float(bound)))])
+                lines.append(f"{self.name}_bucket{le} {cumulative}")
+            labels = _format_labels(self.labelnames, key)
+            lines.append(f"{self.name}_sum{labels} {_format_number(total)}")
+            lines.append(f"{self.name}_count{labels} {count}")
+        return lines
+
+class MetricsRegistry:
+    """
+    In-process collection of metrics. Modules declare theirs once at import
+    (`FETCH_SECONDS = histogram(...)`); declaring an existing name again
+    returns the registered metric.
+    """
+
+    def __init__(self):
+        self._metrics = {}
+        self._lock = threading.Lock()
+
+    def _register(self, cls, name, help, labelnames, **kwargs):
+        with self._lock:
+            metric = self._metrics.get(name)
+            if metric is None:
+                metric = self._metrics[name] = cls(name, help, labelnames, **kwargs)
+            elif type(metric) is not cls or metric.labelnames != tuple(labelnames):
+                raise ValueError(f"Metric '{name}' is already registered as a {metric.kind} {metric.labelnames}")
+            return metric
+
+    def counter(self, name, help, labelnames=()):
+        return self._register(Counter, name, help, labelnames)
+
+    def histogram(self, name, help, labelnames=(), buckets=DEFAULT_BUCKETS):
+        return self._register(Histogram, name, help, labelnames, buckets=buckets)
+
+    def get(self, name):
+        with self._lock:
+            return self._metrics.get(name)
+
+    def metrics(self):
+        with self._lock:
+            return list(self._metrics.values())
+
+    def reset(self):
+        """Zero every metric (they stay registered)."""
+        for metric in self.metrics():
+            metric.reset()
+
+    def to_prometheus(self):
+        """All metrics in the Prometheus text exposition format (CONTENT_TYPE)."""
+        lines = []
+        for metric in sorted(self.metrics(), key=lambda m: m.name):
+            lines.append(f"# HELP {metric.name} {_escape(metric.help, quote=False)}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            lines.extend(metric._exposition())
+        return "\n".join(lines) + "\n"
+
+# The process-wide registry the pipeline modules report to
+REGISTRY = MetricsRegistry()
+
+def counter(name, help, labelnames=()):
+    """Declare (or get) a Counter in REGISTRY."""
+    return REGISTRY.counter(name, help, labelnames)
+
+def histogram(name, help, labelnames=(), buckets=DEFAULT_BUCKETS):
+    """Declare (or get) a Histogram in REGISTRY."""
+    return REGISTRY.histogram(name, help, labelnames, buckets)
+
+def to_prometheus():
+    """REGISTRY in the Prometheus text exposition format."""
+    return REGISTRY.to_prometheus()
@@ -0,0 +1,104 @@
+"""
+Headless pipeline runner: fetch -> parse -> clean -> store without the UI.
+
+    python -m pipeline books --limit 200
+    python -m pipeline quotes --limit 100 --backend lxml --rate 2
+    python -m pipeline jobs --db /data/pipeline.db
+    python -m pipeline books --limit 1000 --incremental   # hourly refresh
+    python -m pipeline quotes --metrics /var/lib/node_exporter/pipeline.prom
+"""
+import argparse
+import sys
+import time
+
+import storage.database as database
+from pipeline.crawl import DEFAULT_STOP_AFTER
+from monitoring.metrics import to_prometheus
+from pipeline.runner import SOURCES, run_pipeline, stage_summary
+from scraper.backends import available_backends, get_backend
+from scraper.fetcher import (
+    AsyncFetchEngine, Fetcher, HTTPCache,
+    DEFAULT_WINDOW, DEFAULT_PER_HOST, DEFAULT_RATE,
+)
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog="python -m pipeline", description="Run a scrape headless.")
+    parser.add_argument("source", choices=sorted(SOURCES), help="Data source to scrape.")
+    parser.add_argument("--limit", type=int, default=20, help="Maximum number of items (default: 20).")
+    parser.add_argument("--url", help="URL (template) to scrape instead of the source's demo site.")
+    parser.add_argument("--db", help=f"SQLite database file (default: {database.DB_PATH}).")
+    parser.add_argument("--batch-size", type=int, default=database.DEFAULT_BATCH_SIZE,
+                        help="Rows committed per transaction.")
+    parser.add_argument("--backend", choices=available_backends(),
+                        help="HTML parsing backend (default: fastest installed).")
+    parser.add_argument("--workers", type=int, default=0,
+                        help="Parse on this many worker processes (paginated sources).")
+    parser.add_argument("--chunksize", type=int, default=1, help="Pages per parse worker task.")
+    parser.add_argument("--window", type=int, default=DEFAULT_WINDOW, help="Pages fetched ahead.")
+    parser.add_argument("--per-host", type=int, default=DEFAULT_PER_HOST, help="Concurrent requests per host.")
+    parser.add_argument("--rate", type=float, default=DEFAULT_RATE, help="Requests per second.")
+    parser.add_argument("--no-cache", action="store_true", help="Bypass the on-disk HTTP cache.")
+    parser.add_argument("--incremental", action="store_true",
+                        help="Skip pages unchanged since the last run and stop early.")
+    parser.add_argument("--stop-after", type=int, default=DEFAULT_STOP_AFTER,
+                        help=f"Unchanged pages in a row that end an incremental run (default: {DEFAULT_STOP_AFTER}).")
+    parser.add_argument("--metrics", help="Write the run's metrics to this file (Prometheus text format).")
+    parser.add_argument("-q", "--quiet", action="store_true", help="Only print the final summary.")
+    return parser
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    if args.db:
+        database.DB_PATH = args.db
+    database.init_db()
+
+    fetcher = Fetcher(cache=None if args.no_cache else HTTPCache())
+    parser_kwargs = {"fetcher": fetcher, "backend": get_backend(args.backend)}
+    if args.source != "jobs":
+        parser_kwargs["engine"] = AsyncFetchEngine(
+            window=args.window, per_host=args.per_host, rate=args.rate, fetcher=fetcher
+        )
+
+    def show_progress(stats):
+        if not args.quiet:
+            print(f"  parsed {stats['items_parsed']} · {stats['inserted']} new, "
+                  f"{stats['updated']} updated, {stats['unchanged']} unchanged")
+
+    start = time.perf_counter()
+    try:
+        stats = run_pipeline(
+            args.source,
+            limit=args.limit,
+            base_url=args.url,
+            batch_size=args.batch_size,
+            on_progress=show_progress,
+            parse_workers=args.workers,
+            parse_chunksize=args.chunksize,
+            incremental=args.incremental,
+            stop_after=args.stop_after,
+            **parser_kwargs,
+        )
+    except Exception as e:
+        print(f"Pipeline failed: {e}", file=sys.stderr)
+        return 1
+    finally:
+        fetcher.close()
+
+    print(
+        f"{SOURCES[args.source]['label']}: {stats['items_parsed']} parsed, {stats['inserted']} new, "
+        f"{stats['updated']} updated, {stats['unchanged']} unchanged "
+        f"({stats['pages']} pages parsed, {stats['pages_skipped']} skipped, "
+        f"{stats['batches']} batches, {time.perf_counter() - start:.1f}s)"
+    )
+    if not args.quiet:
+        stages = stage_summary()
+        if not stages.empty:
+            seconds = stages.groupby("stage", sort=False)["seconds"].sum()
+            print("Time per stage: " + ", ".join(f"{stage} {s:.2f}s" for stage, s in seconds.items()))
+    if args.metrics:
+        with open(args.metrics, "w", encoding="utf-8") as f:
+            f.write(to_prometheus())
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
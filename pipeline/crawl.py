@@ -0,0 +1,65 @@
+import hashlib
+
+from storage.database import get_page_hash, get_high_water, save_page_hash
+
+# Consecutive unchanged pages after which an incremental crawl stops
+DEFAULT_STOP_AFTER = 3
+
+def content_hash(html):
+    """Stable fingerprint of a page's HTML."""
+    return hashlib.blake2b(html.encode('utf-8', 'surrogatepass'), digest_size=16).hexdigest()
+
+class CrawlState:
+    """
+    Page-level change detection for one URL template, backed by the
+    crawl_pages/crawl_sources tables.
+
+    The parsers call check() on every fetched page before extracting it:
+    pages whose HTML hash matches the stored one are skipped, and after
+    `stop_after` of them in a row the crawl is `exhausted`. commit() stores
+    a page's hash once its records have been saved, so a crash mid-run never
+    marks unsaved pages as seen. `high_water` is the last page that had
+    records, where a crawl that stopped early resumes to pick up pages
+    appended since the previous run.
+
+    Args:
+        collection_name (str): Table the crawled records are stored in.
+        base_url (str): URL template ('{}' is the page number).
+        stop_after (int): Consecutive unchanged pages before stopping.
+    """
+
+    def __init__(self, collection_name, base_url, stop_after=DEFAULT_STOP_AFTER):
+        self.collection_name = collection_name
+        self.base_url = base_url
+        self.stop_after = max(1, int(stop_after))
+        self.high_water = get_high_water(base_url)
+        self.unchanged_run = 0
+        self.pages_skipped = 0
+        self._pending = {}
+
+    def check(self, page, html):
+        """True if the page is new or changed and must be parsed."""
+        url = self.base_url.format(page)
+        digest = content_hash(html)
+        if get_page_hash(url) == digest:
+            self.unchanged_run += 1
+            self.pages_skipped += 1
+            return False
+        self.unchanged_run = 0
+        self._pending[page] = digest
+        return True
+
+    @property
+    def exhausted(self):
+        return self.unchanged_run >= self.stop_after
+
+    def restart(self):
+        """Reset the unchanged-page run (e.g. when jumping to high_water)."""
+        self.unchanged_run = 0
+
+    def commit(self, page):
+        """Store the hash of a checked page whose records are now saved."""
+        digest = self._pending.pop(page, None)
+        if digest is not None:
+            save_page_hash(self.collection_name, self.base_url, self.base_url.format(page), page, digest)
+            self.high_water = max(self.high_water, page)
@@ -0,0 +1,135 @@
+import os
+import socket
+import threading
+
+from pipeline.crawl import DEFAULT_STOP_AFTER
+from pipeline.runner import SOURCES, run_pipeline
+from storage.database import (
+    DEFAULT_BATCH_SIZE, enqueue_job, claim_job, update_job, finish_job, load_jobs, close_db,
+)
+
+# Scrapes that may run at the same time (one worker thread each)
+DEFAULT_JOB_WORKERS = 3
+# Seconds between queue checks when idle; picks up jobs queued by other processes
+POLL_INTERVAL = 2.0
+
+def _owner_alive(owner):
+    """False only when `owner` ('host:pid') is a dead process on this host."""
+    host, _, pid = (owner or "").rpartition(":")
+    if host != socket.gethostname() or not pid.isdigit():
+        return True
+    try:
+        os.kill(int(pid), 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+class JobManager:
+    """
+    Runs pipeline jobs on background worker threads.
+
+    Jobs live in the pipeline_jobs table: submit() queues one, idle workers
+    claim the oldest queued job and write progress (pages, items parsed,
+    rows written...) to its row after every committed batch. The queue and
+    the progress therefore outlive the Streamlit session that submitted the
+    job, and any process sharing the database can pick queued jobs up.
+    Jobs left running by a process that no longer exists are queued again
+    when the manager starts.
+
+    Args:
+        workers (int): Number of jobs run concurrently.
+        poll_interval (float): Idle seconds between queue checks.
+    """
+
+    def __init__(self, workers=DEFAULT_JOB_WORKERS, poll_interval=POLL_INTERVAL):
+        self.workers = max(1, int(workers))
+        self.poll_interval = poll_interval
+        self.owner = f"{socket.gethostname()}:{os.getpid()}"
+        self._wakeup = threading.Event()
+        self._stop = threading.Event()
+        self._threads = []
+
+    def start(self):
+        """Requeue orphaned jobs and start the worker threads."""
+        if self._threads:
+            return self
+        for job in load_jobs(statuses=("running",), limit=0):
+            if not _owner_alive(job["owner"]):
+                update_job(job["id"], status="queued", owner=None)
+        for i in range(self.workers):
+            thread = threading.Thread(target=self._work, name=f"pipeline-job-{i}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+        return self
+
+    def submit(self, source, limit=20, base_url=None, batch_size=DEFAULT_BATCH_SIZE,
+               parse_workers=0, parse_chunksize=1, incremental=False, stop_after=DEFAULT_STOP_AFTER):
+        """
+        Queue a run_pipeline job and return its id. Arguments are those of
+        run_pipeline (JSON-serializable ones only, as they are persisted).
+        """
+        if source not in SOURCES:
+            raise ValueError(f"Unknown source '{source}'")
+        job_id = enqueue_job(source, {
+            "limit": limit,
+            "base_url": base_url,
+            "batch_size": batch_size,
+            "parse_workers": parse_workers,
+            "parse_chunksize": parse_chunksize,
+            "incremental": incremental,
+            "stop_after": stop_after,
+        })
+        self._wakeup.set()
+        return job_id
+
+    def stop(self, timeout=None):
+        """Stop the workers once their current job is finished."""
+        self._stop.set()
+        self._wakeup.set()
+        for thread in self._threads:
+            thread.join(timeout)
+        self._threads = []
+        self._stop.clear()
+
+    def _work(self):
+        try:
+            while not self._stop.is_set():
+                try:
+                    job = claim_job(self.owner)
+                except Exception as e:
+                    print(f"Error claiming job: {e}")
+                    job = None
+                if job is None:
+                    self._wakeup.wait(self.poll_interval)
+                    self._wakeup.clear()
+                    continue
+                self._run(job)
+        finally:
+            close_db()
+
+    def _run(self, job):
+        job_id = job["id"]
+        try:
+            stats = run_pipeline(
+                job["source"],
+                on_progress=lambda stats: update_job(job_id, **stats),
+                **job["params"],
+            )
+            update_job(job_id, **stats)
+            finish_job(job_id, "done")
+        except Exception as e:
+            print(f"Job {job_id} failed: {e}")
+            finish_job(job_id, "failed", error=str(e))
+
+_manager = None
+_manager_lock = threading.Lock()
+
+def get_job_manager():
+    """Returns the process-wide JobManager, started on first use."""
+    global _manager
+    with _manager_lock:
+        if _manager is None:
+            _manager = JobManager().start()
+        return _manager
@@ -0,0 +1,173 @@
+import pandas as pd
+
+from scraper.fetcher import (
+    get_default_fetcher,
+    FETCH_SECONDS, FETCH_BYTES, FETCH_RESPONSES, FETCH_RETRIES, FETCH_FAILURES, FETCH_CACHE_HITS,
+)
+from scraper.parser import iter_books, iter_quotes, iter_jobs, PARSE_SECONDS, PARSE_ITEMS
+from scraper.cleaner import clean_books_df, clean_quotes_df, clean_jobs_df, CLEAN_SECONDS, CLEAN_ROWS
+from scraper.workers import ParsePool
+from pipeline.crawl import CrawlState, DEFAULT_STOP_AFTER
+from storage.database import save_stream, DEFAULT_BATCH_SIZE, STORE_SECONDS, STORE_ROWS
+
+# Everything the pipeline needs to know about a data source
+SOURCES = {
+    "books": {
+        "label": "Books",
+        "table": "scraped_books",
+        "parse": iter_books,
+        "clean": clean_books_df,
+        "default_url": "http://books.toscrape.com/catalogue/page-{}.html",
+    },
+    "quotes": {
+        "label": "Quotes",
+        "table": "scraped_quotes",
+        "parse": iter_quotes,
+        "clean": clean_quotes_df,
+        "default_url": "http://quotes.toscrape.com/page/{}/",
+    },
+    "jobs": {
+        "label": "Jobs",
+        "table": "scraped_jobs",
+        "parse": iter_jobs,
+        "clean": clean_jobs_df,
+        "default_url": "https://realpython.github.io/fake-jobs/",
+    },
+}
+
+def iter_clean_chunks(source, limit=20, base_url=None, **parser_kwargs):
+    """
+    Yields cleaned DataFrame chunks for a source as pages are parsed.
+    Extra keyword arguments (engine, fetcher, backend...) go to the parser.
+    """
+    spec = SOURCES[source]
+    chunks = spec["parse"](limit=limit, base_url=base_url or spec["default_url"], **parser_kwargs)
+    for chunk in chunks:
+        yield spec["clean"](chunk, inplace=True)
+
+def run_pipeline(source, limit=20, base_url=None, batch_size=DEFAULT_BATCH_SIZE, on_progress=None,
+                 parse_workers=0, parse_chunksize=1, incremental=False, stop_after=DEFAULT_STOP_AFTER,
+                 **parser_kwargs):
+    """
+    Runs fetch -> parse -> clean -> store for one source, one chunk at a time.
+    
+    Args:
+        source (str): Key of SOURCES ('books', 'quotes' or 'jobs').
+        limit (int): Maximum number of items to scrape.
+        base_url (str): URL (template) to scrape. Defaults to the source's demo site.
+        batch_size (int): Maximum rows committed per transaction.
+        on_progress (callable): Called with the stats dict after every batch.
+        parse_workers (int): Extract records on this many worker processes
+            (paginated sources only). 0 parses in the calling thread.
+        parse_chunksize (int): Pages handed to a parse worker per task.
+        incremental (bool): Skip pages whose content is unchanged since the
+            last run and stop after `stop_after` of them in a row (see
+            pipeline.crawl.CrawlState).
+        stop_after (int): Consecutive unchanged pages that end an incremental run.
+        
+    Returns:
+        dict: Totals with keys 'pages' (parsed chunks: one per listing page
+        for paginated sources), 'pages_skipped' (unchanged, not parsed),
+        'items_parsed', 'rows_written' (inserted + updated), 'inserted',
+        'updated', 'unchanged' and 'batches'.
+        
+    Raises:
+        Exception: Whatever made a batch fail to save. The run stops there
+        and the pages of that batch are not recorded in the crawl state.
+    """
+    spec = SOURCES[source]
+    stats = {"pages": 0, "pages_skipped": 0, "items_parsed": 0, "rows_written": 0,
+             "inserted": 0, "updated": 0, "unchanged": 0, "batches": 0}
+    
+    crawl = None
+    if incremental:
+        crawl = parser_kwargs["crawl"] = CrawlState(spec["table"], base_url or spec["default_url"], stop_after)
+        
+    def counted(chunks):
+        for chunk in chunks:
+            stats["pages"] += 1
+            stats["items_parsed"] += len(chunk)
+            if crawl:
+                stats["pages_skipped"] = crawl.pages_skipped
+            yield chunk
+            
+    pool = None
+    if parse_workers and source != "jobs":
+        # Workers build their own backend from its name
+        backend = getattr(parser_kwargs.get("backend"), "name", None)
+        pool = parser_kwargs["pool"] = ParsePool(workers=parse_workers, chunksize=parse_chunksize, backend=backend)
+        
+    try:
+        cleaned = counted(iter_clean_chunks(source, limit=limit, base_url=base_url, **parser_kwargs))
+        for counts in save_stream(cleaned, spec["table"], batch_size=batch_size):
+            for key in ("inserted", "updated", "unchanged"):
+                stats[key] += counts[key]
+            stats["rows_written"] += counts["inserted"] + counts["updated"]
+            stats["batches"] += 1
+            if on_progress:
+                on_progress(dict(stats))
+    finally:
+        if pool:
+            pool.close()
+        # The shared fetcher outlives the run; persist what it added to the HTTP cache
+        get_default_fetcher().flush()
+            
+    if crawl:
+        stats["pages_skipped"] = crawl.pages_skipped
+        if on_progress:
+            on_progress(dict(stats))
+
+    return stats
+
+# Per stage: timing histogram, its label, and the counter of units it processed
+STAGE_METRICS = {
+    "fetch": (FETCH_SECONDS, "host", FETCH_BYTES, "bytes"),
+    "parse": (PARSE_SECONDS, "parser", PARSE_ITEMS, "items"),
+    "clean": (CLEAN_SECONDS, "dataset", CLEAN_ROWS, "rows"),
+    "store": (STORE_SECONDS, "table", STORE_ROWS, "rows"),
+}
+
+def stage_summary():
+    """
+    Where the pipeline runs of this process spent their time, from the
+    monitoring.metrics registry. One row per stage and host/parser/
+    dataset/table with 'calls' (requests, pages, chunks, transactions),
+    'seconds' spent in them, 'mean_ms', 'p95_ms' (estimated from the
+    histogram buckets), 'units' processed ('unit' says which) and the
+    throughputs 'calls_per_s' and 'units_per_s'. Requests run
+    concurrently, so fetch seconds can add up to more than the wall time.
+    """
+    rows = []
+    for stage, (seconds, label, units, unit) in STAGE_METRICS.items():
+        for labels in seconds.labelsets():
+            name = labels[label]
+            calls, total, _ = seconds.stats(**{label: name})
+            done = units.total(**{label: name})
+            rows.append({
+                "stage": stage,
+                "name": name,
+                "calls": calls,
+                "seconds": total,
+                "mean_ms": 1000 * total / calls if calls else float("nan"),
+                "p95_ms": 1000 * seconds.quantile(0.95, **{label: name}),
+                "units": done,
+                "unit": unit,
+                "calls_per_s": calls / total if total else float("nan"),
+                "units_per_s": done / total if total else float("nan"),
+            })
+    return pd.DataFrame(rows)
+
+def fetch_summary():
+    """
+    HTTP outcomes of this process: {'statuses': {status: responses},
+    'retries', 'failures', 'cache_hits'}.
+    """
+    statuses = {}
+    for labels, n in FETCH_RESPONSES.samples():
+        statuses[labels["status"]] = statuses.get(labels["status"], 0) + n
+    return {
+        "statuses": dict(sorted(statuses.items())),
+        "retries": FETCH_RETRIES.total(),
+        "failures": FETCH_FAILURES.total(),
+        "cache_hits": FETCH_CACHE_HITS.total(),
+    }
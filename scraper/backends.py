@@ -0,0 +1,312 @@
+from bs4 import BeautifulSoup
+
+try:
+    from lxml import etree, html as lxml_html
+except ImportError:  # pragma: no cover - optional dependency
+    etree = None
+
+try:
+    from selectolax.lexbor import LexborHTMLParser as HTMLParser
+except ImportError:  # pragma: no cover - optional dependency
+    HTMLParser = None
+
+# Field order of the record tuples every backend returns
+BOOK_FIELDS = ('title', 'price', 'rating', 'availability')
+QUOTE_FIELDS = ('text', 'author', 'tags')
+JOB_FIELDS = ('title', 'company', 'location', 'date_posted')
+
+RATING_MAP = {'One': '1', 'Two': '2', 'Three': '3', 'Four': '4', 'Five': '5'}
+
+
+def _rating_from_classes(classes):
+    for cls in classes:
+        if cls in RATING_MAP:
+            return RATING_MAP[cls]
+    return "Unknown"
+
+
+class SoupBackend:
+    """
+    Pure-Python backend: BeautifulSoup with the stdlib html.parser.
+    Always available and used as the reference for the faster backends.
+
+    Every extract_* method returns None when the page has no record
+    containers at all (end of pagination), otherwise a list of tuples in
+    the matching *_FIELDS order.
+    """
+
+    name = "html.parser"
+
+    def extract_books(self, html):
+        soup = BeautifulSoup(html, 'html.parser')
+        articles = soup.find_all('article', class_='product_pod')
+        if not articles:
+            return None
+
+        records = []
+        for article in articles:
+            try:
+                title = article.h3.a['title']
+                price = article.find('p', class_='price_color').text
+                rating = _rating_from_classes(article.find('p', class_='star-rating')['class'])
+                availability = article.find('p', class_='instock availability').text.strip()
+                records.append((title, price, rating, availability))
+            except (AttributeError, KeyError, TypeError):
+                continue
+        return records
+
+    def extract_quotes(self, html):
+        soup = BeautifulSoup(html, 'html.parser')
+        quotes = soup.find_all('div', class_='quote')
+        if not quotes:
+            return None
+
+        records = []
+        for quote in quotes:
+            try:
+                text = quote.find('span', class_='text').text
+                author = quote.find('small', class_='author').text
+                tags_container = quote.find('div', class_='tags')
+                tags = [tag.text for tag in tags_container.find_all('a', class_='tag')]
+                records.append((text, author, ", ".join(tags)))
+            except AttributeError:
+                continue
+        return records
+
+    def extract_jobs(self, html):
+        soup = BeautifulSoup(html, 'html.parser')
+        cards = soup.find_all('div', class_='card')
+        if not cards:
+            return None
+
+        records = []
+        for card in cards:
+            try:
+                title = card.find('h2', class_='title').text.strip()
+                company = card.find('h3', class_='company').text.strip()
+                location = card.find('p', class_='location').text.strip()
+                date_posted = card.find('time').text.strip()
+                records.append((title, company, location, date_posted))
+            except AttributeError:
+                continue
+        return records
+
+
+def _has_class(cls):
+    return f"contains(concat(' ', normalize-space(@class), ' '), ' {cls} ')"
+
+
+class LxmlBackend:
+    """
+    libxml2-backed backend with XPath expressions compiled once per process.
+    """
+
+    name = "lxml"
+
+    if etree is not None:
+        _books = etree.XPath(f"//article[{_has_class('product_pod')}]")
+        _book_title = etree.XPath("(.//h3)[1]/descendant::a[1]/@title")
+        _book_price_tag = etree.XPath(f"(.//p[{_has_class('price_color')}])[1]")
+        _book_rating = etree.XPath(f"(.//p[{_has_class('star-rating')}])[1]/@class")
+        _book_stock = etree.XPath("(.//p[normalize-space(@class)='instock availability'])[1]")
+
+        _quotes = etree.XPath(f"//div[{_has_class('quote')}]")
+        _quote_text = etree.XPath(f"(.//span[{_has_class('text')}])[1]")
+        _quote_author = etree.XPath(f"(.//small[{_has_class('author')}])[1]")
+        _quote_tags = etree.XPath(f"(.//div[{_has_class('tags')}])[1]")
+        _quote_tag = etree.XPath(f".//a[{_has_class('tag')}]")
+
+        _jobs = etree.XPath(f"//div[{_has_class('card')}]")
+        _job_title = etree.XPath(f"(.//h2[{_has_class('title')}])[1]")
+        _job_company = etree.XPath(f"(.//h3[{_has_class('company')}])[1]")
+        _job_location = etree.XPath(f"(.//p[{_has_class('location')}])[1]")
+        _job_time = etree.XPath("(.//time)[1]")
+
+    @staticmethod
+    def _tree(html):
+        """Parsed document, or None when it has no elements (blank or comment-only body)."""
+        try:
+            try:
+                return lxml_html.fromstring(html)
+            except ValueError:
+                # Unicode strings with an XML encoding declaration must be bytes
+                return lxml_html.fromstring(html.encode('utf-8'))
+        except etree.ParserError:
+            return None
+
+    def _select(self, xpath, html):
+        tree = self._tree(html)
+        return xpath(tree) if tree is not None else None
+
+    @staticmethod
+    def _text(nodes):
+        if not nodes:
+            raise AttributeError("missing node")
+        return nodes[0].xpath("string()")
+
+    def extract_books(self, html):
+        articles = self._select(self._books, html)
+        if not articles:
+            return None
+
+        records = []
+        for article in articles:
+            try:
+                title = self._book_title(article)
+                rating_class = self._book_rating(article)
+                if not title or not rating_class:
+                    continue
+                price = self._text(self._book_price_tag(article))
+                rating = _rating_from_classes(rating_class[0].split())
+                availability = self._text(self._book_stock(article)).strip()
+                records.append((str(title[0]), price, rating, availability))
+            except AttributeError:
+                continue
+        return records
+
+    def extract_quotes(self, html):
+        quotes = self._select(self._quotes, html)
+        if not quotes:
+            return None
+
+        records = []
+        for quote in quotes:
+            try:
+                text = self._text(self._quote_text(quote))
+                author = self._text(self._quote_author(quote))
+                tags_container = self._quote_tags(quote)
+                if not tags_container:
+                    continue
+                tags = [tag.xpath("string()") for tag in self._quote_tag(tags_container[0])]
+                records.append((text, author, ", ".join(tags)))
+            except AttributeError:
+                continue
+        return records
+
+    def extract_jobs(self, html):
+        cards = self._select(self._jobs, html)
+        if not cards:
+            return None
+
+        records = []
+        for card in cards:
+            try:
+                records.append((
+                    self._text(self._job_title(card)).strip(),
+                    self._text(self._job_company(card)).strip(),
+                    self._text(self._job_location(card)).strip(),
+                    self._text(self._job_time(card)).strip(),
+                ))
+            except AttributeError:
+                continue
+        return records
+
+
+class SelectolaxBackend:
+    """
+    Lexbor-backed backend using CSS selectors via selectolax.
+    """
+
+    name = "selectolax"
+
+    BOOKS = "article.product_pod"
+    QUOTES = "div.quote"
+    JOBS = "div.card"
+
+    @staticmethod
+    def _text(node):
+        if node is None:
+            raise AttributeError("missing node")
+        return node.text(deep=True)
+
+    def extract_books(self, html):
+        articles = HTMLParser(html).css(self.BOOKS)
+        if not articles:
+            return None
+
+        records = []
+        for article in articles:
+            try:
+                h3 = article.css_first("h3")
+                link = h3.css_first("a") if h3 is not None else None
+                title = link.attributes.get('title') if link is not None else None
+                star_tag = article.css_first("p.star-rating")
+                if title is None or star_tag is None:
+                    continue
+                price = self._text(article.css_first("p.price_color"))
+                rating = _rating_from_classes((star_tag.attributes.get('class') or '').split())
+                stock = next((p for p in article.css("p.instock.availability")
+                              if ' '.join((p.attributes.get('class') or '').split()) == 'instock availability'), None)
+                availability = self._text(stock).strip()
+                records.append((title, price, rating, availability))
+            except AttributeError:
+                continue
+        return records
+
+    def extract_quotes(self, html):
+        quotes = HTMLParser(html).css(self.QUOTES)
+        if not quotes:
+            return None
+
+        records = []
+        for quote in quotes:
+            try:
+                text = self._text(quote.css_first("span.text"))
+                author = self._text(quote.css_first("small.author"))
+                tags_container = quote.css_first("div.tags")
+                if tags_container is None:
+                    continue
+                tags = [tag.text(deep=True) for tag in tags_container.css("a.tag")]
+                records.append((text, author, ", ".join(tags)))
+            except AttributeError:
+                continue
+        return records
+
+    def extract_jobs(self, html):
+        cards = HTMLParser(html).css(self.JOBS)
+        if not cards:
+            return None
+
+        records = []
+        for card in cards:
+            try:
+                records.append((
+                    self._text(card.css_first("h2.title")).strip(),
+                    self._text(card.css_first("h3.company")).strip(),
+                    self._text(card.css_first("p.location")).strip(),
+                    self._text(card.css_first("time")).strip(),
+                ))
+            except AttributeError:
+                continue
+        return records
+
+
+BACKENDS = {
+    SoupBackend.name: SoupBackend,
+    LxmlBackend.name: LxmlBackend,
+    SelectolaxBackend.name: SelectolaxBackend,
+}
+
+def available_backends():
+    """Names of the backends whose dependencies are installed."""
+    names = []
+    if HTMLParser is not None:
+        names.append(SelectolaxBackend.name)
+    if etree is not None:
+        names.append(LxmlBackend.name)
+    names.append(SoupBackend.name)
+    return names
+
+def get_backend(name=None):
+    """
+    Returns a parsing backend instance.
+
+    Args:
+        name (str): 'selectolax', 'lxml' or 'html.parser'. None picks the
+            fastest installed one, falling back to pure-Python BeautifulSoup.
+    """
+    if name is None:
+        name = available_backends()[0]
+    if name not in available_backends():
+        raise ValueError(f"Parsing backend '{name}' is not available (installed: {available_backends()})")
+    return BACKENDS[name]()
@@ -1,10 +1,21 @@
+import numpy as np
 import pandas as pd
 import re
+import time
+from monitoring.metrics import counter, histogram
+
+# Kept as pattern strings: pandas hands these to pyarrow's RE2 kernels for
+# Arrow-backed strings, while a compiled re.Pattern forces a per-row fallback.
+CURRENCY_PATTERN = r'[^\d.]'
+NUMBER_PATTERN = r'\d+\.?\d*|\.\d+'          # what float() accepts after CURRENCY_PATTERN
+WHITESPACE_PATTERN = r'\s\s+|[\t\n\r\f\v]'   # only runs that actually need collapsing
+RATINGS = range(1, 6)                         # star ratings; anything else is missing
 
 def clean_currency(value):
     """
     Extracts numeric value from currency strings like 'Â£51.77'.
-    Returns float or None.
+    Returns a float; missing or unparseable values give 0.0.
+    Row-wise reference for clean_currency_series.
     """
     if pd.isna(value):
         return 0.0
@@ -18,42 +29,182 @@ def clean_currency(value):
 def normalize_text(text):
     """
     Removes extra whitespace and newlines.
+    Row-wise reference for normalize_text_series (only strips the ends).
     """
     if pd.isna(text):
         return ""
     return str(text).strip()
 
-def clean_books_df(df):
+def clean_rating(value):
     """
-    Apply specific cleaning rules to the Books DataFrame.
+    Star rating ('1'..'5' or a number) as int; None for anything else
+    (e.g. 'Unknown').
+    Row-wise reference for clean_rating_series.
     """
-    df_clean = df.copy()
-    if 'price' in df_clean.columns:
-        df_clean['price'] = df_clean['price'].apply(clean_currency)
-    if 'title' in df_clean.columns:
-        df_clean['title'] = df_clean['title'].apply(normalize_text)
-    return df_clean
+    try:
+        rating = float(value)
+    except (TypeError, ValueError):
+        return None
+    return int(rating) if rating in RATINGS else None
 
-def clean_quotes_df(df):
+def clean_currency_series(series):
     """
-    Apply specific cleaning rules to the Quotes DataFrame.
+    Vectorized clean_currency: strips everything but digits and dots and
+    parses the rest as float. Missing or unparseable values become 0.0.
     """
-    df_clean = df.copy()
-    if 'text' in df_clean.columns:
-        df_clean['text'] = df_clean['text'].apply(normalize_text)
-    if 'author' in df_clean.columns:
-        df_clean['author'] = df_clean['author'].apply(normalize_text)
+    if pd.api.types.is_numeric_dtype(series):
+        return series.astype(float).fillna(0.0)
+    cleaned = series.astype('string').str.replace(CURRENCY_PATTERN, '', regex=True)
+    valid = cleaned.str.fullmatch(NUMBER_PATTERN).fillna(False).astype(bool)
+    return cleaned.where(valid).astype(float).fillna(0.0)
+
+def clean_rating_series(series):
+    """
+    Vectorized clean_rating: a nullable Int8 column, <NA> where the value is
+    not a star rating. Categorical input is converted per category.
+    """
+    if isinstance(series.dtype, pd.CategoricalDtype):
+        ratings = clean_rating_series(pd.Series(series.cat.categories))
+        return pd.Series(ratings.array.take(series.cat.codes.to_numpy(), allow_fill=True), index=series.index)
+    numbers = pd.to_numeric(series, errors='coerce')
+    return numbers.where(numbers.isin(RATINGS)).astype('Int8')
+
+def normalize_text_series(series):
+    """
+    Vectorized text normalization: collapses inner whitespace/newlines to a
+    single space and trims the ends. Missing values become "".
+    """
+    cleaned = series.astype('string').str.replace(WHITESPACE_PATTERN, ' ', regex=True).str.strip()
+    return cleaned.fillna("").astype(object)
+
+# Natural key of each dataset: records with equal keys are the same item
+BOOK_KEY = ('title',)
+QUOTE_KEY = ('text',)
+JOB_KEY = ('title', 'company', 'location')
+# Not part of a record's content: a re-scrape alone is not a change
+HASH_EXCLUDED = ('id', 'scraped_at', 'key_hash', 'content_hash')
+MISSING_TOKEN = '\x00'               # what a missing value hashes as
+HASH_MULTIPLIER = np.uint64(1000003)  # mixes column hashes in hash_columns
+
+CLEAN_SECONDS = histogram("pipeline_clean_seconds", "Cleaning and hashing time per chunk.", ("dataset",))
+CLEAN_ROWS = counter("pipeline_clean_rows_total", "Rows cleaned.", ("dataset",))
+
+# Column -> vectorized cleaning function, per dataset
+BOOK_RULES = {'price': clean_currency_series, 'rating': clean_rating_series, 'title': normalize_text_series}
+QUOTE_RULES = {'text': normalize_text_series, 'author': normalize_text_series}
+JOB_RULES = {
+    'title': normalize_text_series,
+    'company': normalize_text_series,
+    'location': normalize_text_series,
+}
+
+# Same columns with the original per-row functions
+BOOK_REFERENCE_RULES = {'price': clean_currency, 'rating': clean_rating, 'title': normalize_text}
+QUOTE_REFERENCE_RULES = {'text': normalize_text, 'author': normalize_text}
+JOB_REFERENCE_RULES = {'title': normalize_text, 'company': normalize_text, 'location': normalize_text}
+
+def _apply_rules(df, rules, inplace=False):
+    df_clean = df if inplace else df.copy()
+    for column, rule in rules.items():
+        if column in df_clean.columns:
+            df_clean[column] = rule(df_clean[column])
     return df_clean
 
-def clean_jobs_df(df):
+_MISSING_HASH = pd.util.hash_array(np.array([MISSING_TOKEN], dtype=object), categorize=False)[0]
+
+def _hash_column(series):
+    """
+    64-bit hash per value, independent of the dtype holding it: numbers
+    hash as float64, everything else as its string (object, str and
+    categorical columns alike), missing values as MISSING_TOKEN.
+    """
+    if pd.api.types.is_numeric_dtype(series.dtype) or pd.api.types.is_bool_dtype(series.dtype):
+        values = series.to_numpy(dtype='float64', na_value=np.nan)
+        hashed = pd.util.hash_array(values, categorize=False)
+        hashed[np.isnan(values)] = _MISSING_HASH
+        return hashed
+    values = series.to_numpy(dtype=object, na_value=MISSING_TOKEN)
+    return pd.util.hash_array(values, categorize=False)
+
+def hash_columns(df, columns):
+    """
+    Vectorized 64-bit hash of `columns` per row (pandas' hash_array per
+    column, combined in the given order). Returned as signed int64 so it
+    fits an SQLite INTEGER.
+    """
+    hashed = np.zeros(len(df), dtype=np.uint64)
+    for column in columns:
+        hashed = hashed * HASH_MULTIPLIER ^ _hash_column(df[column])
+    return hashed.view(np.int64)
+
+def add_record_hashes(df, key_columns):
     """
-    Apply specific cleaning rules to the Jobs DataFrame.
+    Add 'key_hash' (hash of the natural key columns) and 'content_hash'
+    (hash of the remaining columns, in name order) to a cleaned frame.
+    storage.save_data upserts on key_hash and only rewrites rows whose
+    content_hash changed. Modifies and returns `df`; a frame missing any
+    key column (e.g. the empty frame of an empty scrape) is returned as is.
     """
+    if not set(key_columns) <= set(df.columns):
+        return df
+    content = sorted(c for c in df.columns if c not in key_columns and c not in HASH_EXCLUDED)
+    df['key_hash'] = hash_columns(df, key_columns)
+    df['content_hash'] = hash_columns(df, content)
+    return df
+
+def _clean(df, rules, key_columns, dataset, inplace):
+    """_apply_rules + add_record_hashes, timed into the pipeline_clean_* metrics."""
+    start = time.perf_counter()
+    df_clean = add_record_hashes(_apply_rules(df, rules, inplace), key_columns)
+    CLEAN_SECONDS.observe(time.perf_counter() - start, dataset=dataset)
+    CLEAN_ROWS.inc(len(df_clean), dataset=dataset)
+    return df_clean
+
+def _apply_reference_rules(df, rules):
     df_clean = df.copy()
-    if 'title' in df_clean.columns:
-        df_clean['title'] = df_clean['title'].apply(normalize_text)
-    if 'company' in df_clean.columns:
-        df_clean['company'] = df_clean['company'].apply(normalize_text)
-    if 'location' in df_clean.columns:
-        df_clean['location'] = df_clean['location'].apply(normalize_text)
+    for column, rule in rules.items():
+        if column in df_clean.columns:
+            df_clean[column] = df_clean[column].apply(rule)
     return df_clean
+
+def clean_books_df(df, inplace=False):
+    """
+    Apply specific cleaning rules to the Books DataFrame and add the
+    key/content hashes (see add_record_hashes).
+    With inplace=True the input frame is modified and returned (no copy).
+    """
+    return _clean(df, BOOK_RULES, BOOK_KEY, 'books', inplace)
+
+def clean_quotes_df(df, inplace=False):
+    """
+    Apply specific cleaning rules to the Quotes DataFrame and add the
+    key/content hashes (see add_record_hashes).
+    With inplace=True the input frame is modified and returned (no copy).
+    """
+    return _clean(df, QUOTE_RULES, QUOTE_KEY, 'quotes', inplace)
+
+def clean_jobs_df(df, inplace=False):
+    """
+    Apply specific cleaning rules to the Jobs DataFrame and add the
+    key/content hashes (see add_record_hashes).
+    With inplace=True the input frame is modified and returned (no copy).
+    """
+    return _clean(df, JOB_RULES, JOB_KEY, 'jobs', inplace)
+
+def reference_clean_books_df(df):
+    """
+    Original per-row Books cleaning (Series.apply), kept for comparison.
+    """
+    return _apply_reference_rules(df, BOOK_REFERENCE_RULES)
+
+def reference_clean_quotes_df(df):
+    """
+    Original per-row Quotes cleaning (Series.apply), kept for comparison.
+    """
+    return _apply_reference_rules(df, QUOTE_REFERENCE_RULES)
+
+def reference_clean_jobs_df(df):
+    """
+    Original per-row Jobs cleaning (Series.apply), kept for comparison.
+    """
+    return _apply_reference_rules(df, JOB_REFERENCE_RULES)
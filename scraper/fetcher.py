@@ -1,10 +1,479 @@
 import requests
 import warnings
+import asyncio
+import hashlib
+import json
+import os
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import closing, contextmanager
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from urllib.parse import urlsplit
+from requests.adapters import HTTPAdapter
 from requests.exceptions import RequestException, Timeout, HTTPError
+from monitoring.metrics import counter, histogram
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover - not on Windows; index writes are then only serialized per process
+    fcntl = None
+
+# Defaults for the concurrent page engine
+DEFAULT_WINDOW = 4       # pages kept in flight ahead of the parser
+DEFAULT_PER_HOST = 4     # simultaneous requests against a single host
+DEFAULT_RATE = 5.0       # requests started per second (token bucket refill)
+
+# On-disk HTTP cache location (next to data_pipeline.db)
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DEFAULT_CACHE_DIR = os.path.join(BASE_DIR, ".http_cache")
+DEFAULT_CACHE_BYTES = 256 * 1024 * 1024
+DEFAULT_CACHE_FLUSH_EVERY = 50   # index changes kept in memory between index.json writes
 
 # Suppress warnings if necessary, but usually better to handle them.
 # warnings.filterwarnings("ignore")
 
+DEFAULT_HEADERS = {
+    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36',
+    'Accept-Language': 'en-US,en;q=0.9',
+}
+
+# Transient statuses worth another attempt. Other 4xx (e.g. 404) are final.
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+FETCH_SECONDS = histogram("pipeline_fetch_seconds", "Duration of each HTTP request.", ("host",))
+FETCH_BYTES = counter("pipeline_fetch_bytes_total", "Response body bytes received.", ("host",))
+FETCH_RESPONSES = counter(
+    "pipeline_fetch_responses_total", "HTTP responses by status code ('timeout'/'error' when none came).",
+    ("host", "status"),
+)
+FETCH_RETRIES = counter("pipeline_fetch_retries_total", "Requests repeated after a failed attempt.", ("host",))
+FETCH_FAILURES = counter("pipeline_fetch_failures_total", "URLs given up on.", ("host",))
+FETCH_CACHE_HITS = counter("pipeline_fetch_cache_hits_total", "Pages served from the HTTP cache without a request.", ("host",))
+
+
+def _parse_retry_after(value):
+    """
+    Converts a Retry-After header (delta-seconds or HTTP-date) to seconds.
+    Returns None when the header is missing or unparseable.
+    """
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        when = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if when.tzinfo is None:
+        when = when.replace(tzinfo=timezone.utc)
+    return max(0.0, (when - datetime.now(timezone.utc)).total_seconds())
+
+
+class HTTPCache:
+    """
+    On-disk store of fetched pages for conditional GETs.
+    
+    Bodies are written to one file per URL + validator (ETag/Last-Modified)
+    combination; a small JSON index keeps the validators, sizes and access
+    times. The store is size-bounded and evicts least recently used entries.
+    
+    Several processes may share cache_dir (the app and the CLI both use the
+    default one): index.json is rewritten under a file lock, merging this
+    instance's changes into what is on disk, and eviction sizes the
+    directory itself, so bodies no index refers to are reclaimed too.
+    
+    Args:
+        cache_dir (str): Directory holding the bodies and index.json.
+        max_bytes (int): Total body size kept before LRU eviction kicks in.
+        ttl (float): Seconds an entry without validators is served without
+            contacting the server. None means always revalidate/refetch.
+        flush_every (int): Index changes (stores, reads, evictions) after
+            which index.json is rewritten; flush() writes the remainder.
+    """
+    
+    INDEX_FILE = "index.json"
+    LOCK_FILE = "index.lock"
+    BODY_SUFFIX = ".html"
+    
+    def __init__(self, cache_dir=DEFAULT_CACHE_DIR, max_bytes=DEFAULT_CACHE_BYTES, ttl=None,
+                 flush_every=DEFAULT_CACHE_FLUSH_EVERY):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.flush_every = max(1, int(flush_every))
+        self._lock = threading.Lock()
+        self._index = self._read_index()
+        self._changes = 0
+        self._touched = set()   # URLs stored or read since the last index write
+        self._removed = {}      # URL -> body file removed since the last index write
+        
+    def _index_path(self):
+        return os.path.join(self.cache_dir, self.INDEX_FILE)
+        
+    def _read_index(self):
+        try:
+            with open(self._index_path(), encoding='utf-8') as fh:
+                return json.load(fh)
+        except (OSError, ValueError):
+            return {}
+            
+    @contextmanager
+    def _locked_dir(self):
+        """Exclusive lock on cache_dir, shared with other processes using it."""
+        os.makedirs(self.cache_dir, exist_ok=True)
+        # Closing the file releases the lock
+        with open(os.path.join(self.cache_dir, self.LOCK_FILE), 'a') as fh:
+            if fcntl:
+                fcntl.flock(fh, fcntl.LOCK_EX)
+            yield
+            
+    def _dump_index(self):
+        tmp_path = self._index_path() + ".tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as fh:
+            json.dump(self._index, fh)
+        os.replace(tmp_path, self._index_path())
+        
+    def _write_index(self):
+        """
+        Merges this instance's changes into index.json, evicts and writes it
+        back. Entries other processes added since are kept; for a URL both
+        stored, the newer store wins.
+        """
+        with self._locked_dir():
+            index = self._read_index()
+            for url, name in self._removed.items():
+                if index.get(url, {}).get('file') == name:
+                    del index[url]
+            for url in self._touched:
+                entry, other = self._index.get(url), index.get(url)
+                if entry is None:
+                    continue
+                if other is None or other['stored_at'] <= entry['stored_at']:
+                    index[url] = entry
+                else:
+                    other['last_used'] = max(other['last_used'], entry['last_used'])
+            self._index = index
+            self._touched.clear()
+            self._removed.clear()
+            self._evict()
+            self._dump_index()
+        self._changes = 0
+        
+    def _changed(self):
+        """Counts an index change, rewriting index.json every flush_every of them."""
+        self._changes += 1
+        if self._changes >= self.flush_every:
+            self._write_index()
+        
+    @staticmethod
+    def _body_name(url, etag, last_modified):
+        key = "\n".join([url, etag or "", last_modified or ""])
+        return hashlib.sha1(key.encode('utf-8')).hexdigest() + ".html"
+        
+    def _remove(self, url):
+        entry = self._index.pop(url, None)
+        if entry:
+            self._changes += 1
+            self._removed[url] = entry['file']
+            try:
+                os.remove(os.path.join(self.cache_dir, entry['file']))
+            except OSError:
+                pass
+                
+    def lookup(self, url):
+        """Returns the index entry for url, or None."""
+        with self._lock:
+            entry = self._index.get(url)
+            return dict(entry) if entry else None
+            
+    def is_fresh(self, entry):
+        """True when a validator-less entry is still inside the TTL override."""
+        if not entry or self.ttl is None or entry.get('etag') or entry.get('last_modified'):
+            return False
+        return time.time() - entry['stored_at'] < self.ttl
+        
+    def conditional_headers(self, entry):
+        """If-None-Match / If-Modified-Since headers for a cached entry."""
+        headers = {}
+        if entry and entry.get('etag'):
+            headers['If-None-Match'] = entry['etag']
+        if entry and entry.get('last_modified'):
+            headers['If-Modified-Since'] = entry['last_modified']
+        return headers
+        
+    def read(self, url):
+        """Returns the cached body for url (marking it recently used), or None."""
+        with self._lock:
+            entry = self._index.get(url)
+            if not entry:
+                return None
+            try:
+                with open(os.path.join(self.cache_dir, entry['file']), encoding='utf-8') as fh:
+                    body = fh.read()
+            except OSError:
+                self._remove(url)
+                return None
+            entry['last_used'] = time.time()
+            self._touched.add(url)
+            self._changed()
+            return body
+            
+    def store(self, url, body, etag=None, last_modified=None):
+        """
+        Writes a body and its validators. Once the entries known to this
+        instance exceed max_bytes, the index is written at once (which evicts).
+        """
+        data = body.encode('utf-8')
+        if len(data) > self.max_bytes:
+            return
+        with self._lock:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            name = self._body_name(url, etag, last_modified)
+            old = self._index.get(url)
+            if old and old['file'] != name:
+                self._remove(url)
+            # Written aside and renamed, so other processes never read half a body
+            path = os.path.join(self.cache_dir, name)
+            tmp_path = f"{path}.{os.getpid()}-{threading.get_ident()}.tmp"
+            with open(tmp_path, 'wb') as fh:
+                fh.write(data)
+            os.replace(tmp_path, path)
+            now = time.time()
+            self._index[url] = {
+                'file': name,
+                'etag': etag,
+                'last_modified': last_modified,
+                'size': len(data),
+                'stored_at': now,
+                'last_used': now,
+            }
+            self._touched.add(url)
+            if sum(entry['size'] for entry in self._index.values()) > self.max_bytes:
+                self._write_index()
+            else:
+                self._changed()
+            
+    def _bodies(self):
+        """{file name: size} of the body files in cache_dir."""
+        bodies = {}
+        with os.scandir(self.cache_dir) as items:
+            for item in items:
+                if item.name.endswith(self.BODY_SUFFIX) and item.is_file():
+                    bodies[item.name] = item.stat().st_size
+        return bodies
+        
+    def _evict(self):
+        """
+        Deletes least recently used bodies until cache_dir holds at most
+        max_bytes of them. Sizes come from a directory scan: bodies no index
+        entry refers to (a crash before the index was written, an entry
+        another process overwrote) count too, aged by modification time.
+        Entries whose body is gone are dropped. Call with the directory lock.
+        """
+        bodies = self._bodies()
+        owners = {}
+        for url, entry in list(self._index.items()):
+            if entry['file'] in bodies:
+                owners[entry['file']] = (url, entry['last_used'])
+            else:
+                del self._index[url]
+        total = sum(bodies.values())
+        if total <= self.max_bytes:
+            return
+        
+        def last_used(name):
+            if name in owners:
+                return owners[name][1]
+            try:
+                return os.path.getmtime(os.path.join(self.cache_dir, name))
+            except OSError:
+                return 0.0
+        
+        for name in sorted(bodies, key=last_used):
+            try:
+                os.remove(os.path.join(self.cache_dir, name))
+            except OSError:
+                pass
+            if name in owners:
+                del self._index[owners[name][0]]
+            total -= bodies[name]
+            if total <= self.max_bytes:
+                break
+                
+    def flush(self):
+        """Writes index changes not yet in index.json (stores, access times)."""
+        with self._lock:
+            if self._changes:
+                self._write_index()
+                
+    def clear(self):
+        """Drops every cached body, including ones no index refers to."""
+        with self._lock, self._locked_dir():
+            for name in self._bodies():
+                try:
+                    os.remove(os.path.join(self.cache_dir, name))
+                except OSError:
+                    pass
+            self._index = {}
+            self._touched.clear()
+            self._removed.clear()
+            self._dump_index()
+            self._changes = 0
+
+
+class Fetcher:
+    """
+    Reusable HTTP client with pooled keep-alive sessions and retry/backoff.
+    
+    One requests.Session is kept per host so connections (and TLS handshakes)
+    are reused across pages. Transient failures are retried with exponential
+    backoff and full jitter; Retry-After is honoured when the server sends it.
+    
+    Args:
+        retries (int): Number of attempts per URL.
+        timeout (int): Timeout in seconds for each request.
+        pool_size (int): Keep-alive connections kept per host.
+        backoff (float): Base delay in seconds for the exponential backoff.
+        max_backoff (float): Upper bound for any single delay.
+        headers (dict): Extra headers merged over DEFAULT_HEADERS.
+        cache (HTTPCache): Optional response cache used for conditional GETs.
+    """
+    
+    def __init__(self, retries=3, timeout=10, pool_size=10, backoff=0.5, max_backoff=30.0, headers=None, cache=None):
+        self.retries = retries
+        self.timeout = timeout
+        self.pool_size = pool_size
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.headers = dict(DEFAULT_HEADERS, **(headers or {}))
+        self.cache = cache
+        self._sessions = {}
+        self._lock = threading.Lock()
+        
+    def session_for(self, url):
+        """Returns the pooled session for the URL's host, creating it once."""
+        parts = urlsplit(url)
+        host = f"{parts.scheme}://{parts.netloc}"
+        with self._lock:
+            session = self._sessions.get(host)
+            if session is None:
+                session = requests.Session()
+                adapter = HTTPAdapter(pool_connections=1, pool_maxsize=self.pool_size)
+                session.mount('http://', adapter)
+                session.mount('https://', adapter)
+                session.headers.update(self.headers)
+                self._sessions[host] = session
+        return session
+        
+    def backoff_delay(self, attempt, retry_after=None):
+        """Seconds to wait before the next attempt (0-based attempt number)."""
+        if retry_after is not None:
+            return min(retry_after, self.max_backoff)
+        return random.uniform(0, min(self.max_backoff, self.backoff * (2 ** attempt)))
+        
+    def fetch(self, url, retries=None, timeout=None):
+        """
+        Fetches HTML content from a given URL with robust error handling.
+        Request durations, bytes, statuses and retries are recorded in the
+        pipeline_fetch_* metrics (see monitoring.metrics).
+        
+        Returns:
+            str or None: Raw HTML content if successful, None otherwise.
+        """
+        retries = retries or self.retries
+        timeout = timeout or self.timeout
+        session = self.session_for(url)
+        host = urlsplit(url).netloc
+        
+        entry = self.cache.lookup(url) if self.cache else None
+        if entry and self.cache.is_fresh(entry):
+            body = self.cache.read(url)
+            if body is not None:
+                FETCH_CACHE_HITS.inc(host=host)
+                return body
+            entry = None
+        conditional = self.cache.conditional_headers(entry) if entry else {}
+        
+        for attempt in range(retries):
+            retry_after = None
+            if attempt:
+                FETCH_RETRIES.inc(host=host)
+            start = time.perf_counter()
+            try:
+                response = session.get(url, headers=conditional, timeout=timeout)
+                FETCH_SECONDS.observe(time.perf_counter() - start, host=host)
+                FETCH_RESPONSES.inc(host=host, status=response.status_code)
+                FETCH_BYTES.inc(len(response.content), host=host)
+                if response.status_code == 304 and entry:
+                    body = self.cache.read(url)
+                    if body is not None:
+                        return body
+                    # Cached body vanished underneath us: fetch it unconditionally
+                    conditional = {}
+                    continue
+                if response.status_code in RETRY_STATUSES:
+                    retry_after = _parse_retry_after(response.headers.get('Retry-After'))
+                    print(f"[Warning] HTTP {response.status_code} fetching {url} (Attempt {attempt + 1}/{retries})")
+                else:
+                    response.raise_for_status() # Raise HTTPError for bad responses (4xx, 5xx)
+                    if self.cache:
+                        self.cache.store(
+                            url, response.text,
+                            etag=response.headers.get('ETag'),
+                            last_modified=response.headers.get('Last-Modified'),
+                        )
+                    return response.text
+                    
+            except Timeout:
+                FETCH_SECONDS.observe(time.perf_counter() - start, host=host)
+                FETCH_RESPONSES.inc(host=host, status="timeout")
+                print(f"[Warning] Timeout fetching {url} (Attempt {attempt + 1}/{retries})")
+            except HTTPError as e:
+                print(f"[Error] HTTP error fetching {url}: {e}")
+                # 404s and other client errors won't change on retry
+                break
+            except RequestException as e:
+                FETCH_SECONDS.observe(time.perf_counter() - start, host=host)
+                FETCH_RESPONSES.inc(host=host, status="error")
+                print(f"[Error] Request failed for {url}: {e}")
+                
+            if attempt + 1 < retries:
+                time.sleep(self.backoff_delay(attempt, retry_after))
+                
+        FETCH_FAILURES.inc(host=host)
+        print(f"[Failed] Could not fetch {url} after {retries} attempts.")
+        return None
+        
+    def flush(self):
+        """Writes the cache index, if there is a cache (see HTTPCache.flush)."""
+        if self.cache:
+            self.cache.flush()
+            
+    def close(self):
+        """Closes every pooled session and flushes the cache index."""
+        self.flush()
+        with self._lock:
+            for session in self._sessions.values():
+                session.close()
+            self._sessions.clear()
+
+
+_default_fetcher = None
+_default_lock = threading.Lock()
+
+def get_default_fetcher():
+    """Returns the process-wide Fetcher shared by fetch_page and the parsers."""
+    global _default_fetcher
+    with _default_lock:
+        if _default_fetcher is None:
+            _default_fetcher = Fetcher(cache=HTTPCache())
+    return _default_fetcher
+
 def fetch_page(url, retries=3, timeout=10):
     """
     Fetches HTML content from a given URL with robust error handling.
@@ -17,30 +486,109 @@ def fetch_page(url, retries=3, timeout=10):
     Returns:
         str or None: Raw HTML content if successful, None otherwise.
     """
+    return get_default_fetcher().fetch(url, retries=retries, timeout=timeout)
+
+
+class TokenBucket:
+    """
+    Asyncio token bucket that spaces out request starts.
+    
+    Args:
+        rate (float): Tokens added per second. None or 0 disables limiting.
+        capacity (float): Maximum burst size. Defaults to max(1, rate).
+    """
+    
+    def __init__(self, rate=DEFAULT_RATE, capacity=None):
+        self.rate = rate
+        self.capacity = capacity or max(1.0, rate or 1.0)
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = None
+        
+    async def acquire(self):
+        if not self.rate:
+            return
+        # Created lazily so the lock binds to the loop that actually runs it
+        if self._lock is None:
+            self._lock = asyncio.Lock()
+            
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                await asyncio.sleep((1 - self._tokens) / self.rate)
+
+
+class AsyncFetchEngine:
+    """
+    Fetches paginated URLs concurrently while handing pages back in order.
     
-    headers = {
-        'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36',
-        'Accept-Language': 'en-US,en;q=0.9',
-    }
+    A bounded window of pages is kept in flight; each host gets its own
+    concurrency limit and all requests share a token-bucket rate limit.
+    The blocking Fetcher runs on a thread pool driven by asyncio.
     
-    for attempt in range(retries):
+    Args:
+        window (int): Number of pages requested ahead of the consumer.
+        per_host (int): Maximum concurrent requests per host.
+        rate (float): Requests started per second across all hosts.
+        fetcher (Fetcher): Client used for the requests. Defaults to the shared one.
+    """
+    
+    def __init__(self, window=DEFAULT_WINDOW, per_host=DEFAULT_PER_HOST, rate=DEFAULT_RATE, fetcher=None):
+        self.window = max(1, int(window))
+        self.per_host = max(1, int(per_host))
+        self.rate = rate
+        self.fetcher = fetcher or get_default_fetcher()
+        
+    async def _fetch(self, url, executor, bucket, host_limits):
+        host = urlsplit(url).netloc
+        if host not in host_limits:
+            host_limits[host] = asyncio.Semaphore(self.per_host)
+            
+        async with host_limits[host]:
+            await bucket.acquire()
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(executor, self.fetcher.fetch, url)
+            
+    def iter_pages(self, base_url, start=1, max_pages=None):
+        """
+        Yields (page_number, html) for base_url.format(page) in page order.
+        
+        Requests for the following pages keep running while the caller
+        processes the current one. Closing the generator (e.g. breaking out
+        of the loop on an empty page) cancels everything still pending.
+        """
+        loop = asyncio.new_event_loop()
+        executor = ThreadPoolExecutor(max_workers=min(self.window, self.per_host))
+        bucket = TokenBucket(self.rate)
+        host_limits = {}
+        pending = {}
+        end = None if max_pages is None else start + max_pages
+        next_page = start
+        page = start
+        
         try:
-            response = requests.get(url, headers=headers, timeout=timeout)
-            response.raise_for_status() # Raise HTTPError for bad responses (4xx, 5xx)
-            return response.text
-            
-        except Timeout:
-            print(f"[Warning] Timeout fetching {url} (Attempt {attempt + 1}/{retries})")
-        except HTTPError as e:
-            print(f"[Error] HTTP error fetching {url}: {e}")
-            # usually 404s etc shouldn't be retried blindly, but for flakey servers maybe.
-            # breaking here as 404 won't likely change on retry immediately
-            break 
-        except RequestException as e:
-            print(f"[Error] Request failed for {url}: {e}")
-            
-        # Exponential backoff or simple sleep could be added here
-        # time.sleep(1) 
-        
-    print(f"[Failed] Could not fetch {url} after {retries} attempts.")
-    return None
+            while end is None or page < end:
+                while len(pending) < self.window and (end is None or next_page < end):
+                    url = base_url.format(next_page)
+                    pending[next_page] = loop.create_task(self._fetch(url, executor, bucket, host_limits))
+                    next_page += 1
+                    
+                html = loop.run_until_complete(pending.pop(page))
+                yield page, html
+                page += 1
+        finally:
+            for task in pending.values():
+                task.cancel()
+            if pending:
+                loop.run_until_complete(asyncio.gather(*pending.values(), return_exceptions=True))
+            loop.close()
+            executor.shutdown(wait=False, cancel_futures=True)
+            
+    def pages(self, base_url, start=1, max_pages=None):
+        """Same as iter_pages, wrapped so `with` closes it deterministically."""
+        return closing(self.iter_pages(base_url, start=start, max_pages=max_pages))
@@ -1,140 +1,302 @@
-from bs4 import BeautifulSoup
-import pandas as pd
-from scraper.fetcher import fetch_page
 import time
+from array import array
+
+import numpy as np
+import pandas as pd
+from pandas.api.types import union_categoricals
+from monitoring.metrics import counter, histogram
+from scraper.fetcher import fetch_page, AsyncFetchEngine
+from scraper.backends import get_backend, BOOK_FIELDS, QUOTE_FIELDS, JOB_FIELDS
+
+# Rows per chunk for single-page sources (paginated sources yield one chunk per page)
+DEFAULT_CHUNK_SIZE = 50
+
+# Low-cardinality fields, stored as pandas categoricals (codes + distinct values)
+BOOK_CATEGORICAL = ('rating', 'availability')
+QUOTE_CATEGORICAL = ()
+JOB_CATEGORICAL = ()
 
-def parse_books(limit=20, base_url="http://books.toscrape.com/catalogue/page-{}.html"):
+PARSE_SECONDS = histogram(
+    "pipeline_parse_seconds", "Extraction time per page (waiting time for pages parsed by a ParsePool).", ("parser",)
+)
+PARSE_ITEMS = counter("pipeline_parse_items_total", "Records extracted from pages.", ("parser",))
+
+def _observe_page(kind, start, records):
+    PARSE_SECONDS.observe(time.perf_counter() - start, parser=kind)
+    PARSE_ITEMS.inc(len(records or ()), parser=kind)
+
+class ColumnBuffer:
     """
-    Scrapes books from a given URL pattern using fetcher.
+    Columnar accumulator for the record tuples the backends return: one
+    list per field, or for `categorical` fields an int32 code per row plus
+    the distinct values, so a repeated value (a rating, "In stock") is kept
+    once instead of once per row. frame() hands the columns to pandas in
+    one go; the code arrays are passed without a copy.
+    
+    flush() returns the frame and empties the buffer but keeps the
+    categories, so a value keeps its code across the chunks of one stream
+    and each chunk's categories extend the previous chunk's. Chunks only
+    share a CategoricalDtype until a new value turns up; combine them with
+    concat_chunks(), as pd.concat would drop the categorical dtype.
+    
+    Args:
+        fields (tuple): Field order of the record tuples (*_FIELDS).
+        categorical (tuple): Fields to encode as categoricals.
     """
-    books_data = []
     
-    rating_map = {'One': '1', 'Two': '2', 'Three': '3', 'Four': '4', 'Five': '5'}
+    __slots__ = ("fields", "_columns", "_categories", "_dtypes")
     
-    page = 1
-    while len(books_data) < limit:
-        url = base_url.format(page)
-        # fetch_page is now robust
-        html = fetch_page(url)
+    def __init__(self, fields, categorical=()):
+        self.fields = tuple(fields)
+        self._categories = {field: {} for field in categorical}
+        self._dtypes = {}
+        self._reset()
         
-        if not html:
-            break
-            
-        soup = BeautifulSoup(html, 'html.parser')
-        articles = soup.find_all('article', class_='product_pod')
+    def _reset(self):
+        self._columns = {
+            field: array('i') if field in self._categories else [] for field in self.fields
+        }
         
-        if not articles:
-            break
-            
-        for article in articles:
-            if len(books_data) >= limit:
-                break
-                
-            try:
-                title = article.h3.a['title']
-                price = article.find('p', class_='price_color').text
-                
-                star_tag = article.find('p', class_='star-rating')
-                rating_classes = star_tag['class']
-                rating = "Unknown"
-                for cls in rating_classes:
-                    if cls in rating_map:
-                        rating = rating_map[cls]
-                        break
-                        
-                availability = article.find('p', class_='instock availability').text.strip()
+    def __len__(self):
+        return len(self._columns[self.fields[0]])
+        
+    def extend(self, records):
+        """Append a list of record tuples."""
+        for field, values in zip(self.fields, zip(*records)):
+            categories = self._categories.get(field)
+            if categories is None:
+                self._columns[field].extend(values)
+            else:
+                self._columns[field].extend(
+                    -1 if value is None else categories.setdefault(value, len(categories)) for value in values
+                )
                 
-                books_data.append({
-                    'title': title,
-                    'price': price,
-                    'rating': rating,
-                    'availability': availability
-                })
-            except AttributeError:
-                continue
-            
-        page += 1
-        time.sleep(0.5) 
-            
-    return pd.DataFrame(books_data)
+    def _dtype(self, field):
+        # Categories are only ever appended, so an unchanged count means an unchanged dtype
+        categories = self._categories[field]
+        dtype = self._dtypes.get(field)
+        if dtype is None or len(dtype.categories) != len(categories):
+            dtype = self._dtypes[field] = pd.CategoricalDtype(list(categories))
+        return dtype
+        
+    def frame(self):
+        """The buffered records as a DataFrame (categorical fields as category dtype)."""
+        data = {}
+        for field in self.fields:
+            column = self._columns[field]
+            if field in self._categories:
+                codes = np.frombuffer(column, dtype=np.int32) if column else np.empty(0, dtype=np.int32)
+                column = pd.Categorical.from_codes(codes, dtype=self._dtype(field), validate=False)
+            data[field] = column
+        return pd.DataFrame(data)
+        
+    def flush(self):
+        """frame(), then empty the buffer for the next chunk."""
+        frame = self.frame()
+        self._reset()
+        return frame
 
-def parse_quotes(limit=20, base_url="http://quotes.toscrape.com/page/{}/"):
+def _extract_pages(pages, extract, kind, pool):
     """
-    Scrapes quotes from a given URL pattern using fetcher.
+    Yields (page, html, records) in page order. Stops at the first page that
+    could not be fetched. With a ParsePool, extraction runs in batches on
+    worker processes instead of in this thread.
     """
-    quotes_data = []
-    
-    page = 1
-    while len(quotes_data) < limit:
-        url = base_url.format(page)
-        html = fetch_page(url)
+    if pool is None:
+        for page, html in pages:
+            if not html:
+                return
+            start = time.perf_counter()
+            records = extract(html)
+            _observe_page(kind, start, records)
+            yield page, html, records
+        return
         
-        if not html:
-            break
-            
-        soup = BeautifulSoup(html, 'html.parser')
-        quotes = soup.find_all('div', class_='quote')
-        
-        if not quotes:
-            break
-            
-        for quote in quotes:
-            if len(quotes_data) >= limit:
-                break
-            
-            try:
-                text = quote.find('span', class_='text').text
-                author = quote.find('small', class_='author').text
-                
-                tags_container = quote.find('div', class_='tags')
-                tags = [tag.text for tag in tags_container.find_all('a', class_='tag')]
-                tags_str = ", ".join(tags)
-                
-                quotes_data.append({
-                    'text': text,
-                    'author': author,
-                    'tags': tags_str
-                })
-            except AttributeError:
-                continue
-            
-        page += 1
-        time.sleep(0.5)
+    def dispatch(batch):
+        start = time.perf_counter()
+        results = pool.extract(kind, [html for _, html in batch])
+        for (page, html), records in zip(batch, results):
+            _observe_page(kind, start, records)
+            yield page, html, records
+            start = time.perf_counter()
             
-            
-    return pd.DataFrame(quotes_data)
+    batch = []
+    for page, html in pages:
+        if html:
+            batch.append((page, html))
+        if batch and (not html or len(batch) >= pool.batch_pages):
+            yield from dispatch(batch)
+            batch = []
+        if not html:
+            return
+    if batch:
+        yield from dispatch(batch)
 
-def parse_jobs(limit=20, base_url="https://realpython.github.io/fake-jobs/"):
+def _skip_unchanged(pages, crawl, last_page):
     """
-    Scrapes jobs from https://realpython.github.io/fake-jobs/ (single page demo).
+    Drops pages `crawl` (a pipeline.crawl.CrawlState) has already stored
+    unchanged, and stops once it is exhausted. last_page[0] tracks the last
+    page looked at.
+    """
+    for page, html in pages:
+        last_page[0] = page
+        if html and not crawl.check(page, html):
+            if crawl.exhausted:
+                return
+            continue
+        yield page, html
+
+def _iter_paginated(extract, kind, limit, base_url, engine, pool=None, crawl=None):
+    """
+    Yields the record tuples of each listing page until `limit` records
+    have been produced or a page comes back empty.
+    
+    With a CrawlState, unchanged pages are skipped before parsing and a page
+    is committed to the crawl state once its records have been consumed
+    (i.e. saved). If the crawl stops early on unchanged pages, it resumes once
+    from the high-water mark to pick up pages appended since the last run.
+    """
+    remaining = limit
+    start = 1
+    jumped = False
+    while True:
+        last_page = [start - 1]
+        with engine.pages(base_url, start=start) as pages:
+            if crawl is not None:
+                pages = _skip_unchanged(pages, crawl, last_page)
+            for page, html, records in _extract_pages(pages, extract, kind, pool):
+                if records is None:
+                    return
+                complete = len(records) <= remaining
+                records = records[:remaining]
+                if records:
+                    remaining -= len(records)
+                    yield records
+                if crawl is not None and complete:
+                    crawl.commit(page)
+                if remaining <= 0:
+                    return
+        if crawl is None or jumped or not crawl.exhausted or crawl.high_water <= last_page[0]:
+            return
+        start = crawl.high_water
+        jumped = True
+        crawl.restart()
+
+def _iter_frames(pages, fields, categorical=()):
+    """Turns each page's record tuples into a chunk DataFrame."""
+    buffer = ColumnBuffer(fields, categorical)
+    for records in pages:
+        buffer.extend(records)
+        yield buffer.flush()
+
+def concat_chunks(chunks):
+    """
+    Concatenates the chunks of an iter_* stream into one DataFrame.
+    Categorical columns go through union_categoricals, so they stay
+    categorical when later chunks have more categories than earlier ones.
+    """
+    chunks = list(chunks)
+    if not chunks:
+        return pd.DataFrame()
+    columns = {}
+    for column in chunks[0].columns:
+        parts = [chunk[column] for chunk in chunks]
+        if isinstance(parts[0].dtype, pd.CategoricalDtype):
+            columns[column] = union_categoricals(parts)
+        else:
+            columns[column] = pd.concat(parts, ignore_index=True)
+    return pd.DataFrame(columns)
+
+def _collect(pages, fields, categorical=()):
+    """
+    Builds the single DataFrame parse_* return. Records go straight into a
+    ColumnBuffer; no per-page DataFrames are created and concatenated.
+    """
+    buffer = ColumnBuffer(fields, categorical)
+    for records in pages:
+        buffer.extend(records)
+    if not len(buffer):
+        return pd.DataFrame()
+    return buffer.frame()
+
+def _book_pages(limit, base_url, engine, fetcher, backend, pool, crawl):
+    backend = backend or get_backend()
+    engine = engine or AsyncFetchEngine(fetcher=fetcher)
+    return _iter_paginated(backend.extract_books, 'books', limit, base_url, engine, pool, crawl)
+
+def _quote_pages(limit, base_url, engine, fetcher, backend, pool, crawl):
+    backend = backend or get_backend()
+    engine = engine or AsyncFetchEngine(fetcher=fetcher)
+    return _iter_paginated(backend.extract_quotes, 'quotes', limit, base_url, engine, pool, crawl)
+
+def iter_books(limit=20, base_url="http://books.toscrape.com/catalogue/page-{}.html", engine=None, fetcher=None, backend=None, pool=None, crawl=None):
     """
-    jobs_data = []
+    Streams books from a given URL pattern as one small DataFrame per page.
+    Pages are fetched concurrently by `engine` (built around `fetcher` when
+    not given) and parsed in page order by `backend` (see scraper.backends),
+    or on a scraper.workers.ParsePool when `pool` is given. A `crawl`
+    state (pipeline.crawl.CrawlState) makes the crawl incremental.
+    """
+    pages = _book_pages(limit, base_url, engine, fetcher, backend, pool, crawl)
+    return _iter_frames(pages, BOOK_FIELDS, BOOK_CATEGORICAL)
+
+def iter_quotes(limit=20, base_url="http://quotes.toscrape.com/page/{}/", engine=None, fetcher=None, backend=None, pool=None, crawl=None):
+    """
+    Streams quotes from a given URL pattern as one small DataFrame per page.
+    Pages are fetched concurrently by `engine` (built around `fetcher` when
+    not given) and parsed in page order by `backend` (see scraper.backends),
+    or on a scraper.workers.ParsePool when `pool` is given. A `crawl`
+    state (pipeline.crawl.CrawlState) makes the crawl incremental.
+    """
+    pages = _quote_pages(limit, base_url, engine, fetcher, backend, pool, crawl)
+    return _iter_frames(pages, QUOTE_FIELDS, QUOTE_CATEGORICAL)
+
+def _job_pages(limit, base_url, fetcher, backend, chunk_size, crawl):
+    backend = backend or get_backend()
     
     # This site lists all jobs on the main page, so no paging loop strictly needed for the demo main page
     # but we can implement a visual limit
     
-    html = fetch_page(base_url)
-    if html:
-        soup = BeautifulSoup(html, 'html.parser')
-        cards = soup.find_all('div', class_='card')
-        
-        for card in cards:
-            if len(jobs_data) >= limit:
-                break
-                
-            try:
-                title = card.find('h2', class_='title').text.strip()
-                company = card.find('h3', class_='company').text.strip()
-                location = card.find('p', class_='location').text.strip()
-                date_posted = card.find('time').text.strip()
-                
-                jobs_data.append({
-                    'title': title,
-                    'company': company,
-                    'location': location,
-                    'date_posted': date_posted
-                })
-            except AttributeError:
-                continue
-                
-    return pd.DataFrame(jobs_data)
+    html = fetcher.fetch(base_url) if fetcher else fetch_page(base_url)
+    if not html:
+        return
+    if crawl is not None and not crawl.check(1, html):
+        return
+    start = time.perf_counter()
+    jobs_data = backend.extract_jobs(html) or []
+    _observe_page('jobs', start, jobs_data)
+    complete = len(jobs_data) <= limit
+    jobs_data = jobs_data[:limit]
+    for start in range(0, len(jobs_data), chunk_size):
+        yield jobs_data[start:start + chunk_size]
+    if crawl is not None and complete:
+        crawl.commit(1)
+
+def iter_jobs(limit=20, base_url="https://realpython.github.io/fake-jobs/", fetcher=None, backend=None, chunk_size=DEFAULT_CHUNK_SIZE, crawl=None):
+    """
+    Streams jobs from https://realpython.github.io/fake-jobs/ (single page demo)
+    in DataFrame chunks of at most `chunk_size` rows.
+    With a `crawl` state, nothing is parsed when the page is unchanged.
+    """
+    pages = _job_pages(limit, base_url, fetcher, backend, chunk_size, crawl)
+    return _iter_frames(pages, JOB_FIELDS, JOB_CATEGORICAL)
+
+def parse_books(limit=20, base_url="http://books.toscrape.com/catalogue/page-{}.html", engine=None, fetcher=None, backend=None, pool=None):
+    """
+    Scrapes books from a given URL pattern using fetcher.
+    Returns the whole result as one DataFrame; see iter_books for streaming.
+    """
+    return _collect(_book_pages(limit, base_url, engine, fetcher, backend, pool, None), BOOK_FIELDS, BOOK_CATEGORICAL)
+
+def parse_quotes(limit=20, base_url="http://quotes.toscrape.com/page/{}/", engine=None, fetcher=None, backend=None, pool=None):
+    """
+    Scrapes quotes from a given URL pattern using fetcher.
+    Returns the whole result as one DataFrame; see iter_quotes for streaming.
+    """
+    return _collect(_quote_pages(limit, base_url, engine, fetcher, backend, pool, None), QUOTE_FIELDS, QUOTE_CATEGORICAL)
+
+def parse_jobs(limit=20, base_url="https://realpython.github.io/fake-jobs/", fetcher=None, backend=None):
+    """
+    Scrapes jobs from https://realpython.github.io/fake-jobs/ (single page demo).
+    """
+    return _collect(_job_pages(limit, base_url, fetcher, backend, DEFAULT_CHUNK_SIZE, None), JOB_FIELDS, JOB_CATEGORICAL)
@@ -0,0 +1,74 @@
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+from scraper.backends import get_backend
+
+# How worker processes are started. Forking would copy the calling process
+# mid-flight (Streamlit and job threads, held locks, open SQLite
+# connections) into the workers, so they are started clean instead.
+START_METHOD = "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn"
+
+# Backend instance per worker process, created on first use
+_worker_backends = {}
+
+def _extract_page(kind, backend_name, html):
+    """
+    Runs in a worker process: raw HTML in, list of record tuples out
+    (None when the page has no record containers, like the backends).
+    """
+    backend = _worker_backends.get(backend_name)
+    if backend is None:
+        backend = _worker_backends[backend_name] = get_backend(backend_name)
+    return getattr(backend, f"extract_{kind}")(html)
+
+
+class ParsePool:
+    """
+    Optional process pool for the CPU-bound HTML extraction step.
+    
+    Pages are handed over as raw HTML and come back as compact record tuples
+    (not DataFrames), in the same order they were submitted, so `limit`
+    truncation keeps returning the same first N items.
+    
+    Args:
+        workers (int): Worker processes. Defaults to os.cpu_count().
+        chunksize (int): Pages sent to a worker per task.
+        backend (str): Parsing backend name used inside the workers.
+        
+    Workers are started with START_METHOD, never forked from the caller.
+    """
+    
+    def __init__(self, workers=None, chunksize=1, backend=None):
+        self.workers = workers or os.cpu_count() or 1
+        self.chunksize = max(1, int(chunksize))
+        self.backend_name = backend or get_backend().name
+        self._executor = None
+        
+    @property
+    def batch_pages(self):
+        """Pages gathered before a batch is dispatched to the workers."""
+        return self.workers * self.chunksize
+        
+    def extract(self, kind, htmls):
+        """
+        Extracts records from a batch of pages in parallel.
+        Returns an iterator of per-page results in input order.
+        """
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.workers, mp_context=multiprocessing.get_context(START_METHOD)
+            )
+        fn = partial(_extract_page, kind, self.backend_name)
+        return self._executor.map(fn, htmls, chunksize=self.chunksize)
+        
+    def close(self):
+        if self._executor is not None:
+            self._executor.shutdown(cancel_futures=True)
+            self._executor = None
+            
+    def __enter__(self):
+        return self
+        
+    def __exit__(self, *exc):
+        self.close()
@@ -1,68 +1,916 @@
 import pandas as pd
-import streamlit as st
+import numpy as np
 import sqlite3
 import os
+import csv
+import gzip
+import io
+import json
+import tempfile
+import re
+import functools
+import sys
+import threading
+import contextlib
+import time
 from datetime import datetime
 
+from monitoring.metrics import counter, histogram
+from scraper.cleaner import BOOK_KEY, QUOTE_KEY, JOB_KEY, add_record_hashes, clean_rating_series
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:  # pragma: no cover - optional dependency
+    pa = None
+
 # Path to the SQLite database
 BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 DB_PATH = os.path.join(BASE_DIR, "data_pipeline.db")
 DB_NAME = "SQLite (data_pipeline.db)"
 
+# Upper bound of rows written per transaction by save_stream
+DEFAULT_BATCH_SIZE = 500
+
+# Applied to every connection opened by get_db() and read_db(). WAL lets dashboard reads run
+# alongside pipeline writes; busy_timeout absorbs the short writer overlaps.
+PRAGMAS = {
+    "journal_mode": "WAL",
+    "synchronous": "NORMAL",
+    "mmap_size": 256 * 1024 * 1024,
+    "cache_size": -64 * 1024,     # negative = KiB, i.e. 64 MiB page cache
+    "temp_store": "MEMORY",
+    "busy_timeout": 5000,
+}
+# Column definitions of the scraped tables. Rows are identified by key_hash,
+# a 64-bit hash of the natural key (CONFLICT_KEYS); content_hash covers the
+# other columns. Both come from scraper.cleaner.add_record_hashes.
+TABLES = {
+    "scraped_books": """
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        title TEXT,
+        price REAL,
+        rating INTEGER,
+        availability TEXT,
+        scraped_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        key_hash INTEGER,
+        content_hash INTEGER
+    """,
+    "scraped_quotes": """
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        text TEXT,
+        author TEXT,
+        tags TEXT,
+        scraped_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        key_hash INTEGER,
+        content_hash INTEGER
+    """,
+    "scraped_jobs": """
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        title TEXT,
+        company TEXT,
+        location TEXT,
+        date_posted TEXT,
+        scraped_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        key_hash INTEGER,
+        content_hash INTEGER
+    """,
+}
+# Natural keys hashed into key_hash, the upsert conflict target
+CONFLICT_KEYS = {
+    "scraped_books": BOOK_KEY,
+    "scraped_quotes": QUOTE_KEY,
+    "scraped_jobs": JOB_KEY,
+}
+# Bookkeeping columns left out of loaded frames and exports
+HASH_COLUMNS = ("key_hash", "content_hash")
+
+# pandas dtypes of the columns in loaded frames (see apply_dtypes); the
+# others keep read_sql's str/float64. Low-cardinality text is categorical,
+# ratings are nullable small integers (stored as INTEGER, see TABLES).
+DTYPES = {
+    "scraped_books": {"rating": "Int8", "availability": "category", "scraped_at": "datetime64[us]"},
+    "scraped_quotes": {"author": "category", "scraped_at": "datetime64[us]"},
+    "scraped_jobs": {"company": "category", "location": "category", "scraped_at": "datetime64[us]"},
+}
+# Cleaners save_data runs on integer DTYPES columns that arrive uncleaned:
+# text ('3', 'Unknown') and out-of-range numbers (3.5, 7) become Int8 or NULL
+INTEGER_CLEANERS = {
+    "scraped_books": {"rating": clean_rating_series},
+}
+
+# Columns indexed by the FTS5 table `<collection>_fts`, kept in sync by triggers
+FTS_COLUMNS = {
+    "scraped_books": ("title",),
+    "scraped_quotes": ("text", "author", "tags"),
+    "scraped_jobs": ("title", "company", "location"),
+}
+
+# Secondary indexes backing the dashboard's range/equality filters
+INDEXES = {
+    "scraped_books": ("price", "rating", "scraped_at"),
+    "scraped_quotes": ("author", "scraped_at"),
+    "scraped_jobs": ("company", "scraped_at"),
+}
+
+# Export formats: format -> (file extension, MIME type)
+EXPORT_FORMATS = {
+    "csv": (".csv", "text/csv"),
+    "csv.gz": (".csv.gz", "application/gzip"),
+    "parquet": (".parquet", "application/vnd.apache.parquet"),
+}
+# Rows fetched from the cursor per export chunk; bounds the export's memory use
+EXPORT_CHUNK_SIZE = 10_000
+
+STORE_SECONDS = histogram("pipeline_store_seconds", "save_data transaction time (upsert to commit).", ("table",))
+STORE_ROWS = counter("pipeline_store_rows_total", "Rows passed to save_data, by outcome.", ("table", "outcome"))
+STORE_ERRORS = counter("pipeline_store_errors_total", "save_data calls that failed.", ("table",))
+
+# Cached reads kept per function; entries for outdated data versions age out
+CACHE_ENTRIES = 64
+
+# Prepared statements kept per connection (sqlite3's statement cache)
+STATEMENT_CACHE_SIZE = 256
+
+# Idle read connections kept per database file (see read_db)
+READ_POOL_SIZE = 4
+
+_local = threading.local()
+_read_pool = {}
+_read_lock = threading.Lock()
+_initialized = set()
+_init_lock = threading.Lock()
+
+def _cache_data(**options):
+    """
+    st.cache_data, applied lazily. Inside a Streamlit app (streamlit already
+    imported) the function is cached by Streamlit; in scripts and the CLI it
+    is called directly, so importing this module never imports Streamlit.
+    """
+    def decorator(func):
+        cached = None
+        
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            nonlocal cached
+            st = sys.modules.get("streamlit")
+            if st is None:
+                return func(*args, **kwargs)
+            if cached is None:
+                cached = st.cache_data(**options)(func)
+            return cached(*args, **kwargs)
+        return wrapper
+    return decorator
+
 def get_db():
-    """Connect to SQLite and return the connection object."""
-    return sqlite3.connect(DB_PATH, check_same_thread=False)
+    """
+    Return this thread's shared SQLite connection, opening it on first use.
+    Use it as a context manager (`with get_db() as conn:`) to get a
+    transaction that commits on success and rolls back on error.
+    """
+    connections = getattr(_local, "connections", None)
+    if connections is None:
+        connections = _local.connections = {}
+        
+    conn = connections.get(DB_PATH)
+    if conn is None:
+        conn = connections[DB_PATH] = _connect(DB_PATH)
+    return conn
+
+def _connect(path):
+    conn = sqlite3.connect(path, check_same_thread=False, cached_statements=STATEMENT_CACHE_SIZE)
+    for pragma, value in PRAGMAS.items():
+        conn.execute(f"PRAGMA {pragma} = {value}")
+    return conn
+
+@contextlib.contextmanager
+def read_db():
+    """
+    Borrow a read-only connection from the process-wide pool:
+    `with read_db() as conn:`. Streamlit runs every rerun (and fragment
+    tick) on a new thread, so the readers share these instead of opening
+    a get_db() connection per thread; writers keep using get_db().
+    Up to READ_POOL_SIZE idle connections are kept per database file.
+    """
+    path = DB_PATH
+    with _read_lock:
+        idle = _read_pool.setdefault(path, [])
+        conn = idle.pop() if idle else None
+    if conn is None:
+        conn = _connect(path)
+        conn.execute("PRAGMA query_only = ON")
+    try:
+        yield conn
+    finally:
+        # End the read transaction so the pooled connection holds no snapshot
+        conn.rollback()
+        with _read_lock:
+            idle = _read_pool.setdefault(path, [])
+            if len(idle) < READ_POOL_SIZE:
+                idle.append(conn)
+                conn = None
+        if conn is not None:
+            conn.close()
+
+def close_db():
+    """Close the connections opened by the current thread and the idle read connections."""
+    connections = getattr(_local, "connections", None) or {}
+    for conn in connections.values():
+        conn.close()
+    connections.clear()
+    with _read_lock:
+        idle = [conn for pool in _read_pool.values() for conn in pool]
+        _read_pool.clear()
+    for conn in idle:
+        conn.close()
+
+def _has_unique_key(cursor, collection_name, keys):
+    """True if some UNIQUE constraint/index covers exactly `keys`."""
+    for index in cursor.execute(f"PRAGMA index_list({collection_name})").fetchall():
+        name, unique = index[1], index[2]
+        if unique:
+            cols = tuple(row[2] for row in cursor.execute(f"PRAGMA index_info('{name}')").fetchall())
+            if cols == tuple(keys):
+                return True
+    return False
+
+def _retyped_columns(cursor, collection_name):
+    """Columns whose declared type differs from TABLES (e.g. a TEXT rating)."""
+    declared = f"declared_{collection_name}"
+    cursor.execute(f"CREATE TEMP TABLE {declared} ({TABLES[collection_name]})")
+    types = {row[1]: row[2] for row in cursor.execute(f"PRAGMA temp.table_info({declared})").fetchall()}
+    cursor.execute(f"DROP TABLE temp.{declared}")
+    return [
+        row[1] for row in cursor.execute(f"PRAGMA main.table_info({collection_name})").fetchall()
+        if row[1] in types and types[row[1]] != row[2]
+    ]
+
+def _ensure_key_hashes(cursor):
+    """
+    Bring tables created by older versions to the current layout: add and
+    backfill the hash columns, rebuild tables that still carry a UNIQUE
+    constraint on the natural key (a long-text B-tree the upsert no longer
+    needs) or declare other column types than TABLES, drop rows with
+    duplicate keys (keeping the latest) and add the unique key_hash index
+    save_data upserts on.
+    """
+    for collection_name, keys in CONFLICT_KEYS.items():
+        table_cols = [row[1] for row in cursor.execute(f"PRAGMA table_info({collection_name})").fetchall()]
+        retyped = _retyped_columns(cursor, collection_name)
+        if retyped or _has_unique_key(cursor, collection_name, keys):
+            _rebuild_table(cursor, collection_name, retyped)
+        elif "key_hash" not in table_cols:
+            for col in HASH_COLUMNS:
+                cursor.execute(f"ALTER TABLE {collection_name} ADD COLUMN {col} INTEGER")
+        if retyped or "key_hash" not in table_cols:
+            # Hashes of converted values differ from those of the old ones
+            _backfill_hashes(cursor, collection_name, keys)
+        if not _has_unique_key(cursor, collection_name, ("key_hash",)):
+            cursor.execute(f"""
+                DELETE FROM {collection_name}
+                WHERE id NOT IN (SELECT MAX(id) FROM {collection_name} GROUP BY key_hash)
+            """)
+            cursor.execute(
+                f"CREATE UNIQUE INDEX IF NOT EXISTS ux_{collection_name}_key_hash ON {collection_name} (key_hash)"
+            )
+
+def _backfill_hashes(cursor, collection_name, keys):
+    """Compute key_hash/content_hash for existing rows, EXPORT_CHUNK_SIZE rows at a time."""
+    last_id = 0
+    while True:
+        df = pd.read_sql_query(
+            f"SELECT * FROM {collection_name} WHERE id > ? ORDER BY id LIMIT ?",
+            cursor.connection,
+            params=(last_id, EXPORT_CHUNK_SIZE),
+        )
+        if df.empty:
+            return
+        add_record_hashes(df, keys)
+        cursor.executemany(
+            f"UPDATE {collection_name} SET key_hash = ?, content_hash = ? WHERE id = ?",
+            zip(df["key_hash"].tolist(), df["content_hash"].tolist(), df["id"].tolist()),
+        )
+        last_id = int(df["id"].iloc[-1])
+
+def _rebuild_table(cursor, collection_name, retyped=()):
+    """
+    Recreate a table from its TABLES definition, keeping rows and ids
+    (SQLite cannot drop a UNIQUE constraint or change a column type in
+    place). Values of `retyped` columns are converted by the new column's
+    affinity; text left over in a numeric column ('Unknown' in the INTEGER
+    rating) becomes NULL. The old table's indexes and triggers go with it;
+    the _ensure_* steps run after this one recreate them.
+    """
+    rebuilt = f"{collection_name}_rebuild"
+    old_cols = {row[1] for row in cursor.execute(f"PRAGMA table_info({collection_name})").fetchall()}
+    cursor.execute(f"DROP TABLE IF EXISTS {rebuilt}")
+    cursor.execute(f"CREATE TABLE {rebuilt} ({TABLES[collection_name]})")
+    new_cols = cursor.execute(f"PRAGMA table_info({rebuilt})").fetchall()
+    cols = ", ".join(row[1] for row in new_cols if row[1] in old_cols)
+    seq = cursor.execute("SELECT seq FROM sqlite_sequence WHERE name = ?", (collection_name,)).fetchone()
+    cursor.execute(f"INSERT INTO {rebuilt} ({cols}) SELECT {cols} FROM {collection_name}")
+    for name, declared in ((row[1], row[2].upper()) for row in new_cols if row[1] in retyped):
+        if any(t in declared for t in ("INT", "REAL", "FLOA", "DOUB")):
+            cursor.execute(f"UPDATE {rebuilt} SET {name} = NULL WHERE typeof({name}) = 'text'")
+    cursor.execute(f"DROP TABLE {collection_name}")
+    cursor.execute(f"ALTER TABLE {rebuilt} RENAME TO {collection_name}")
+    if seq:
+        # Keep AUTOINCREMENT from reusing ids of rows deleted before the rebuild
+        cursor.execute(
+            "UPDATE sqlite_sequence SET seq = MAX(seq, ?) WHERE name = ?", (seq[0], collection_name)
+        )
+
+def _ensure_indexes(cursor):
+    """Create the declared INDEXES (idx_<collection>_<column>)."""
+    for collection_name, cols in INDEXES.items():
+        for col in cols:
+            cursor.execute(
+                f"CREATE INDEX IF NOT EXISTS idx_{collection_name}_{col} ON {collection_name} ({col})"
+            )
+
+def split_tags(tags):
+    """Split a stored comma-joined tag string into a list of tags."""
+    if not isinstance(tags, str) or not tags:
+        return []
+    return [t.strip() for t in tags.split(',') if t.strip()]
+
+def _ensure_quote_tags(cursor):
+    """
+    Create the normalized quote_tags table (one row per quote/tag) and the
+    triggers that drop a quote's tag rows when its tags change or the quote
+    is deleted. save_data inserts the new rows. Backfills existing quotes
+    the first time.
+    """
+    exists = cursor.execute(
+        "SELECT 1 FROM sqlite_master WHERE type='table' AND name='quote_tags'"
+    ).fetchone()
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS quote_tags (
+            quote_id INTEGER NOT NULL REFERENCES scraped_quotes(id),
+            position INTEGER NOT NULL,
+            tag TEXT NOT NULL COLLATE NOCASE,
+            PRIMARY KEY (quote_id, tag)
+        ) WITHOUT ROWID
+    """)
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_quote_tags_tag ON quote_tags (tag, quote_id)")
+    cursor.execute("""
+        CREATE TRIGGER IF NOT EXISTS quote_tags_au AFTER UPDATE OF tags ON scraped_quotes
+        WHEN old.tags IS NOT new.tags BEGIN
+            DELETE FROM quote_tags WHERE quote_id = old.id;
+        END
+    """)
+    cursor.execute("""
+        CREATE TRIGGER IF NOT EXISTS quote_tags_ad AFTER DELETE ON scraped_quotes BEGIN
+            DELETE FROM quote_tags WHERE quote_id = old.id;
+        END
+    """)
+    if not exists:
+        _insert_quote_tags(cursor, cursor.execute("SELECT id, tags FROM scraped_quotes").fetchall())
+
+def _insert_quote_tags(cursor, rows):
+    """Add quote_tags rows for (quote_id, tags_string) pairs; existing ones are kept."""
+    cursor.executemany(
+        "INSERT OR IGNORE INTO quote_tags (quote_id, position, tag) VALUES (?, ?, ?)",
+        ((quote_id, position, tag) for quote_id, tags in rows for position, tag in enumerate(split_tags(tags))),
+    )
+
+def _sync_quote_tags(cursor, key_hashes):
+    """Bring quote_tags up to date for the quotes just upserted (by key_hash)."""
+    key_hashes = list(key_hashes)
+    for start in range(0, len(key_hashes), DEFAULT_BATCH_SIZE):
+        chunk = key_hashes[start:start + DEFAULT_BATCH_SIZE]
+        placeholders = ", ".join(["?"] * len(chunk))
+        rows = cursor.execute(
+            f"SELECT id, tags FROM scraped_quotes WHERE key_hash IN ({placeholders})", chunk
+        ).fetchall()
+        _insert_quote_tags(cursor, rows)
+
+def get_tag_counts(limit=0):
+    """
+    Number of quotes per tag, aggregated in SQL from quote_tags.
+    Returns a DataFrame with 'tag' and 'count', most used first.
+    """
+    limit_sql = f" LIMIT {int(limit)}" if limit > 0 else ""
+    try:
+        with read_db() as conn:
+            return pd.read_sql_query(
+                f"SELECT tag, COUNT(*) AS count FROM quote_tags GROUP BY tag ORDER BY count DESC, tag{limit_sql}",
+                conn,
+            )
+    except Exception as e:
+        print(f"Error counting tags: {e}")
+        return pd.DataFrame()
+
+# Prices are averaged from whole cents, an exact integer sum, so the SQL,
+# summary and pandas paths agree to the last bit whatever the summation
+# order. The rounding is spelled out (half away from zero) so price_cents()
+# can evaluate the same floating point operations.
+PRICE_CENTS_SQL = "CAST({0} * 100 + (CASE WHEN {0} < 0 THEN -0.5 ELSE 0.5 END) AS INTEGER)"
+
+def price_cents(prices):
+    """PRICE_CENTS_SQL for a Series of prices (NaN stays NaN)."""
+    cents = prices.astype(float) * 100
+    return np.trunc(cents + np.where(cents < 0, -0.5, 0.5))
+
+# The columns each summary table needs; an older layout is recreated
+SUMMARY_COLUMNS = {
+    "book_rating_stats": {"rating": "INTEGER", "n": "INTEGER", "price_n": "INTEGER",
+                          "price_cents": "INTEGER", "title_n": "INTEGER"},
+    "quote_author_stats": {"author": "TEXT", "missing": "INTEGER", "n": "INTEGER", "first_id": "INTEGER"},
+}
+
+def _ensure_summaries(cursor):
+    """
+    Create the summary tables behind the analytics dashboard and the
+    triggers that keep them current. Every insert, update or delete on the
+    source table adjusts its group in the same transaction, so save_data and
+    clear_data need no extra work. Backfills from existing rows the first time.
+
+    book_rating_stats: per rating (0 for books without one), row count,
+        non-null price count and sum in cents, non-null title count.
+    quote_author_stats: per author (missing=1 for quotes without one),
+        quote count and the lowest id, which orders ties like the table.
+    """
+    rebuild = False
+    for table, columns in SUMMARY_COLUMNS.items():
+        found = dict(cursor.execute(f"SELECT name, type FROM pragma_table_info('{table}')").fetchall())
+        if found != columns:
+            # Missing, or the layout of an older version: recreate and backfill
+            cursor.execute(f"DROP TABLE IF EXISTS {table}")
+            for suffix in ("ai", "ad", "au"):
+                cursor.execute(f"DROP TRIGGER IF EXISTS {table}_{suffix}")
+            rebuild = True
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS book_rating_stats (
+            rating INTEGER PRIMARY KEY,
+            n INTEGER NOT NULL,
+            price_n INTEGER NOT NULL,
+            price_cents INTEGER NOT NULL,
+            title_n INTEGER NOT NULL
+        )
+    """)
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS quote_author_stats (
+            author TEXT NOT NULL,
+            missing INTEGER NOT NULL,
+            n INTEGER NOT NULL,
+            first_id INTEGER,
+            PRIMARY KEY (author, missing)
+        )
+    """)
+
+    new_cents, old_cents = PRICE_CENTS_SQL.format("new.price"), PRICE_CENTS_SQL.format("old.price")
+    add_book = f"""
+        INSERT INTO book_rating_stats (rating, n, price_n, price_cents, title_n)
+        VALUES (IFNULL(new.rating, 0), 1, new.price IS NOT NULL, IFNULL({new_cents}, 0), new.title IS NOT NULL)
+        ON CONFLICT(rating) DO UPDATE SET
+            n = n + 1, price_n = price_n + excluded.price_n,
+            price_cents = price_cents + excluded.price_cents, title_n = title_n + excluded.title_n;
+    """
+    remove_book = f"""
+        UPDATE book_rating_stats SET
+            n = n - 1, price_n = price_n - (old.price IS NOT NULL),
+            price_cents = price_cents - IFNULL({old_cents}, 0), title_n = title_n - (old.title IS NOT NULL)
+        WHERE rating = IFNULL(old.rating, 0);
+        DELETE FROM book_rating_stats WHERE rating = IFNULL(old.rating, 0) AND n <= 0;
+    """
+    add_quote = """
+        INSERT INTO quote_author_stats (author, missing, n, first_id)
+        VALUES (IFNULL(new.author, ''), new.author IS NULL, 1, new.id)
+        ON CONFLICT(author, missing) DO UPDATE SET n = n + 1, first_id = MIN(first_id, excluded.first_id);
+    """
+    # Removing the first quote of an author looks up the next one (author is indexed)
+    remove_quote = """
+        UPDATE quote_author_stats SET
+            n = n - 1,
+            first_id = CASE WHEN first_id = old.id
+                THEN (SELECT MIN(id) FROM scraped_quotes WHERE author IS old.author)
+                ELSE first_id END
+        WHERE author = IFNULL(old.author, '') AND missing = (old.author IS NULL);
+        DELETE FROM quote_author_stats
+        WHERE author = IFNULL(old.author, '') AND missing = (old.author IS NULL) AND n <= 0;
+    """
+    triggers = {
+        "book_rating_stats_ai": ("AFTER INSERT ON scraped_books", add_book),
+        "book_rating_stats_ad": ("AFTER DELETE ON scraped_books", remove_book),
+        "book_rating_stats_au": ("AFTER UPDATE OF rating, price, title ON scraped_books", remove_book + add_book),
+        "quote_author_stats_ai": ("AFTER INSERT ON scraped_quotes", add_quote),
+        "quote_author_stats_ad": ("AFTER DELETE ON scraped_quotes", remove_quote),
+        "quote_author_stats_au": ("AFTER UPDATE OF author ON scraped_quotes", remove_quote + add_quote),
+    }
+    for name, (event, body) in triggers.items():
+        cursor.execute(f"CREATE TRIGGER IF NOT EXISTS {name} {event} BEGIN {body} END")
+
+    if rebuild:
+        rebuild_summaries(cursor)
+
+def rebuild_summaries(cursor=None):
+    """
+    Recompute the summary tables from the source tables, e.g. after the
+    triggers were disabled for a bulk load.
+    """
+    if cursor is None:
+        with get_db() as conn:
+            rebuild_summaries(conn.cursor())
+            conn.commit()
+        return
+    cursor.execute("DELETE FROM book_rating_stats")
+    cursor.execute(f"""
+        INSERT INTO book_rating_stats (rating, n, price_n, price_cents, title_n)
+        SELECT IFNULL(rating, 0), COUNT(*), COUNT(price), IFNULL(SUM({PRICE_CENTS_SQL.format("price")}), 0), COUNT(title)
+        FROM scraped_books GROUP BY IFNULL(rating, 0)
+    """)
+    cursor.execute("DELETE FROM quote_author_stats")
+    cursor.execute("""
+        INSERT INTO quote_author_stats (author, missing, n, first_id)
+        SELECT IFNULL(author, ''), author IS NULL, COUNT(*), MIN(id)
+        FROM scraped_quotes GROUP BY IFNULL(author, ''), author IS NULL
+    """)
+
+def load_summary(name):
+    """
+    Read a summary table maintained by _ensure_summaries
+    ('book_rating_stats' or 'quote_author_stats'). Its size is the number
+    of groups, not the number of rows.
+    """
+    if name not in ("book_rating_stats", "quote_author_stats"):
+        raise ValueError(f"Unknown summary table '{name}'")
+    try:
+        with read_db() as conn:
+            return pd.read_sql_query(f"SELECT * FROM {name}", conn)
+    except Exception as e:
+        print(f"Error loading summary {name}: {e}")
+        return pd.DataFrame()
+
+def load_top(collection_name, column, limit=5, columns=None):
+    """
+    The `limit` rows with the largest `column` values, read through the
+    column's index (see INDEXES) instead of sorting the table. Ties keep
+    table order (lowest id first), as DataFrame.nlargest does.
+    """
+    try:
+        with read_db() as conn:
+            select_sql = _select_columns(conn.cursor(), collection_name, columns, prefix="")
+            df = pd.read_sql_query(
+                f"SELECT {select_sql} FROM {collection_name} WHERE {column} IS NOT NULL "
+                f"ORDER BY {column} DESC, id LIMIT ?",
+                conn,
+                params=(int(limit),),
+            )
+            return apply_dtypes(df, collection_name)
+    except Exception as e:
+        print(f"Error loading top rows of {collection_name}: {e}")
+        return pd.DataFrame()
+
+def _record_columns(cursor, collection_name):
+    """A table's data columns: everything but id and HASH_COLUMNS."""
+    return [
+        row[1] for row in cursor.execute(f"PRAGMA table_info({collection_name})").fetchall()
+        if row[1] != "id" and row[1] not in HASH_COLUMNS
+    ]
+
+def _ensure_history(cursor):
+    """
+    Create record_history and the triggers that keep it. Whenever an upsert
+    changes a row's content (its content_hash), the values it replaced are
+    appended as a JSON object, with the row's id and key_hash and the time
+    of the change. This is the price/availability-over-time record.
+    A trigger written for another column set (e.g. before a migration
+    added a column) is replaced.
+    """
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS record_history (
+            id INTEGER PRIMARY KEY,
+            collection TEXT NOT NULL,
+            record_id INTEGER NOT NULL,
+            key_hash INTEGER,
+            old_values TEXT NOT NULL,
+            changed_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    """)
+    cursor.execute(
+        "CREATE INDEX IF NOT EXISTS idx_record_history_record ON record_history (collection, record_id)"
+    )
+    for collection_name in TABLES:
+        name = f"{collection_name}_history_au"
+        old_values = ", ".join(f"'{c}', old.{c}" for c in _record_columns(cursor, collection_name))
+        sql = f"""
+            CREATE TRIGGER {name} AFTER UPDATE OF content_hash ON {collection_name}
+            WHEN old.content_hash IS NOT new.content_hash AND old.content_hash IS NOT NULL BEGIN
+                INSERT INTO record_history (collection, record_id, key_hash, old_values)
+                VALUES ('{collection_name}', old.id, old.key_hash, json_object({old_values}));
+            END
+        """.strip()
+        # sqlite_master keeps the statement verbatim, so any other column list shows up here
+        current = cursor.execute("SELECT sql FROM sqlite_master WHERE type = 'trigger' AND name = ?", (name,)).fetchone()
+        if current is None or current[0] != sql:
+            cursor.execute(f"DROP TRIGGER IF EXISTS {name}")
+            cursor.execute(sql)
+
+def load_history(collection_name, record_id=None, limit=0):
+    """
+    Earlier versions of a table's rows, most recent change first.
+    Returns a DataFrame with 'record_id' (the row's id), 'changed_at' (when
+    the values were replaced) and one column per table column holding the
+    replaced value. Pass record_id to get the history of a single row.
+    """
+    try:
+        with read_db() as conn:
+            cursor = conn.cursor()
+            values = ", ".join(
+                f"json_extract(old_values, '$.{c}') AS {c}" for c in _record_columns(cursor, collection_name)
+            )
+            where_sql = "collection = ?"
+            params = [collection_name]
+            if record_id is not None:
+                where_sql += " AND record_id = ?"
+                params.append(int(record_id))
+            limit_sql = f" LIMIT {int(limit)}" if limit > 0 else ""
+            df = pd.read_sql_query(
+                f"SELECT record_id, changed_at, {values} FROM record_history "
+                f"WHERE {where_sql} ORDER BY id DESC{limit_sql}",
+                conn,
+                params=params,
+            )
+            apply_dtypes(df, collection_name)
+            if collection_name == 'scraped_quotes' and 'tags' in df.columns:
+                df['tags'] = df['tags'].apply(split_tags)
+            return df
+    except Exception as e:
+        print(f"Error loading history of {collection_name}: {e}")
+        return pd.DataFrame()
+
+def _ensure_data_versions(cursor):
+    """Create data_versions: one write counter per table, see get_data_version."""
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS data_versions (
+            collection TEXT PRIMARY KEY,
+            version INTEGER NOT NULL
+        )
+    """)
+
+def _bump_data_version(cursor, collection_name):
+    """Mark a table as changed; call inside the writing transaction."""
+    cursor.execute(
+        "INSERT INTO data_versions (collection, version) VALUES (?, 1) "
+        "ON CONFLICT(collection) DO UPDATE SET version = version + 1",
+        (collection_name,),
+    )
+
+def get_data_version(collection_name):
+    """
+    Counter bumped by every save_data/clear_data that changes the table.
+    The cached readers are keyed on it, so they stay cached until a write
+    and are invalidated right after one, even when another process wrote.
+    """
+    try:
+        with read_db() as conn:
+            row = conn.execute(
+                "SELECT version FROM data_versions WHERE collection = ?", (collection_name,)
+            ).fetchone()
+        return row[0] if row else 0
+    except sqlite3.Error:
+        return 0
+
+def _ensure_crawl_state(cursor):
+    """
+    Create the incremental crawl state: a content hash per fetched page URL
+    and the highest page with records per URL template (high-water mark).
+    Rows are tagged with the table they feed so clear_data can reset them.
+    """
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS crawl_pages (
+            url TEXT PRIMARY KEY,
+            collection TEXT NOT NULL,
+            page INTEGER,
+            content_hash TEXT NOT NULL,
+            seen_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    """)
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS crawl_sources (
+            base_url TEXT PRIMARY KEY,
+            collection TEXT NOT NULL,
+            high_water INTEGER NOT NULL DEFAULT 0,
+            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    """)
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_crawl_pages_collection ON crawl_pages (collection)")
+
+def get_page_hash(url):
+    """Content hash stored for a page URL by save_page_hash, or None."""
+    row = get_db().execute("SELECT content_hash FROM crawl_pages WHERE url = ?", (url,)).fetchone()
+    return row[0] if row else None
+
+def get_high_water(base_url):
+    """Highest page number with records seen for a URL template (0 if none)."""
+    row = get_db().execute("SELECT high_water FROM crawl_sources WHERE base_url = ?", (base_url,)).fetchone()
+    return row[0] if row else 0
+
+def save_page_hash(collection_name, base_url, url, page, content_hash):
+    """
+    Record a page's content hash once its records are stored, and raise the
+    template's high-water mark to `page`.
+    """
+    with get_db() as conn:
+        conn.execute(
+            "INSERT INTO crawl_pages (url, collection, page, content_hash) VALUES (?, ?, ?, ?) "
+            "ON CONFLICT(url) DO UPDATE SET page = excluded.page, content_hash = excluded.content_hash, "
+            "seen_at = CURRENT_TIMESTAMP",
+            (url, collection_name, page, content_hash),
+        )
+        conn.execute(
+            "INSERT INTO crawl_sources (base_url, collection, high_water) VALUES (?, ?, ?) "
+            "ON CONFLICT(base_url) DO UPDATE SET high_water = MAX(high_water, excluded.high_water), "
+            "updated_at = CURRENT_TIMESTAMP",
+            (base_url, collection_name, page),
+        )
+        conn.commit()
+
+# Progress counters stored on pipeline_jobs rows (run_pipeline's stats keys)
+JOB_COUNTERS = ("pages", "pages_skipped", "items_parsed", "rows_written", "inserted", "updated", "unchanged", "batches")
+JOB_FIELDS = ("status", "owner", "error", "started_at", "finished_at") + JOB_COUNTERS
+
+def _ensure_jobs(cursor):
+    """Create pipeline_jobs, the persisted queue used by pipeline.jobs."""
+    counters = ",\n".join(f"{c} INTEGER NOT NULL DEFAULT 0" for c in JOB_COUNTERS)
+    cursor.execute(f"""
+        CREATE TABLE IF NOT EXISTS pipeline_jobs (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            source TEXT NOT NULL,
+            params TEXT NOT NULL,
+            status TEXT NOT NULL DEFAULT 'queued',
+            owner TEXT,
+            error TEXT,
+            {counters},
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            started_at TIMESTAMP,
+            finished_at TIMESTAMP
+        )
+    """)
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_pipeline_jobs_status ON pipeline_jobs (status)")
+    existing = {row[1] for row in cursor.execute("PRAGMA table_info(pipeline_jobs)").fetchall()}
+    for counter in JOB_COUNTERS:
+        if counter not in existing:
+            cursor.execute(f"ALTER TABLE pipeline_jobs ADD COLUMN {counter} INTEGER NOT NULL DEFAULT 0")
+
+def _job_dict(cursor, row):
+    job = dict(zip([d[0] for d in cursor.description], row))
+    job["params"] = json.loads(job["params"])
+    return job
+
+def enqueue_job(source, params):
+    """
+    Add a queued pipeline job. `params` are run_pipeline keyword arguments
+    and must be JSON-serializable. Returns the job id.
+    """
+    with get_db() as conn:
+        cursor = conn.execute(
+            "INSERT INTO pipeline_jobs (source, params) VALUES (?, ?)", (source, json.dumps(params))
+        )
+        conn.commit()
+        return cursor.lastrowid
+
+def claim_job(owner):
+    """
+    Atomically mark the oldest queued job as running for `owner` and return
+    it as a dict, or None when the queue is empty. Safe across threads and
+    processes sharing the database.
+    """
+    conn = get_db()
+    try:
+        conn.execute("BEGIN IMMEDIATE")
+        cursor = conn.execute(
+            "SELECT * FROM pipeline_jobs WHERE status = 'queued' ORDER BY id LIMIT 1"
+        )
+        row = cursor.fetchone()
+        if row is None:
+            conn.rollback()
+            return None
+        job = _job_dict(cursor, row)
+        conn.execute(
+            "UPDATE pipeline_jobs SET status = 'running', owner = ?, started_at = CURRENT_TIMESTAMP WHERE id = ?",
+            (owner, job["id"]),
+        )
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    job.update(status="running", owner=owner)
+    return job
+
+def update_job(job_id, **fields):
+    """Set columns of a job row (names from JOB_FIELDS; others are ignored)."""
+    fields = {k: v for k, v in fields.items() if k in JOB_FIELDS}
+    if not fields:
+        return
+    assignments = ", ".join(f"{k} = ?" for k in fields)
+    with get_db() as conn:
+        conn.execute(f"UPDATE pipeline_jobs SET {assignments} WHERE id = ?", (*fields.values(), job_id))
+        conn.commit()
+
+def finish_job(job_id, status, error=None):
+    """Mark a job 'done' or 'failed' and stamp finished_at."""
+    with get_db() as conn:
+        conn.execute(
+            "UPDATE pipeline_jobs SET status = ?, error = ?, finished_at = CURRENT_TIMESTAMP WHERE id = ?",
+            (status, error, job_id),
+        )
+        conn.commit()
+
+def load_jobs(statuses=None, limit=20):
+    """
+    Most recent pipeline jobs as a list of dicts (newest first), optionally
+    only those whose status is in `statuses`.
+    """
+    sql = "SELECT * FROM pipeline_jobs"
+    params = []
+    if statuses:
+        sql += f" WHERE status IN ({', '.join(['?'] * len(statuses))})"
+        params.extend(statuses)
+    sql += " ORDER BY id DESC"
+    if limit > 0:
+        sql += f" LIMIT {int(limit)}"
+    try:
+        with read_db() as conn:
+            cursor = conn.execute(sql, params)
+            return [_job_dict(cursor, row) for row in cursor.fetchall()]
+    except sqlite3.Error as e:
+        print(f"Error loading jobs: {e}")
+        return []
 
-@st.cache_resource
 def init_db():
     """
     Initialize SQLite database tables with appropriate schemas.
+    Runs once per process and database file; later calls return immediately.
     """
+    with _init_lock:
+        if DB_PATH in _initialized:
+            return
+        _init_db()
+        _initialized.add(DB_PATH)
+
+def _init_db():
     try:
-        with sqlite3.connect(DB_PATH) as conn:
+        with get_db() as conn:
             cursor = conn.cursor()
-            cursor.execute("""
-                CREATE TABLE IF NOT EXISTS scraped_books (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    title TEXT UNIQUE,
-                    price REAL,
-                    rating TEXT,
-                    availability TEXT,
-                    scraped_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-                )
-            """)
-            cursor.execute("""
-                CREATE TABLE IF NOT EXISTS scraped_quotes (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    text TEXT UNIQUE,
-                    author TEXT,
-                    tags TEXT,
-                    scraped_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-                )
-            """)
-            cursor.execute("""
-                CREATE TABLE IF NOT EXISTS scraped_jobs (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    title TEXT,
-                    company TEXT,
-                    location TEXT,
-                    date_posted TEXT,
-                    scraped_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                    UNIQUE(title, company, location)
-                )
-            """)
+            for collection_name, columns in TABLES.items():
+                cursor.execute(f"CREATE TABLE IF NOT EXISTS {collection_name} ({columns})")
+            _ensure_key_hashes(cursor)
+            _ensure_fts(cursor)
+            _ensure_indexes(cursor)
+            _ensure_quote_tags(cursor)
+            _ensure_summaries(cursor)
+            _ensure_history(cursor)
+            _ensure_data_versions(cursor)
+            _ensure_jobs(cursor)
+            _ensure_crawl_state(cursor)
             conn.commit()
+            # Refresh planner statistics for the indexes when they are stale
+            cursor.execute("PRAGMA optimize")
         print("SQLite Database initialized.")
     except Exception as e:
         print(f"Database initialization warning: {e}")
 
-def save_data(df, collection_name):
+def _upsert_sql(collection_name, columns):
+    """
+    Build an INSERT ... ON CONFLICT(key_hash) DO UPDATE that only touches
+    rows whose content_hash differs from the stored one (scraped_at alone
+    doesn't count).
+    """
+    placeholders = ", ".join(["?"] * len(columns))
+    col_names = ", ".join(columns)
+    query = f"INSERT INTO {collection_name} ({col_names}) VALUES ({placeholders})"
+    
+    keys = CONFLICT_KEYS.get(collection_name)
+    if not keys or not set(HASH_COLUMNS) <= set(columns):
+        return query
+        
+    # Equal key hashes mean equal key columns; leaving those out of the SET
+    # keeps the FTS triggers on them from firing
+    assignments = ", ".join(f"{c} = excluded.{c}" for c in columns if c not in keys and c != "key_hash")
+    return (
+        query + f" ON CONFLICT(key_hash) DO UPDATE SET {assignments}"
+        " WHERE content_hash IS NOT excluded.content_hash"
+    )
+
+def save_data(df, collection_name, raise_errors=False):
     """
-    Save a pandas DataFrame to the specified SQLite table, avoiding duplicates via INSERT OR REPLACE.
+    Upsert a pandas DataFrame into the specified SQLite table.
+    Rows are matched on key_hash, the hash of the table's natural key
+    (CONFLICT_KEYS); existing rows are only rewritten when their
+    content_hash changed, and the values they held go to record_history.
+    Frames that don't come from scraper.cleaner get their hashes (and
+    their integer columns cleaned, see INTEGER_CLEANERS) here. Transaction times and
+    row counts go to the pipeline_store_* metrics.
+    Returns a dict with 'inserted', 'updated' and 'unchanged' row counts.
+    Errors are printed and give zero counts, unless raise_errors=True
+    (the transaction is rolled back and the exception re-raised).
     """
+    counts = {"inserted": 0, "updated": 0, "unchanged": 0}
     if df.empty:
         print(f"No data to save to {collection_name}")
-        return
+        return counts
 
     # Add scraped_at if missing
     df = df.copy()
@@ -72,9 +920,15 @@ def save_data(df, collection_name):
         df['scraped_at'] = df['scraped_at'].apply(
             lambda x: x.strftime('%Y-%m-%d %H:%M:%S') if hasattr(x, 'strftime') else str(x)
         )
+    for column, clean in INTEGER_CLEANERS.get(collection_name, {}).items():
+        if column in df.columns and not pd.api.types.is_integer_dtype(df[column]):
+            df[column] = clean(df[column])
+    keys = CONFLICT_KEYS.get(collection_name)
+    if keys and 'key_hash' not in df.columns and set(keys) <= set(df.columns):
+        add_record_hashes(df, keys)
 
     try:
-        with sqlite3.connect(DB_PATH) as conn:
+        with get_db() as conn:
             cursor = conn.cursor()
             # Fetch target table schema to filter columns
             cursor.execute(f"PRAGMA table_info({collection_name})")
@@ -83,27 +937,95 @@ def save_data(df, collection_name):
             # Filter DataFrame columns to only match schema (excluding autoincrement ID)
             columns = [c for c in df.columns if c in table_cols and c != 'id']
             if not columns:
+                if raise_errors:
+                    raise ValueError(f"No matching columns to save to {collection_name}")
                 print(f"No matching columns to save to {collection_name}")
-                return
+                return counts
 
-            placeholders = ", ".join(["?"] * len(columns))
-            col_names = ", ".join(columns)
-            
-            query = f"INSERT OR REPLACE INTO {collection_name} ({col_names}) VALUES ({placeholders})"
-            
-            records = [tuple(x) for x in df[columns].to_numpy()]
+            query = _upsert_sql(collection_name, columns)
+            # Column-wise to Python objects: nullable integers and
+            # categoricals bind as int/str, their missing values as NULL
+            records = list(zip(*(df[c].to_numpy(dtype=object, na_value=None) for c in columns)))
             
+            start = time.perf_counter()
+            # Take the write lock before reading MAX(id): a commit from another
+            # connection in between would be counted as inserted by this one
+            cursor.execute("BEGIN IMMEDIATE")
+            # New rows get ids above the current maximum, so counting them is an index range scan
+            max_id = cursor.execute(f"SELECT COALESCE(MAX(id), 0) FROM {collection_name}").fetchone()[0]
             cursor.executemany(query, records)
+            changed = cursor.rowcount
+            counts["inserted"] = cursor.execute(
+                f"SELECT COUNT(*) FROM {collection_name} WHERE id > ?", (max_id,)
+            ).fetchone()[0]
+            counts["updated"] = changed - counts["inserted"]
+            counts["unchanged"] = len(records) - changed
+            if collection_name == 'scraped_quotes' and {'key_hash', 'tags'} <= set(columns):
+                _sync_quote_tags(cursor, df['key_hash'].tolist())
+            if changed:
+                _bump_data_version(cursor, collection_name)
             conn.commit()
-            print(f"Synced {collection_name}: {cursor.rowcount} rows inserted/replaced.")
+            STORE_SECONDS.observe(time.perf_counter() - start, table=collection_name)
+            for outcome, n in counts.items():
+                STORE_ROWS.inc(n, table=collection_name, outcome=outcome)
+            print(
+                f"Synced {collection_name}: {counts['inserted']} inserted, "
+                f"{counts['updated']} updated, {counts['unchanged']} unchanged."
+            )
+            return counts
     except Exception as e:
+        STORE_ERRORS.inc(table=collection_name)
         print(f"Error saving to {collection_name}: {e}")
+        if raise_errors:
+            raise
+        return counts
+
+def save_stream(chunks, collection_name, batch_size=DEFAULT_BATCH_SIZE):
+    """
+    Save an iterable of DataFrame chunks as they arrive.
+    Each chunk is committed in transactions of at most `batch_size` rows, so
+    rows become visible while the producer is still running and memory stays
+    bounded by the chunk size. Yields save_data's counts per committed batch.
+    A batch that fails to save raises, so the producer is never resumed past
+    a chunk that was not stored (an incremental crawl only marks a page as
+    seen once the consumer comes back for the next one).
+    """
+    for chunk in chunks:
+        for start in range(0, len(chunk), batch_size):
+            yield save_data(chunk.iloc[start:start + batch_size], collection_name, raise_errors=True)
+
+def apply_dtypes(df, collection_name):
+    """
+    Convert the columns of a frame read from `collection_name` to their
+    DTYPES, in place. Categories are in order of first appearance, so
+    ties in value_counts()/groupby(sort=False) keep table order.
+    Returns `df`.
+    """
+    for column, dtype in DTYPES.get(collection_name, {}).items():
+        if column not in df.columns or df[column].dtype == dtype:
+            continue
+        values = df[column]
+        if dtype == "category":
+            codes, categories = pd.factorize(values)
+            df[column] = pd.Categorical.from_codes(codes, categories=categories)
+        elif dtype.startswith("datetime"):
+            df[column] = pd.to_datetime(values, format="ISO8601", errors="coerce").astype(dtype)
+        else:
+            df[column] = pd.to_numeric(values, errors="coerce").astype(dtype)
+    return df
 
-@st.cache_data(ttl=60)
 def load_data(collection_name):
-    """Load data from a SQLite table into a pandas DataFrame."""
+    """
+    Load data from a SQLite table into a pandas DataFrame with the
+    table's DTYPES.
+    Cached until the table's data version changes (see get_data_version).
+    """
+    return _load_data(collection_name, get_data_version(collection_name))
+
+@_cache_data(max_entries=CACHE_ENTRIES)
+def _load_data(collection_name, version):
     try:
-        with sqlite3.connect(DB_PATH) as conn:
+        with read_db() as conn:
             # Check if table exists
             cursor = conn.cursor()
             cursor.execute(f"SELECT name FROM sqlite_master WHERE type='table' AND name='{collection_name}'")
@@ -111,97 +1033,372 @@ def load_data(collection_name):
                 return pd.DataFrame()
 
             df = pd.read_sql_query(f"SELECT * FROM {collection_name}", conn)
-            
-            if 'id' in df.columns:
-                df = df.drop(columns=['id'])
+            df = df.drop(columns=[c for c in ("id",) + HASH_COLUMNS if c in df.columns])
+            apply_dtypes(df, collection_name)
                 
             # If quotes, convert tags comma-separated string back to list of strings
             if collection_name == 'scraped_quotes' and 'tags' in df.columns:
-                df['tags'] = df['tags'].apply(
-                    lambda x: [t.strip() for t in x.split(',')] if isinstance(x, str) and x else []
-                )
+                df['tags'] = df['tags'].apply(split_tags)
                 
             return df
     except Exception as e:
         print(f"Error loading {collection_name}: {e}")
         return pd.DataFrame()
 
-def query_data(collection_name, query, projection=None, limit=0):
+def _select_columns(cursor, collection_name, projection=None, prefix="t."):
     """
-    Query data from SQLite with a specific filter.
-    Returns a pandas DataFrame.
+    Translate a projection into a SELECT column list. Accepts a list of
+    column names or a MongoDB-style dict ({"title": 1} includes,
+    {"tags": 0} excludes). Unknown columns are ignored; `id` is always kept
+    so callers can page on it. HASH_COLUMNS are only returned when asked for
+    by name. Returns "<prefix>*" for tables without them when nothing is
+    selected.
     """
+    table_cols = [row[1] for row in cursor.execute(f"PRAGMA table_info({collection_name})").fetchall()]
+    data_cols = [c for c in table_cols if c not in HASH_COLUMNS]
+    if not projection:
+        if data_cols == table_cols:
+            return f"{prefix}*"
+        wanted = data_cols
+    elif isinstance(projection, dict):
+        included = [c for c, flag in projection.items() if flag]
+        if included:
+            wanted = included
+        else:
+            wanted = [c for c in data_cols if c not in projection]
+    else:
+        wanted = list(projection)
+    cols = ["id"] + [c for c in table_cols if c in wanted and c != "id"]
+    return ", ".join(f"{prefix}{c}" for c in cols)
+
+def count_rows(collection_name):
+    """Total number of rows in a SQLite table (0 if it does not exist)."""
+    return _count_rows(collection_name, get_data_version(collection_name))
+
+@_cache_data(max_entries=CACHE_ENTRIES)
+def _count_rows(collection_name, version):
     try:
-        with sqlite3.connect(DB_PATH) as conn:
-            # Check if table exists
+        with read_db() as conn:
+            return conn.execute(f"SELECT COUNT(*) FROM {collection_name}").fetchone()[0]
+    except Exception as e:
+        print(f"Error counting {collection_name}: {e}")
+        return 0
+
+def load_page(collection_name, after_id=0, limit=100, columns=None):
+    """
+    Load one page of a SQLite table using keyset pagination.
+    
+    Args:
+        collection_name (str): Table to read.
+        after_id (int): Only rows with a larger id are returned; pass the
+            last id of the previous page to get the next one.
+        limit (int): Maximum number of rows in the page.
+        columns (list or dict): Optional projection (see query_data).
+        
+    Returns:
+        pd.DataFrame: The page ordered by id, including the 'id' column.
+    """
+    return _load_page(collection_name, get_data_version(collection_name), after_id, limit, columns)
+
+@_cache_data(max_entries=CACHE_ENTRIES)
+def _load_page(collection_name, version, after_id, limit, columns):
+    try:
+        with read_db() as conn:
             cursor = conn.cursor()
             cursor.execute(f"SELECT name FROM sqlite_master WHERE type='table' AND name='{collection_name}'")
             if not cursor.fetchone():
                 return pd.DataFrame()
 
-            where_clauses = []
-            params = []
+            select_sql = _select_columns(cursor, collection_name, columns, prefix="")
+            df = pd.read_sql_query(
+                f"SELECT {select_sql} FROM {collection_name} WHERE id > ? ORDER BY id LIMIT ?",
+                conn,
+                params=(int(after_id), int(limit)),
+            )
+            apply_dtypes(df, collection_name)
             
-            for key, val in query.items():
-                if isinstance(val, dict):
-                    # Handle MongoDB operators
-                    for op, op_val in val.items():
-                        if op == "$regex":
-                            where_clauses.append(f"{key} LIKE ?")
-                            params.append(f"%{op_val}%")
-                        elif op == "$options":
-                            pass
-                        elif op == "$gte":
-                            where_clauses.append(f"{key} >= ?")
-                            params.append(op_val)
-                        elif op == "$lte":
-                            where_clauses.append(f"{key} <= ?")
-                            params.append(op_val)
-                        elif op == "$gt":
-                            where_clauses.append(f"{key} > ?")
-                            params.append(op_val)
-                        elif op == "$lt":
-                            where_clauses.append(f"{key} < ?")
-                            params.append(op_val)
-                else:
-                    if key == "tags":
-                        where_clauses.append(f"{key} LIKE ?")
-                        params.append(f"%{val}%")
+            if collection_name == 'scraped_quotes' and 'tags' in df.columns:
+                df['tags'] = df['tags'].apply(split_tags)
+                
+            return df
+    except Exception as e:
+        print(f"Error loading page of {collection_name}: {e}")
+        return pd.DataFrame()
+
+def _ensure_fts(cursor):
+    """
+    Create the FTS5 shadow tables and their sync triggers, and backfill them
+    from existing rows the first time. Returns False when this SQLite build
+    has no FTS5 (query_data then keeps using LIKE).
+    """
+    for collection_name, cols in FTS_COLUMNS.items():
+        fts = f"{collection_name}_fts"
+        exists = cursor.execute(
+            "SELECT 1 FROM sqlite_master WHERE type='table' AND name=?", (fts,)
+        ).fetchone()
+        col_list = ", ".join(cols)
+        new_vals = ", ".join(f"new.{c}" for c in cols)
+        old_vals = ", ".join(f"old.{c}" for c in cols)
+        try:
+            cursor.execute(f"""
+                CREATE VIRTUAL TABLE IF NOT EXISTS {fts} USING fts5(
+                    {col_list}, content='{collection_name}', content_rowid='id',
+                    tokenize='unicode61 remove_diacritics 2'
+                )
+            """)
+        except sqlite3.OperationalError as e:
+            print(f"Full-text search unavailable, falling back to LIKE: {e}")
+            return False
+        cursor.execute(f"""
+            CREATE TRIGGER IF NOT EXISTS {fts}_ai AFTER INSERT ON {collection_name} BEGIN
+                INSERT INTO {fts}(rowid, {col_list}) VALUES (new.id, {new_vals});
+            END
+        """)
+        cursor.execute(f"""
+            CREATE TRIGGER IF NOT EXISTS {fts}_ad AFTER DELETE ON {collection_name} BEGIN
+                INSERT INTO {fts}({fts}, rowid, {col_list}) VALUES ('delete', old.id, {old_vals});
+            END
+        """)
+        cursor.execute(f"""
+            CREATE TRIGGER IF NOT EXISTS {fts}_au AFTER UPDATE OF {col_list} ON {collection_name} BEGIN
+                INSERT INTO {fts}({fts}, rowid, {col_list}) VALUES ('delete', old.id, {old_vals});
+                INSERT INTO {fts}(rowid, {col_list}) VALUES (new.id, {new_vals});
+            END
+        """)
+        if not exists:
+            cursor.execute(f"INSERT INTO {fts}({fts}) VALUES ('rebuild')")
+    return True
+
+def _has_fts(cursor, collection_name):
+    return collection_name in FTS_COLUMNS and cursor.execute(
+        "SELECT 1 FROM sqlite_master WHERE type='table' AND name=?", (f"{collection_name}_fts",)
+    ).fetchone() is not None
+
+def _fts_terms(text):
+    """
+    Turn free text into an FTS5 expression: every word becomes a quoted,
+    prefix-matched token and all of them are required.
+    Returns None when the text has no searchable words.
+    """
+    words = re.findall(r"\w+", str(text))
+    if not words:
+        return None
+    return "(" + " AND ".join(f'"{w}"*' for w in words) + ")"
+
+def _build_query(cursor, collection_name, query, columns="t.*", limit=0):
+    """
+    Translate a MongoDB-style filter into SQL over `<collection> AS t`.
+    $regex filters on FTS_COLUMNS become one FTS5 MATCH with prefix matching,
+    and results are ordered by relevance (bm25 rank). Tag equality is an
+    exact lookup in quote_tags.
+    Returns (sql, params).
+    """
+    use_fts = _has_fts(cursor, collection_name)
+    fts_cols = FTS_COLUMNS.get(collection_name, ())
+    where_clauses = []
+    params = []
+    match_terms = []
+    
+    for key, val in query.items():
+        if isinstance(val, dict):
+            # Handle MongoDB operators
+            for op, op_val in val.items():
+                if op == "$regex":
+                    terms = _fts_terms(op_val) if use_fts and key in fts_cols else None
+                    if terms:
+                        match_terms.append(f"{key} : {terms}")
                     else:
-                        where_clauses.append(f"{key} = ?")
-                        params.append(val)
+                        where_clauses.append(f"t.{key} LIKE ?")
+                        params.append(f"%{op_val}%")
+                elif op == "$options":
+                    pass
+                elif op == "$gte":
+                    where_clauses.append(f"t.{key} >= ?")
+                    params.append(op_val)
+                elif op == "$lte":
+                    where_clauses.append(f"t.{key} <= ?")
+                    params.append(op_val)
+                elif op == "$gt":
+                    where_clauses.append(f"t.{key} > ?")
+                    params.append(op_val)
+                elif op == "$lt":
+                    where_clauses.append(f"t.{key} < ?")
+                    params.append(op_val)
+        else:
+            if key == "tags" and collection_name == "scraped_quotes":
+                # Exact (case-insensitive) tag lookup through the quote_tags index
+                where_clauses.append("t.id IN (SELECT quote_id FROM quote_tags WHERE tag = ?)")
+                params.append(str(val).strip())
+            else:
+                where_clauses.append(f"t.{key} = ?")
+                params.append(val)
+                
+    from_sql = f"{collection_name} AS t"
+    order_sql = ""
+    if match_terms:
+        fts = f"{collection_name}_fts"
+        from_sql = f"{fts} JOIN {collection_name} AS t ON t.id = {fts}.rowid"
+        where_clauses.insert(0, f"{fts} MATCH ?")
+        params.insert(0, " AND ".join(match_terms))
+        order_sql = f" ORDER BY {fts}.rank"
+
+    where_sql = ""
+    if where_clauses:
+        where_sql = " WHERE " + " AND ".join(where_clauses)
 
-            where_sql = ""
-            if where_clauses:
-                where_sql = " WHERE " + " AND ".join(where_clauses)
+    limit_sql = ""
+    if limit > 0:
+        limit_sql = f" LIMIT {int(limit)}"
 
-            limit_sql = ""
-            if limit > 0:
-                limit_sql = f" LIMIT {limit}"
+    return f"SELECT {columns} FROM {from_sql}{where_sql}{order_sql}{limit_sql}", params
 
-            sql_query = f"SELECT * FROM {collection_name}{where_sql}{limit_sql}"
+def query_data(collection_name, query, projection=None, limit=0, explain=False):
+    """
+    Query data from SQLite with a specific filter.
+    Text filters are answered from the FTS5 index (ranked, prefix matching).
+    `projection` limits the columns read: a list of names or a MongoDB-style
+    dict ({"title": 1, "price": 1} or {"tags": 0}).
+    Returns a pandas DataFrame.
+    
+    With explain=True the query still runs, but a report dict is returned
+    instead: 'sql', 'params', 'plan' (EXPLAIN QUERY PLAN detail lines),
+    'elapsed_ms' and 'rows'. Use it to check a filter is index-backed.
+    """
+    try:
+        with read_db() as conn:
+            # Check if table exists
+            cursor = conn.cursor()
+            cursor.execute(f"SELECT name FROM sqlite_master WHERE type='table' AND name='{collection_name}'")
+            if not cursor.fetchone():
+                return pd.DataFrame()
+
+            columns = _select_columns(cursor, collection_name, projection)
+            sql_query, params = _build_query(cursor, collection_name, query, columns=columns, limit=limit)
             
+            if explain:
+                plan = cursor.execute(f"EXPLAIN QUERY PLAN {sql_query}", params).fetchall()
+                start = time.perf_counter()
+                rows = cursor.execute(sql_query, params).fetchall()
+                return {
+                    "sql": sql_query,
+                    "params": params,
+                    "plan": [row[-1] for row in plan],
+                    "elapsed_ms": (time.perf_counter() - start) * 1000,
+                    "rows": len(rows),
+                }
+                
             df = pd.read_sql_query(sql_query, conn, params=params)
             
             if 'id' in df.columns:
                 df = df.drop(columns=['id'])
+            apply_dtypes(df, collection_name)
                 
             if collection_name == 'scraped_quotes' and 'tags' in df.columns:
-                df['tags'] = df['tags'].apply(
-                    lambda x: [t.strip() for t in x.split(',')] if isinstance(x, str) and x else []
-                )
+                df['tags'] = df['tags'].apply(split_tags)
 
             return df
     except Exception as e:
         print(f"Error querying {collection_name}: {e}")
         return pd.DataFrame()
 
+def available_export_formats():
+    """Export formats usable here (Parquet needs pyarrow)."""
+    return [fmt for fmt in EXPORT_FORMATS if fmt != "parquet" or pa is not None]
+
+def _arrow_type(declared):
+    declared = (declared or "").upper()
+    if "INT" in declared:
+        return pa.int64()
+    if any(t in declared for t in ("REAL", "FLOA", "DOUB")):
+        return pa.float64()
+    return pa.string()
+
+def export_data(collection_name, fileobj, fmt="csv", chunk_size=EXPORT_CHUNK_SIZE):
+    """
+    Stream a SQLite table into a binary file object.
+    Rows are read from a cursor `chunk_size` at a time and written out
+    straight away, so memory stays bounded by one chunk whatever the table
+    size. The id and hash columns are left out, as in load_data.
+    
+    Args:
+        collection_name (str): Table to export.
+        fileobj: Writable binary file object.
+        fmt (str): One of EXPORT_FORMATS ('csv', 'csv.gz' or 'parquet').
+        chunk_size (int): Rows per fetch/write.
+        
+    Returns:
+        int: Number of rows written.
+    """
+    if fmt not in available_export_formats():
+        raise ValueError(f"Export format '{fmt}' is not available (supported: {available_export_formats()})")
+
+    with read_db() as conn:
+        table_info = conn.execute(f"PRAGMA table_info({collection_name})").fetchall()
+        columns = [(row[1], row[2]) for row in table_info if row[1] != "id" and row[1] not in HASH_COLUMNS]
+        if not columns:
+            raise ValueError(f"Table '{collection_name}' does not exist")
+        names = [name for name, _ in columns]
+        cursor = conn.execute(f"SELECT {', '.join(names)} FROM {collection_name} ORDER BY id")
+    
+        written = 0
+        if fmt == "parquet":
+            schema = pa.schema([(name, _arrow_type(declared)) for name, declared in columns])
+            with pq.ParquetWriter(fileobj, schema, compression="snappy") as writer:
+                while True:
+                    rows = cursor.fetchmany(chunk_size)
+                    if not rows:
+                        break
+                    arrays = [pa.array(col, type=field.type) for col, field in zip(zip(*rows), schema)]
+                    writer.write_table(pa.Table.from_arrays(arrays, schema=schema))
+                    written += len(rows)
+            return written
+        
+        raw = gzip.GzipFile(fileobj=fileobj, mode="wb") if fmt == "csv.gz" else fileobj
+        text = io.TextIOWrapper(raw, encoding="utf-8", newline="")
+        try:
+            writer = csv.writer(text, lineterminator="\n")
+            writer.writerow(names)
+            while True:
+                rows = cursor.fetchmany(chunk_size)
+                if not rows:
+                    break
+                writer.writerows(rows)
+                written += len(rows)
+        finally:
+            text.flush()
+            text.detach()
+            if raw is not fileobj:
+                raw.close()
+        return written
+
+def export_file(collection_name, fmt="csv", chunk_size=EXPORT_CHUNK_SIZE):
+    """
+    Export a table (see export_data) into a temporary file on disk and
+    return it open and rewound. The export is streamed from disk by
+    whoever reads the file, and the file is deleted once it is closed.
+    Meant as a lazy download source: st.download_button(data=lambda:
+    export_file(...)) only runs it when the button is clicked.
+    """
+    tmp = tempfile.TemporaryFile()
+    try:
+        export_data(collection_name, tmp, fmt=fmt, chunk_size=chunk_size)
+    except Exception:
+        tmp.close()
+        raise
+    tmp.seek(0)
+    return tmp
+
 def clear_data(collection_name):
     """Clear all documents from a specific collection."""
     try:
-        with sqlite3.connect(DB_PATH) as conn:
+        with get_db() as conn:
             cursor = conn.cursor()
             cursor.execute(f"DELETE FROM {collection_name}")
+            # Forget crawled page hashes too, or an incremental crawl would skip them
+            cursor.execute("DELETE FROM crawl_pages WHERE collection = ?", (collection_name,))
+            cursor.execute("DELETE FROM crawl_sources WHERE collection = ?", (collection_name,))
+            cursor.execute("DELETE FROM record_history WHERE collection = ?", (collection_name,))
+            _bump_data_version(cursor, collection_name)
             conn.commit()
             print(f"Cleared {collection_name}")
     except Exception as e:
@@ -0,0 +1,91 @@
+"""
+Dashboard aggregations computed with pandas, SQL and the summary tables.
+
+    python -m tests.bench_analysis [--rows 10000,1000000,10000000]
+
+For each size, fills a scratch database with random books and quotes,
+then prints the seconds load_data takes per table and each get_* function
+takes on each path (pandas on the loaded frame), and fails if a SQL or
+summary result differs from the pandas one.
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+import analysis.analyze as analyze
+import storage.database as db
+
+ANALYSES = [
+    ("scraped_books", analyze.get_avg_price_by_rating),
+    ("scraped_books", analyze.get_top_5_expensive_books),
+    ("scraped_books", analyze.get_price_histogram),
+    ("scraped_books", analyze.get_book_kpis),
+    ("scraped_quotes", analyze.get_author_counts),
+    ("scraped_quotes", analyze.get_quote_kpis),
+]
+
+def fill(rows):
+    """Inserts `rows` random books and quotes (the triggers keep the summaries)."""
+    with db.get_db() as conn:
+        conn.execute(f"""
+            WITH RECURSIVE n(i) AS (SELECT 1 UNION ALL SELECT i + 1 FROM n WHERE i < {rows})
+            INSERT INTO scraped_books (title, price, rating, availability)
+            SELECT 'book ' || i, 10 + ABS(RANDOM() % 6000) / 100.0, NULLIF(ABS(RANDOM() % 6), 0), 'In stock' FROM n
+        """)
+        conn.execute(f"""
+            WITH RECURSIVE n(i) AS (SELECT 1 UNION ALL SELECT i + 1 FROM n WHERE i < {rows})
+            INSERT INTO scraped_quotes (text, author, tags)
+            SELECT 'quote ' || i, 'author ' || ABS(RANDOM() % 1000), '' FROM n
+        """)
+        conn.commit()
+
+def timed(call):
+    start = time.perf_counter()
+    result = call()
+    return result, time.perf_counter() - start
+
+def same(expected, actual):
+    if isinstance(expected, pd.DataFrame):
+        return expected.equals(actual)
+    return all(
+        actual[key] == value or (np.isnan(actual[key]) and np.isnan(value))
+        for key, value in expected.items()
+    )
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the analysis paths.")
+    parser.add_argument("--rows", default="10000,1000000,10000000", help="Comma-separated table sizes")
+    args = parser.parse_args(argv)
+
+    mismatches = 0
+    print(f"{'rows':>10}  {'analysis':<28}{'pandas s':>10}{'sql s':>10}{'summary s':>11}")
+    for rows in (int(size) for size in args.rows.split(",")):
+        with tempfile.TemporaryDirectory() as scratch:
+            db.DB_PATH = os.path.join(scratch, "bench.db")
+            db.init_db()
+            fill(rows)
+            frames = {}
+            for table in dict(ANALYSES):
+                frames[table], elapsed = timed(lambda: db.load_data(table))
+                print(f"{rows:>10}  {'load_data ' + table:<28}{elapsed:>10.3f}")
+            for table, analysis in ANALYSES:
+                expected, pandas_s = timed(lambda: analysis(frames[table]))
+                seconds = [pandas_s]
+                for source in (table, None):
+                    result, elapsed = timed(lambda: analysis(source))
+                    seconds.append(elapsed)
+                    if not same(expected, result):
+                        print(f"{rows}: {analysis.__name__}({source!r}) differs from pandas", file=sys.stderr)
+                        mismatches += 1
+                print(f"{rows:>10}  {analysis.__name__:<28}" + "".join(f"{s:>10.3f}" for s in seconds[:2])
+                      + f"{seconds[2]:>11.3f}")
+            db.close_db()
+    return 1 if mismatches else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
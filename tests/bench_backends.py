@@ -0,0 +1,55 @@
+"""
+Parsing throughput of each installed backend on the saved fixture pages.
+
+    python -m tests.bench_backends [--seconds 2]
+
+Prints pages/s per backend and page kind, and fails if a backend's
+records differ from the html.parser reference.
+"""
+import argparse
+import sys
+import time
+from pathlib import Path
+
+from scraper.backends import available_backends, get_backend, SoupBackend
+
+FIXTURES = Path(__file__).parent / "fixtures"
+KINDS = ("books", "quotes", "jobs")
+
+def load_fixture(kind):
+    return (FIXTURES / f"{kind}.html").read_text(encoding="utf-8")
+
+def pages_per_second(extract, html, seconds):
+    """Calls extract(html) repeatedly for about `seconds`; returns the rate."""
+    pages = 0
+    start = time.perf_counter()
+    elapsed = 0.0
+    while elapsed < seconds:
+        extract(html)
+        pages += 1
+        elapsed = time.perf_counter() - start
+    return pages / elapsed
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the HTML parsing backends.")
+    parser.add_argument("--seconds", type=float, default=2.0, help="Time spent per backend and page kind")
+    args = parser.parse_args(argv)
+
+    reference = get_backend(SoupBackend.name)
+    mismatches = 0
+    print(f"{'backend':<12}" + "".join(f"{kind + ' p/s':>14}" for kind in KINDS))
+    for name in available_backends():
+        backend = get_backend(name)
+        rates = []
+        for kind in KINDS:
+            html = load_fixture(kind)
+            extract = getattr(backend, f"extract_{kind}")
+            if extract(html) != getattr(reference, f"extract_{kind}")(html):
+                print(f"{name}: {kind} records differ from {reference.name}", file=sys.stderr)
+                mismatches += 1
+            rates.append(pages_per_second(extract, html, args.seconds))
+        print(f"{name:<12}" + "".join(f"{rate:>14.1f}" for rate in rates))
+    return 1 if mismatches else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
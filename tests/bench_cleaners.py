@@ -0,0 +1,82 @@
+"""
+Cleaning throughput of the vectorized cleaners against the per-row
+reference_* ones they replaced.
+
+    python -m tests.bench_cleaners [--rows 1000000]
+
+Prints the seconds each dataset takes before (reference_clean_*_df plus
+add_record_hashes), after (clean_*_df) and after with inplace=True, and
+fails if a cleaned column or hash differs from the reference.
+"""
+import argparse
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+from scraper.cleaner import (
+    BOOK_KEY, QUOTE_KEY, JOB_KEY, add_record_hashes,
+    clean_books_df, clean_quotes_df, clean_jobs_df,
+    reference_clean_books_df, reference_clean_quotes_df, reference_clean_jobs_df,
+)
+
+def raw_frames(rows, seed=0):
+    """Scraped-looking frames of `rows` rows, with the odd missing or malformed value."""
+    rng = np.random.default_rng(seed)
+    prices = pd.Series([f"Â£{x:.2f}" for x in rng.uniform(5, 60, rows)], dtype=object)
+    prices.iloc[::97] = None
+    prices.iloc[::101] = "n/a"
+    ratings = pd.Series(rng.integers(1, 6, rows).astype(str), dtype=object)
+    ratings.iloc[::89] = "Unknown"
+    titles = pd.Series([f"  Title {i}\n" for i in range(rows)], dtype=object)
+    titles.iloc[::83] = None
+    books = pd.DataFrame({"title": titles, "price": prices, "rating": ratings, "availability": "In stock"})
+    quotes = pd.DataFrame({
+        "text": [f"“Quote {i}” " for i in range(rows)],
+        "author": pd.Series([f" Author {i % 500}" for i in range(rows)], dtype=object),
+        "tags": "life,love",
+    })
+    jobs = pd.DataFrame({
+        "title": [f"Developer {i}\n" for i in range(rows)],
+        "company": [f"Company {i % 1000} " for i in range(rows)],
+        "location": " Town, AA",
+        "date_posted": "2021-04-08",
+    })
+    return {"books": books, "quotes": quotes, "jobs": jobs}
+
+CLEANERS = {
+    "books": (reference_clean_books_df, clean_books_df, BOOK_KEY),
+    "quotes": (reference_clean_quotes_df, clean_quotes_df, QUOTE_KEY),
+    "jobs": (reference_clean_jobs_df, clean_jobs_df, JOB_KEY),
+}
+
+def timed(call):
+    start = time.perf_counter()
+    result = call()
+    return result, time.perf_counter() - start
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the DataFrame cleaners.")
+    parser.add_argument("--rows", type=int, default=1_000_000, help="Rows per dataset")
+    args = parser.parse_args(argv)
+
+    mismatches = 0
+    print(f"{'dataset':<10}{'before s':>10}{'after s':>10}{'inplace s':>11}{'speedup':>9}")
+    for name, frame in raw_frames(args.rows).items():
+        reference, vectorized, key = CLEANERS[name]
+        before, before_s = timed(lambda: add_record_hashes(reference(frame), key))
+        after, after_s = timed(lambda: vectorized(frame))
+        _, inplace_s = timed(lambda: vectorized(frame.copy(), inplace=True))
+        for column in before.columns:
+            # The reference text rules only strip the ends; the fixtures have no inner runs
+            expected = before[column].astype(object).where(before[column].notna(), None)
+            actual = after[column].astype(object).where(after[column].notna(), None)
+            if not expected.equals(actual):
+                print(f"{name}: column {column} differs from the reference", file=sys.stderr)
+                mismatches += 1
+        print(f"{name:<10}{before_s:>10.2f}{after_s:>10.2f}{inplace_s:>11.2f}{before_s / after_s:>8.1f}x")
+    return 1 if mismatches else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
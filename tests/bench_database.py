@@ -0,0 +1,97 @@
+"""
+Dashboard reads and pipeline writes per second on a scratch database.
+
+    python -m tests.bench_database [--seconds 2] [--rows 10000]
+
+Reads run like Streamlit reruns, each on a new thread: once through a
+per-thread get_db() connection (opened for every run) and once through
+the pooled read_db() connections. Writes are single-row save_data calls,
+alone and with a pooled reader running alongside.
+"""
+import argparse
+import contextlib
+import io
+import os
+import sys
+import tempfile
+import threading
+import time
+
+import pandas as pd
+
+import storage.database as db
+
+READ_SQL = "SELECT * FROM book_rating_stats"
+
+def per_second(call, seconds):
+    """Calls call() repeatedly for about `seconds`; returns the rate."""
+    calls = 0
+    start = time.perf_counter()
+    elapsed = 0.0
+    while elapsed < seconds:
+        call()
+        calls += 1
+        elapsed = time.perf_counter() - start
+    return calls / elapsed
+
+def on_new_thread(func):
+    def run():
+        thread = threading.Thread(target=func)
+        thread.start()
+        thread.join()
+    return run
+
+def thread_local_read():
+    db.get_db().execute(READ_SQL).fetchall()
+    db.close_db()
+
+def pooled_read():
+    with db.read_db() as conn:
+        conn.execute(READ_SQL).fetchall()
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark database reads and writes.")
+    parser.add_argument("--seconds", type=float, default=2.0, help="Time spent per measurement")
+    parser.add_argument("--rows", type=int, default=10_000, help="Books in the scratch database")
+    args = parser.parse_args(argv)
+
+    with tempfile.TemporaryDirectory() as scratch:
+        db.DB_PATH = os.path.join(scratch, "bench.db")
+        db.init_db()
+        db.save_data(pd.DataFrame({
+            "title": [f"book {i}" for i in range(args.rows)],
+            "price": [10 + i % 5000 / 100 for i in range(args.rows)],
+            "rating": [i % 5 + 1 for i in range(args.rows)],
+            "availability": "In stock",
+        }), "scraped_books", raise_errors=True)
+
+        print(f"{'reads/s, connection per thread':<40}{per_second(on_new_thread(thread_local_read), args.seconds):>10.1f}")
+        print(f"{'reads/s, pooled':<40}{per_second(on_new_thread(pooled_read), args.seconds):>10.1f}")
+
+        written = iter(range(sys.maxsize))
+        def write():
+            i = next(written)
+            frame = pd.DataFrame({"title": [f"new {i}"], "price": [1.0], "rating": [3], "availability": "In stock"})
+            # save_data reports every call on stdout
+            with contextlib.redirect_stdout(io.StringIO()):
+                db.save_data(frame, "scraped_books", raise_errors=True)
+        print(f"{'writes/s':<40}{per_second(write, args.seconds):>10.1f}")
+
+        stop = threading.Event()
+        reads = []
+        def reader():
+            while not stop.is_set():
+                pooled_read()
+                reads.append(1)
+        thread = threading.Thread(target=reader)
+        thread.start()
+        start = time.perf_counter()
+        rate = per_second(write, args.seconds)
+        stop.set()
+        thread.join()
+        print(f"{'writes/s, with a reader':<40}{rate:>10.1f}  ({len(reads) / (time.perf_counter() - start):.1f} reads/s)")
+        db.close_db()
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
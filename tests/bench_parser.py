@@ -0,0 +1,90 @@
+"""
+Parse time and peak memory of building parser output, per page frames
+concatenated at the end (before) against ColumnBuffer (after).
+
+    python -m tests.bench_parser [--pages 5000]
+
+Every page is the saved fixture, extracted with the default backend.
+Each run happens in a fresh process so its peak RSS is its own; the
+growth over the process's baseline is printed with the run time and the
+size of the resulting frame. Fails if the two frames hold different rows.
+"""
+import argparse
+import multiprocessing
+import resource
+import sys
+import time
+
+import pandas as pd
+
+from scraper.backends import get_backend, BOOK_FIELDS, QUOTE_FIELDS
+from scraper.parser import BOOK_CATEGORICAL, QUOTE_CATEGORICAL, ColumnBuffer, concat_chunks
+from tests.bench_backends import load_fixture
+
+KINDS = {"books": (BOOK_FIELDS, BOOK_CATEGORICAL), "quotes": (QUOTE_FIELDS, QUOTE_CATEGORICAL)}
+
+def per_page_frames(extract, html, pages, fields, categorical):
+    """The old way: one DataFrame per page, concatenated at the end."""
+    return pd.concat([pd.DataFrame(extract(html), columns=fields) for _ in range(pages)], ignore_index=True)
+
+def column_buffer(extract, html, pages, fields, categorical):
+    buffer = ColumnBuffer(fields, categorical)
+    for _ in range(pages):
+        buffer.extend(extract(html))
+    return buffer.frame()
+
+def streamed_chunks(extract, html, pages, fields, categorical):
+    """iter_*: one flushed chunk per page, joined with concat_chunks."""
+    buffer = ColumnBuffer(fields, categorical)
+    chunks = []
+    for _ in range(pages):
+        buffer.extend(extract(html))
+        chunks.append(buffer.flush())
+    return concat_chunks(chunks)
+
+BUILDERS = {"before": per_page_frames, "after": column_buffer, "streamed": streamed_chunks}
+
+def peak_rss_mb():
+    # ru_maxrss is in KiB on Linux
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+def run(kind, builder, pages):
+    """Runs in a fresh process: (seconds, peak RSS growth MB, frame MB)."""
+    fields, categorical = KINDS[kind]
+    extract = getattr(get_backend(), f"extract_{kind}")
+    html = load_fixture(kind)
+    extract(html)
+    baseline = peak_rss_mb()
+    start = time.perf_counter()
+    frame = BUILDERS[builder](extract, html, pages, fields, categorical)
+    seconds = time.perf_counter() - start
+    return seconds, peak_rss_mb() - baseline, frame.memory_usage(deep=True).sum() / 2**20
+
+def same_rows(kind, pages=3):
+    fields, categorical = KINDS[kind]
+    extract = getattr(get_backend(), f"extract_{kind}")
+    html = load_fixture(kind)
+    frames = [builder(extract, html, pages, fields, categorical).astype(object) for builder in BUILDERS.values()]
+    return all(frame.equals(frames[0]) for frame in frames[1:])
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark building parser output.")
+    parser.add_argument("--pages", type=int, default=5000, help="Pages parsed per run")
+    args = parser.parse_args(argv)
+
+    mismatches = 0
+    context = multiprocessing.get_context("spawn")
+    print(f"{'kind':<8}{'build':<10}{'rows':>9}{'seconds':>9}{'peak RSS MB':>13}{'frame MB':>10}")
+    for kind in KINDS:
+        if not same_rows(kind):
+            print(f"{kind}: the builders return different rows", file=sys.stderr)
+            mismatches += 1
+        rows = args.pages * len(getattr(get_backend(), f"extract_{kind}")(load_fixture(kind)))
+        for builder in BUILDERS:
+            with context.Pool(1) as pool:
+                seconds, rss, size = pool.apply(run, (kind, builder, args.pages))
+            print(f"{kind:<8}{builder:<10}{rows:>9}{seconds:>9.2f}{rss:>13.1f}{size:>10.1f}")
+    return 1 if mismatches else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,53 @@
+import hashlib
+import shutil
+
+import pytest
+
+import storage.database as db
+from scraper.fetcher import Fetcher
+from tests.server import StandInServer
+
+# The tracked database, captured before any test repoints DB_PATH
+BUNDLED_DB = db.DB_PATH
+
+
+@pytest.fixture
+def site():
+    """A StandInServer with no routes; tests add theirs to site.routes."""
+    with StandInServer() as server:
+        yield server
+
+
+@pytest.fixture
+def temp_db(tmp_path, monkeypatch):
+    """Points storage.database at an empty database file under tmp_path."""
+    path = str(tmp_path / "data_pipeline.db")
+    monkeypatch.setattr(db, "DB_PATH", path)
+    yield path
+    db.close_db()
+
+
+@pytest.fixture
+def fetcher(monkeypatch):
+    """A cache-less Fetcher installed as the default one the pipeline uses."""
+    shared = Fetcher(retries=1)
+    monkeypatch.setattr("scraper.fetcher._default_fetcher", shared)
+    yield shared
+    shared.close()
+
+
+def _digest(path):
+    with open(path, "rb") as fh:
+        return hashlib.sha256(fh.read()).hexdigest()
+
+
+@pytest.fixture
+def bundled_db(temp_db):
+    """
+    A copy of the bundled data_pipeline.db at temp_db, for migration tests.
+    The tracked file itself must come out unchanged.
+    """
+    digest = _digest(BUNDLED_DB)
+    shutil.copyfile(BUNDLED_DB, temp_db)
+    yield temp_db
+    assert _digest(BUNDLED_DB) == digest
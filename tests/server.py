@@ -0,0 +1,98 @@
+"""
+Local HTTP stand-in for the scraped sites, so the fetch layer can be
+tested without network access.
+"""
+import threading
+import time
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+class Response:
+    """
+    A canned reply.
+
+    Args:
+        status (int): HTTP status code.
+        body (str): Response body (UTF-8 encoded on the wire).
+        headers (dict): Extra response headers.
+        delay (float): Seconds to wait before answering.
+    """
+
+    def __init__(self, status=200, body="", headers=None, delay=0.0):
+        self.status = status
+        self.body = body
+        self.headers = headers or {}
+        self.delay = delay
+
+
+class StandInServer:
+    """
+    Threaded HTTP server on a free localhost port, answering from `routes`.
+
+    A route maps a path to a Response, a list of Responses (played in order,
+    the last one repeating) or a callable taking the request headers and
+    returning a Response. Unknown paths get a 404. Every request is counted
+    in `hits` and its headers are kept in `requests`.
+
+    Use as a context manager:
+
+        with StandInServer({"/page": Response(body="<html></html>")}) as site:
+            fetch_page(site.url("/page"))
+    """
+
+    def __init__(self, routes=None):
+        self.routes = dict(routes or {})
+        self.hits = Counter()
+        self.requests = []
+        self._lock = threading.Lock()
+        self._server = None
+        self._thread = None
+
+    def url(self, path):
+        host, port = self._server.server_address
+        return f"http://{host}:{port}{path}"
+
+    def _respond(self, path, headers):
+        with self._lock:
+            self.hits[path] += 1
+            self.requests.append((path, headers))
+            route = self.routes.get(path)
+            if isinstance(route, list):
+                return route[min(self.hits[path], len(route)) - 1]
+        if callable(route):
+            return route(headers)
+        return route or Response(404)
+
+    def __enter__(self):
+        site = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def do_GET(self):
+                response = site._respond(self.path, dict(self.headers))
+                if response.delay:
+                    time.sleep(response.delay)
+                data = response.body.encode("utf-8")
+                self.send_response(response.status)
+                self.send_header("Content-Type", "text/html; charset=utf-8")
+                for name, value in response.headers.items():
+                    self.send_header(name, value)
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def log_message(self, format, *args):
+                pass
+
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self._server.daemon_threads = True
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._server.shutdown()
+        self._server.server_close()
+        self._thread.join()
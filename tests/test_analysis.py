@@ -0,0 +1,71 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+import analysis.analyze as analyze
+import storage.database as db
+
+# Prices whose float sum depends on the order they are added in
+PRICES = [0.1, 0.2, 0.3, 51.77, 53.74, 50.1, 47.82, 23.88, 22.65, 33.34, 17.93, 0.125, 1.005, 57.25, 12.84, 45.17]
+
+ANALYSES = [
+    ("scraped_books", analyze.get_avg_price_by_rating),
+    ("scraped_books", analyze.get_top_5_expensive_books),
+    ("scraped_books", analyze.get_price_histogram),
+    ("scraped_books", analyze.get_book_kpis),
+    ("scraped_quotes", analyze.get_author_counts),
+    ("scraped_quotes", analyze.get_quote_kpis),
+]
+
+
+@pytest.fixture
+def library(temp_db):
+    db.init_db()
+    count = 60
+    books = pd.DataFrame({
+        "title": [f"book {i}" for i in range(count)],
+        "price": [PRICES[i % len(PRICES)] for i in range(count)],
+        "rating": [i % 5 + 1 for i in range(count)],
+        "availability": "In stock",
+    })
+    # Rating 2 has no prices at all; some books have no rating
+    books.loc[books["rating"] == 2, "price"] = np.nan
+    books.loc[[3, 17], "rating"] = None
+    quotes = pd.DataFrame({
+        "text": [f"quote {i}" for i in range(30)],
+        "author": [["Ann", "Bob", "Cy", "Dee", None][i % 5] for i in range(30)],
+        "tags": "",
+    })
+    quotes.loc[[7, 12], "author"] = "Eve"
+    db.save_data(books, "scraped_books", raise_errors=True)
+    db.save_data(quotes, "scraped_quotes", raise_errors=True)
+    return temp_db
+
+
+def assert_same(expected, actual):
+    if isinstance(expected, pd.DataFrame):
+        pd.testing.assert_frame_equal(actual, expected, check_exact=True)
+    else:
+        assert actual.keys() == expected.keys()
+        for key, value in expected.items():
+            assert actual[key] == value or (np.isnan(actual[key]) and np.isnan(value)), key
+
+
+@pytest.mark.parametrize("table, analysis", ANALYSES)
+def test_pandas_sql_and_summary_paths_agree(library, table, analysis):
+    expected = analysis(db.load_data(table))
+
+    assert_same(expected, analysis(table))
+    assert_same(expected, analysis(None))
+
+
+def test_average_prices_are_exact_and_keep_unpriced_ratings(library):
+    avg = analyze.get_avg_price_by_rating(db.load_data("scraped_books"))
+
+    assert sorted(avg["rating"]) == [1, 2, 3, 4, 5]
+    assert avg["rating"].iloc[-1] == 2 and np.isnan(avg["price"].iloc[-1])
+    assert avg["price"][:-1].is_monotonic_decreasing
+    books = db.load_data("scraped_books")
+    for rating, price in zip(avg["rating"][:-1], avg["price"][:-1]):
+        cents = np.floor(books.loc[books["rating"] == rating, "price"] * 100 + 0.5)
+        assert price == cents.sum() / len(cents) / 100
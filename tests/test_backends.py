@@ -0,0 +1,37 @@
+import pytest
+
+from scraper.backends import available_backends, get_backend, SoupBackend
+from tests.bench_backends import KINDS, load_fixture
+
+BLANK_PAGES = ("", " \n\t", "<!-- maintenance -->", "<html><body></body></html>")
+
+
+@pytest.mark.parametrize("kind", KINDS)
+@pytest.mark.parametrize("name", available_backends())
+def test_backends_match_the_reference(name, kind):
+    html = load_fixture(kind)
+    expected = getattr(get_backend(SoupBackend.name), f"extract_{kind}")(html)
+
+    assert expected
+    assert getattr(get_backend(name), f"extract_{kind}")(html) == expected
+
+
+@pytest.mark.parametrize("html", BLANK_PAGES)
+@pytest.mark.parametrize("kind", KINDS)
+@pytest.mark.parametrize("name", available_backends())
+def test_pages_without_records_return_none(name, kind, html):
+    assert getattr(get_backend(name), f"extract_{kind}")(html) is None
+
+
+@pytest.mark.parametrize("name", available_backends())
+def test_first_records(name):
+    backend = get_backend(name)
+
+    assert backend.extract_books(load_fixture("books"))[0] == ("Sharp Objects (Vol. 0)", "Â£25.16", "1", "Out of stock")
+    assert backend.extract_quotes(load_fixture("quotes"))[1][1:] == ("Marilyn Monroe", "humor")
+    assert backend.extract_jobs(load_fixture("jobs"))[0] == ("Legal executive", "Vasquez-Davidson", "Stewartbury, AA", "2021-04-01")
+
+
+def test_unknown_backend():
+    with pytest.raises(ValueError):
+        get_backend("regex")
@@ -0,0 +1,62 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from scraper.cleaner import (
+    clean_currency, clean_currency_series, clean_rating, clean_rating_series,
+    normalize_text, normalize_text_series,
+    clean_books_df, reference_clean_books_df,
+)
+
+PRICES = ["Â£51.77", "£", ".5", "5.", "£1,234.50", "1.2.3", "Unknown", "", np.nan, None, 12, 3.5]
+RATINGS = ["1", "5", "3.0", 3.5, 7, 0, -1, "Unknown", "nan", "", np.nan, None, 4]
+# No inner whitespace runs: the reference only strips the ends
+TEXTS = ["  Title ", "\tTab\n", "plain", "", np.nan, None]
+
+
+def as_list(series):
+    return [None if pd.isna(value) else value for value in series.astype(object)]
+
+
+@pytest.mark.parametrize("dtype", [object, "category"])
+def test_clean_currency_series_matches_the_reference(dtype):
+    prices = pd.Series(PRICES, dtype=dtype)
+
+    assert as_list(clean_currency_series(prices)) == [clean_currency(value) for value in prices]
+
+
+def test_clean_currency_series_of_numbers():
+    prices = pd.Series([51.77, np.nan, 0.5])
+
+    assert as_list(clean_currency_series(prices)) == [clean_currency(value) for value in prices] == [51.77, 0.0, 0.5]
+
+
+@pytest.mark.parametrize("dtype", [object, "category"])
+def test_clean_rating_series_matches_the_reference(dtype):
+    ratings = pd.Series(RATINGS, dtype=dtype)
+
+    cleaned = clean_rating_series(ratings)
+
+    assert str(cleaned.dtype) == "Int8"
+    assert as_list(cleaned) == [clean_rating(value) for value in ratings]
+
+
+def test_normalize_text_series_matches_the_reference():
+    texts = pd.Series(TEXTS, dtype=object)
+
+    assert as_list(normalize_text_series(texts)) == [normalize_text(value) for value in texts]
+    assert normalize_text_series(pd.Series(["a \n  b"]))[0] == "a b"
+
+
+def test_clean_books_df_matches_the_reference():
+    raw = pd.DataFrame({
+        "title": TEXTS * 2,
+        "price": PRICES,
+        "rating": RATINGS[:12],
+        "availability": "In stock",
+    })
+
+    cleaned, reference = clean_books_df(raw), reference_clean_books_df(raw)
+
+    for column in reference.columns:
+        assert as_list(cleaned[column]) == as_list(reference[column]), column
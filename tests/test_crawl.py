@@ -0,0 +1,142 @@
+import pytest
+
+import storage.database as db
+from pipeline.crawl import CrawlState
+from pipeline.runner import run_pipeline
+from scraper.backends import get_backend
+from scraper.fetcher import AsyncFetchEngine
+from scraper.parser import iter_books
+from scraper.workers import ParsePool
+from tests.server import Response
+
+PER_PAGE = 2
+
+
+def book_page(page):
+    return "".join(
+        f'''<article class="product_pod"><p class="star-rating Three"></p>
+        <h3><a title="Book {page}-{i}">Book</a></h3><p class="price_color">Â£1{page}.0{i}</p>
+        <p class="instock availability">In stock</p></article>'''
+        for i in range(PER_PAGE)
+    )
+
+
+def serve(site, pages):
+    for page in pages:
+        site.routes[f"/page-{page}.html"] = Response(body=book_page(page))
+
+
+class CountingBackend:
+    """The default backend, counting the pages it is asked to extract."""
+
+    def __init__(self):
+        self.backend = get_backend()
+        self.pages = 0
+
+    def extract_books(self, html):
+        self.pages += 1
+        return self.backend.extract_books(html)
+
+
+@pytest.fixture
+def crawl(site, temp_db, fetcher):
+    """Runs incremental books crawls of site's /page-N.html, one page requested at a time."""
+    db.init_db()
+
+    def run(limit=100, stop_after=2, backend=None):
+        engine = AsyncFetchEngine(window=1, per_host=1, rate=None, fetcher=fetcher)
+        return run_pipeline(
+            "books", limit=limit, base_url=site.url("/page-{}.html"), incremental=True,
+            stop_after=stop_after, engine=engine, backend=backend or get_backend(),
+        )
+    return run
+
+
+def page_hash(site, page):
+    return db.get_page_hash(site.url("/page-{}.html").format(page))
+
+
+def test_unchanged_pages_are_skipped_before_parsing(site, crawl):
+    serve(site, range(1, 4))
+    assert crawl()["items_parsed"] == 3 * PER_PAGE
+
+    backend = CountingBackend()
+    stats = crawl(stop_after=5, backend=backend)
+
+    assert backend.pages == 0
+    assert (stats["pages"], stats["pages_skipped"], stats["items_parsed"]) == (0, 3, 0)
+
+
+def test_crawl_stops_once_exhausted(site, crawl):
+    serve(site, range(1, 9))
+    crawl()
+    site.hits.clear()
+
+    stats = crawl(stop_after=2)
+
+    assert stats["items_parsed"] == 0
+    # Two unchanged pages end the crawl; it then only rechecks the high-water page
+    assert not any(site.hits[f"/page-{page}.html"] for page in range(4, 8))
+    assert site.hits["/page-8.html"] == 1
+
+
+def test_crawl_resumes_from_the_high_water_mark(site, crawl):
+    serve(site, range(1, 6))
+    crawl()
+    serve(site, range(6, 8))
+    site.hits.clear()
+
+    stats = crawl(stop_after=2)
+
+    assert stats["items_parsed"] == 2 * PER_PAGE
+    assert not any(site.hits[f"/page-{page}.html"] for page in range(3, 5))
+    titles = set(db.load_data("scraped_books")["title"])
+    assert {"Book 6-0", "Book 7-1"} <= titles
+    assert db.get_high_water(site.url("/page-{}.html")) == 7
+
+
+def test_page_truncated_by_the_limit_is_not_committed(site, crawl):
+    serve(site, range(1, 4))
+
+    assert crawl(limit=PER_PAGE + 1)["items_parsed"] == PER_PAGE + 1
+    assert page_hash(site, 1) is not None
+    assert page_hash(site, 2) is None
+
+    stats = crawl(stop_after=5)
+    assert stats["pages_skipped"] == 1
+    assert stats["items_parsed"] == 2 * PER_PAGE
+
+
+def test_pages_are_committed_once_their_records_are_consumed(site, temp_db, fetcher):
+    db.init_db()
+    serve(site, range(1, 3))
+    state = CrawlState("scraped_books", site.url("/page-{}.html"))
+    engine = AsyncFetchEngine(window=1, per_host=1, rate=None, fetcher=fetcher)
+    chunks = iter_books(limit=100, base_url=site.url("/page-{}.html"), engine=engine, crawl=state)
+
+    next(chunks)
+    assert page_hash(site, 1) is None
+    next(chunks)
+    assert page_hash(site, 1) is not None
+    assert page_hash(site, 2) is None
+    chunks.close()
+    assert page_hash(site, 2) is None
+
+
+def test_parse_workers_use_the_given_backend(site, temp_db, fetcher, monkeypatch):
+    db.init_db()
+    serve(site, range(1, 3))
+    pools = []
+
+    class RecordingPool(ParsePool):
+        def __init__(self, *args, **kwargs):
+            super().__init__(*args, **kwargs)
+            pools.append(self)
+
+    monkeypatch.setattr("pipeline.runner.ParsePool", RecordingPool)
+    engine = AsyncFetchEngine(window=1, per_host=1, rate=None, fetcher=fetcher)
+    stats = run_pipeline("books", limit=100, base_url=site.url("/page-{}.html"), engine=engine,
+                         backend=get_backend("html.parser"), parse_workers=1)
+
+    assert [pool.backend_name for pool in pools] == ["html.parser"]
+    assert stats["items_parsed"] == 2 * PER_PAGE
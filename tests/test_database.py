@@ -0,0 +1,222 @@
+import sqlite3
+import threading
+
+import pandas as pd
+import pytest
+
+import storage.database as db
+from scraper.cleaner import clean_books_df
+
+TABLES = ("scraped_books", "scraped_quotes", "scraped_jobs")
+
+
+def rows(path, sql):
+    conn = sqlite3.connect(f"file:{path}?mode=ro", uri=True)
+    try:
+        return conn.execute(sql).fetchall()
+    finally:
+        conn.close()
+
+
+def test_init_db_creates_an_empty_database(temp_db):
+    db.init_db()
+
+    for table in TABLES:
+        assert db.load_data(table).empty
+    assert rows(temp_db, "PRAGMA journal_mode") == [("wal",)]
+
+
+def test_readers_share_pooled_connections_across_threads(temp_db):
+    db.init_db()
+    borrowed = []
+
+    def read():
+        with db.read_db() as conn:
+            borrowed.append(conn)
+            assert conn.execute("SELECT COUNT(*) FROM scraped_books").fetchone() == (1,)
+
+    db.save_data(pd.DataFrame({"title": ["a"], "price": [1.0], "rating": [3]}), "scraped_books", raise_errors=True)
+    # Like Streamlit reruns: every read on a new thread
+    for _ in range(3):
+        thread = threading.Thread(target=read)
+        thread.start()
+        thread.join()
+
+    assert all(conn is borrowed[0] for conn in borrowed)
+    with db.read_db() as conn, pytest.raises(sqlite3.OperationalError):
+        conn.execute("DELETE FROM scraped_books")
+
+
+def test_save_data_cleans_raw_ratings(temp_db):
+    db.init_db()
+    raw = pd.DataFrame({
+        "title": ["a", "b", "c", "d"],
+        "price": [1.0, 2.0, 3.0, 4.0],
+        "rating": [3.5, "4", "Unknown", 7],
+        "availability": "In stock",
+    })
+
+    assert db.save_data(raw, "scraped_books", raise_errors=True)["inserted"] == 4
+    assert rows(temp_db, "SELECT title, rating FROM scraped_books ORDER BY id") == [
+        ("a", None), ("b", 4), ("c", None), ("d", None),
+    ]
+
+
+def test_concurrent_saves_count_only_their_own_rows(temp_db):
+    db.init_db()
+    writers, batches, size = 4, 25, 20
+    results, errors = [], []
+
+    def write(writer):
+        try:
+            for batch in range(batches):
+                titles = [f"w{writer} b{batch} r{i}" for i in range(size)]
+                frame = pd.DataFrame({"title": titles, "price": 1.0, "rating": 3, "availability": "In stock"})
+                results.append(db.save_data(frame, "scraped_books", raise_errors=True))
+        except Exception as e:
+            errors.append(e)
+        finally:
+            db.close_db()
+
+    threads = [threading.Thread(target=write, args=(w,)) for w in range(writers)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert errors == []
+    assert all(r == {"inserted": size, "updated": 0, "unchanged": 0} for r in results)
+    assert rows(temp_db, "SELECT COUNT(*) FROM scraped_books") == [(writers * batches * size,)]
+
+
+def assert_summaries_match(path):
+    cents = db.PRICE_CENTS_SQL.format("price")
+    assert rows(path, "SELECT rating, n, price_n, price_cents, title_n FROM book_rating_stats ORDER BY rating") == rows(
+        path,
+        f"SELECT IFNULL(rating, 0) AS r, COUNT(*), COUNT(price), IFNULL(SUM({cents}), 0), COUNT(title) "
+        f"FROM scraped_books GROUP BY r ORDER BY r",
+    )
+    assert rows(path, "SELECT author, missing, n, first_id FROM quote_author_stats ORDER BY author, missing") == rows(
+        path,
+        "SELECT IFNULL(author, '') AS a, author IS NULL AS m, COUNT(*), MIN(id) "
+        "FROM scraped_quotes GROUP BY a, m ORDER BY a, m",
+    )
+
+
+def test_summaries_follow_inserts_upserts_and_deletes(temp_db):
+    db.init_db()
+    books = pd.DataFrame({
+        "title": [f"book {i}" if i else None for i in range(30)],
+        "price": [10 + i * 0.37 if i % 7 else None for i in range(30)],
+        "rating": [i % 6 or None for i in range(30)],
+        "availability": "In stock",
+    })
+    quotes = pd.DataFrame({
+        "text": [f"quote {i}" for i in range(20)],
+        "author": [["Ann", "Bob", None, ""][i % 4] for i in range(20)],
+        "tags": "",
+    })
+    db.save_data(books, "scraped_books", raise_errors=True)
+    db.save_data(quotes, "scraped_quotes", raise_errors=True)
+    assert_summaries_match(temp_db)
+
+    # Content changes move rows between groups
+    books.loc[::3, "rating"] = 5
+    books.loc[1::4, "price"] = None
+    quotes.loc[:5, "author"] = ["Bob", None, "Cy", "Ann", "Ann", "Bob"]
+    assert db.save_data(books, "scraped_books", raise_errors=True)["updated"] > 0
+    assert db.save_data(quotes, "scraped_quotes", raise_errors=True)["updated"] > 0
+    assert_summaries_match(temp_db)
+
+    # Deleting an author's first quote moves its first_id on
+    conn = sqlite3.connect(temp_db)
+    with conn:
+        conn.execute("DELETE FROM scraped_books WHERE id % 3 = 0")
+        conn.execute("DELETE FROM scraped_quotes WHERE id IN (1, 2, 5)")
+    conn.close()
+    assert_summaries_match(temp_db)
+
+    db.clear_data("scraped_books")
+    assert rows(temp_db, "SELECT COUNT(*) FROM book_rating_stats") == [(0,)]
+
+
+def test_migration_retypes_the_bundled_ratings(bundled_db):
+    before = rows(bundled_db, "SELECT title, price, rating FROM scraped_books ORDER BY id")
+    assert {type(rating) for _, _, rating in before} == {str}
+
+    db.init_db()
+
+    assert {row[1]: row[2] for row in rows(bundled_db, "PRAGMA table_info(scraped_books)")}["rating"] == "INTEGER"
+    after = rows(bundled_db, "SELECT title, price, rating FROM scraped_books ORDER BY id")
+    assert after == [(title, price, int(rating)) for title, price, rating in before]
+    assert str(db.load_data("scraped_books")["rating"].dtype) == "Int8"
+    assert_summaries_match(bundled_db)
+
+
+def test_init_db_hashes_the_bundled_rows(bundled_db):
+    before = {table: rows(bundled_db, f"SELECT COUNT(*) FROM {table}")[0][0] for table in TABLES}
+
+    db.init_db()
+
+    for table in TABLES:
+        assert {"key_hash", "content_hash"} <= {row[1] for row in rows(bundled_db, f"PRAGMA table_info({table})")}
+        assert rows(bundled_db, f"SELECT COUNT(*) FROM {table} WHERE key_hash IS NULL OR content_hash IS NULL") == [(0,)]
+        count = rows(bundled_db, f"SELECT COUNT(*) FROM {table}")[0][0]
+        assert rows(bundled_db, f"SELECT COUNT(DISTINCT key_hash) FROM {table}") == [(count,)]
+        assert 0 < count <= before[table]
+
+
+def test_migrated_rows_are_recognised_on_resave(bundled_db):
+    db.init_db()
+    loaded = db.load_data("scraped_books")
+    raw = pd.DataFrame({
+        "title": loaded["title"].astype(object),
+        "price": [f"£{price:.2f}" for price in loaded["price"]],
+        "rating": loaded["rating"].astype(str),
+        "availability": loaded["availability"].astype(object),
+    })
+
+    assert db.save_data(clean_books_df(raw), "scraped_books") == {"inserted": 0, "updated": 0, "unchanged": len(loaded)}
+
+
+def test_content_changes_are_kept_in_the_history(temp_db):
+    db.init_db()
+    books = pd.DataFrame({"title": ["a", "b"], "price": [10.0, 20.0], "rating": [3, 4], "availability": "In stock"})
+    db.save_data(books, "scraped_books", raise_errors=True)
+    db.save_data(books, "scraped_books", raise_errors=True)
+    assert db.load_history("scraped_books").empty
+
+    books.loc[0, "price"] = 11.0
+    db.save_data(books, "scraped_books", raise_errors=True)
+    books.loc[0, "availability"] = "Out of stock"
+    db.save_data(books, "scraped_books", raise_errors=True)
+
+    history = db.load_history("scraped_books")
+    assert history["record_id"].tolist() == [1, 1]
+    assert history["price"].tolist() == [11.0, 10.0]
+    assert history["availability"].astype(object).tolist() == ["In stock", "In stock"]
+    assert db.load_history("scraped_books", record_id=2).empty
+
+
+def test_history_trigger_follows_the_column_set(temp_db, monkeypatch):
+    db.init_db()
+    # As left by a version whose table had no availability column
+    conn = sqlite3.connect(temp_db)
+    with conn:
+        conn.execute("DROP TRIGGER scraped_books_history_au")
+        conn.execute("""
+            CREATE TRIGGER scraped_books_history_au AFTER UPDATE OF content_hash ON scraped_books
+            WHEN old.content_hash IS NOT new.content_hash AND old.content_hash IS NOT NULL BEGIN
+                INSERT INTO record_history (collection, record_id, key_hash, old_values)
+                VALUES ('scraped_books', old.id, old.key_hash, json_object('title', old.title, 'price', old.price));
+            END
+        """)
+    conn.close()
+    monkeypatch.setattr(db, "_initialized", set())
+
+    db.init_db()
+
+    books = pd.DataFrame({"title": ["a"], "price": [10.0], "rating": [3], "availability": "In stock"})
+    db.save_data(books, "scraped_books", raise_errors=True)
+    db.save_data(books.assign(availability="Out of stock"), "scraped_books", raise_errors=True)
+    assert db.load_history("scraped_books")["availability"].astype(object).tolist() == ["In stock"]
@@ -0,0 +1,49 @@
+from scraper.fetcher import AsyncFetchEngine, Fetcher
+from tests.server import Response
+
+PAGES = 8
+
+
+def add_pages(site, count, delay=lambda page: 0.0):
+    for page in range(1, count + 1):
+        site.routes[f"/page-{page}.html"] = Response(body=f"<html>page {page}</html>", delay=delay(page))
+
+
+def engine(window=4):
+    return AsyncFetchEngine(window=window, per_host=window, rate=None, fetcher=Fetcher(retries=1))
+
+
+def test_pages_come_back_in_order(site):
+    # Earlier pages answer last, so completion order is the reverse of page order
+    add_pages(site, PAGES, delay=lambda page: 0.02 * (PAGES - page))
+
+    with engine().pages(site.url("/page-{}.html"), max_pages=PAGES) as pages:
+        results = list(pages)
+
+    assert [page for page, _ in results] == list(range(1, PAGES + 1))
+    assert [html for _, html in results] == [f"<html>page {page}</html>" for page in range(1, PAGES + 1)]
+
+
+def test_start_and_max_pages(site):
+    add_pages(site, PAGES)
+
+    with engine().pages(site.url("/page-{}.html"), start=3, max_pages=2) as pages:
+        assert [page for page, _ in pages] == [3, 4]
+    assert set(site.hits) == {"/page-3.html", "/page-4.html"}
+
+
+def test_stopping_early_bounds_the_requests(site):
+    add_pages(site, 5)
+    window = 3
+
+    seen = []
+    with engine(window).pages(site.url("/page-{}.html")) as pages:
+        for page, html in pages:
+            if html is None:
+                break
+            seen.append(page)
+
+    assert seen == [1, 2, 3, 4, 5]
+    # Page 6 is the empty one; at most `window` pages were requested past it
+    assert sum(site.hits.values()) <= 6 + window
+    assert all(path.startswith("/page-") for path in site.hits)
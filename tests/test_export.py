@@ -0,0 +1,60 @@
+import gzip
+import sqlite3
+
+import pandas as pd
+import pytest
+
+import storage.database as db
+
+BOOKS = pd.DataFrame({
+    "title": ['Plain', 'Comma, "quoted"', "Line\nbreak", "Pound £ and é", "No price"],
+    "price": [10.5, 1.0, 2.25, 99.99, None],
+    "rating": [1, 2, 3, 4, 5],
+    "availability": "In stock",
+})
+
+
+def stored(path):
+    """The table as export_data should write it: no id or hash columns, in id order."""
+    conn = sqlite3.connect(path)
+    try:
+        return pd.read_sql_query("SELECT title, price, rating, availability, scraped_at FROM scraped_books ORDER BY id", conn)
+    finally:
+        conn.close()
+
+
+def read_back(fmt, fileobj):
+    if fmt == "parquet":
+        return pd.read_parquet(fileobj)
+    if fmt == "csv.gz":
+        fileobj = gzip.GzipFile(fileobj=fileobj, mode="rb")
+    return pd.read_csv(fileobj, keep_default_na=False, na_values=[""])
+
+
+@pytest.mark.parametrize("fmt", db.EXPORT_FORMATS)
+def test_export_round_trips(temp_db, fmt):
+    if fmt not in db.available_export_formats():
+        pytest.skip(f"{fmt} export needs an optional dependency")
+    db.init_db()
+    db.save_data(BOOKS, "scraped_books", raise_errors=True)
+
+    with db.export_file("scraped_books", fmt, chunk_size=2) as exported:
+        assert exported.tell() == 0
+        frame = read_back(fmt, exported)
+
+    pd.testing.assert_frame_equal(frame, stored(temp_db), check_dtype=False)
+
+
+def test_export_data_counts_rows_written(temp_db, tmp_path):
+    db.init_db()
+    db.save_data(BOOKS, "scraped_books", raise_errors=True)
+
+    with open(tmp_path / "books.csv", "wb") as out:
+        assert db.export_data("scraped_books", out, chunk_size=2) == len(BOOKS)
+
+
+def test_export_of_a_missing_table_fails(temp_db):
+    db.init_db()
+
+    with pytest.raises(ValueError):
+        db.export_file("no_such_table")
@@ -0,0 +1,232 @@
+from email.utils import format_datetime
+from datetime import datetime, timedelta, timezone
+
+import multiprocessing
+import os
+
+import pytest
+
+import storage.database as db
+from pipeline.runner import run_pipeline
+from scraper.fetcher import Fetcher, HTTPCache, _parse_retry_after
+from tests.server import Response
+
+JOBS_PAGE = "".join(
+    f'''<div class="card"><h2 class="title">Developer {i}</h2><h3 class="company">Co</h3>
+    <p class="location">Town</p><time datetime="2021-04-08">2021-04-08</time></div>'''
+    for i in range(2)
+)
+
+
+@pytest.fixture
+def sleeps(monkeypatch):
+    """Records the fetcher's backoff sleeps instead of waiting them out."""
+    delays = []
+    monkeypatch.setattr("scraper.fetcher.time.sleep", delays.append)
+    return delays
+
+
+def test_retries_transient_errors_honouring_retry_after(site, sleeps):
+    busy = Response(503, headers={"Retry-After": "2"})
+    site.routes["/flaky"] = [busy, busy, Response(body="<html>ok</html>")]
+
+    assert Fetcher(retries=3).fetch(site.url("/flaky")) == "<html>ok</html>"
+    assert site.hits["/flaky"] == 3
+    assert sleeps == [2.0, 2.0]
+
+
+def test_retry_after_is_capped_by_max_backoff(site, sleeps):
+    site.routes["/busy"] = [Response(429, headers={"Retry-After": "3600"}), Response(body="ok")]
+
+    assert Fetcher(retries=2, max_backoff=5.0).fetch(site.url("/busy")) == "ok"
+    assert sleeps == [5.0]
+
+
+def test_gives_up_after_the_last_attempt(site, sleeps):
+    site.routes["/down"] = Response(503)
+
+    assert Fetcher(retries=3, backoff=0.1).fetch(site.url("/down")) is None
+    assert site.hits["/down"] == 3
+    assert len(sleeps) == 2
+    assert all(0 <= delay <= 0.1 * 2 ** i for i, delay in enumerate(sleeps))
+
+
+def test_client_errors_are_not_retried(site, sleeps):
+    assert Fetcher(retries=3).fetch(site.url("/missing")) is None
+    assert site.hits["/missing"] == 1
+    assert sleeps == []
+
+
+def test_parse_retry_after():
+    assert _parse_retry_after("7") == 7.0
+    assert _parse_retry_after("-1") == 0.0
+    assert _parse_retry_after(None) is None
+    assert _parse_retry_after("soon") is None
+    later = datetime.now(timezone.utc) + timedelta(seconds=30)
+    assert 25 < _parse_retry_after(format_datetime(later, usegmt=True)) <= 30
+
+
+def test_not_modified_is_served_from_the_cache(site, tmp_path):
+    body = "<html>static</html>"
+
+    def static(headers):
+        if headers.get("If-None-Match") == '"v1"':
+            return Response(304, headers={"ETag": '"v1"'})
+        return Response(body=body, headers={"ETag": '"v1"'})
+
+    site.routes["/static"] = static
+    fetcher = Fetcher(cache=HTTPCache(str(tmp_path / "cache")))
+
+    assert fetcher.fetch(site.url("/static")) == body
+    assert fetcher.fetch(site.url("/static")) == body
+    fetcher.close()
+
+    assert site.hits["/static"] == 2
+    assert "If-None-Match" not in site.requests[0][1]
+    assert site.requests[1][1]["If-None-Match"] == '"v1"'
+
+
+def test_cache_survives_a_new_fetcher(site, tmp_path):
+    site.routes["/static"] = lambda headers: Response(
+        304 if headers.get("If-None-Match") else 200, body="<html>v1</html>", headers={"ETag": '"v1"'}
+    )
+    cache_dir = str(tmp_path / "cache")
+    first = Fetcher(cache=HTTPCache(cache_dir))
+    first.fetch(site.url("/static"))
+    first.close()
+
+    second = Fetcher(cache=HTTPCache(cache_dir))
+    assert second.fetch(site.url("/static")) == "<html>v1</html>"
+    second.close()
+    assert site.requests[-1][1]["If-None-Match"] == '"v1"'
+
+
+def test_fresh_entries_skip_the_request(site, tmp_path):
+    site.routes["/jobs/"] = Response(body="<html>jobs</html>")
+    fetcher = Fetcher(cache=HTTPCache(str(tmp_path / "cache"), ttl=60))
+
+    assert fetcher.fetch(site.url("/jobs/")) == fetcher.fetch(site.url("/jobs/")) == "<html>jobs</html>"
+    fetcher.close()
+    assert site.hits["/jobs/"] == 1
+
+
+
+def test_cache_index_is_written_in_batches(tmp_path):
+    cache_dir = tmp_path / "cache"
+    cache = HTTPCache(str(cache_dir), flush_every=3)
+
+    cache.store("http://site/1", "one")
+    cache.store("http://site/2", "two")
+    assert not (cache_dir / HTTPCache.INDEX_FILE).exists()
+
+    cache.store("http://site/3", "three")
+    assert set(HTTPCache(str(cache_dir))._index) == {"http://site/1", "http://site/2", "http://site/3"}
+
+    cache.read("http://site/1")
+    assert HTTPCache(str(cache_dir)).lookup("http://site/1")["last_used"] < cache.lookup("http://site/1")["last_used"]
+    cache.flush()
+    assert HTTPCache(str(cache_dir)).lookup("http://site/1") == cache.lookup("http://site/1")
+
+
+def test_cache_evicts_least_recently_used(tmp_path):
+    cache = HTTPCache(str(tmp_path / "cache"), max_bytes=10)
+
+    cache.store("http://site/a", "aaaa")
+    cache.store("http://site/b", "bbbb")
+    cache.read("http://site/a")
+    cache.store("http://site/c", "cccc")
+    cache.flush()
+
+    reopened = HTTPCache(str(tmp_path / "cache"))
+    assert set(reopened._index) == {"http://site/a", "http://site/c"}
+    assert reopened.read("http://site/b") is None
+    assert len(list((tmp_path / "cache").glob("*.html"))) == 2
+
+
+def test_run_pipeline_flushes_the_shared_cache(site, temp_db, tmp_path, monkeypatch):
+    db.init_db()
+    cache_dir = tmp_path / "cache"
+    shared = Fetcher(cache=HTTPCache(str(cache_dir)))
+    monkeypatch.setattr("scraper.fetcher._default_fetcher", shared)
+    site.routes["/jobs/"] = Response(body=JOBS_PAGE, headers={"ETag": '"jobs"'})
+
+    stats = run_pipeline("jobs", limit=10, base_url=site.url("/jobs/"))
+
+    assert stats["items_parsed"] == 2
+    assert HTTPCache(str(cache_dir)).lookup(site.url("/jobs/"))["etag"] == '"jobs"'
+
+
+def body_files(cache_dir):
+    return {name: os.path.getsize(os.path.join(cache_dir, name)) for name in os.listdir(cache_dir) if name.endswith(".html")}
+
+
+def test_caches_sharing_a_directory_merge_and_stay_bounded(tmp_path):
+    cache_dir = str(tmp_path / "cache")
+    first = HTTPCache(cache_dir, max_bytes=100, flush_every=1)
+    second = HTTPCache(cache_dir, max_bytes=100, flush_every=1)
+
+    for i in range(3):
+        first.store(f"http://site/first-{i}", "x" * 30)
+        second.store(f"http://site/second-{i}", "y" * 30)
+
+    index = HTTPCache(cache_dir)._index
+    bodies = body_files(cache_dir)
+    assert sum(bodies.values()) <= 100
+    assert {entry["file"] for entry in index.values()} == set(bodies)
+    assert {"http://site/first-2", "http://site/second-2"} <= set(index)
+
+
+def test_eviction_reclaims_orphaned_bodies(tmp_path):
+    cache_dir = tmp_path / "cache"
+    cache = HTTPCache(str(cache_dir), max_bytes=100)
+    cache.store("http://site/kept", "k" * 30)
+    # Left by a process that died before writing its index
+    orphan = cache_dir / "0123456789abcdef.html"
+    orphan.write_text("o" * 50)
+    os.utime(orphan, (1, 1))
+
+    cache.store("http://site/new", "n" * 30)
+    cache.store("http://site/newer", "n" * 30)
+    assert orphan.exists()
+    cache.flush()
+
+    assert not orphan.exists()
+    assert set(cache._index) == {"http://site/kept", "http://site/new", "http://site/newer"}
+
+
+def test_clear_removes_every_body(tmp_path):
+    cache_dir = tmp_path / "cache"
+    cache = HTTPCache(str(cache_dir))
+    cache.store("http://site/a", "aaaa")
+    (cache_dir / "0123456789abcdef.html").write_text("orphan")
+
+    cache.clear()
+
+    assert body_files(str(cache_dir)) == {}
+    assert HTTPCache(str(cache_dir))._index == {}
+
+
+def _store_pages(cache_dir, prefix):
+    cache = HTTPCache(cache_dir, max_bytes=1000, flush_every=3)
+    for i in range(40):
+        cache.store(f"http://site/{prefix}-{i}", prefix * 50)
+    cache.flush()
+
+
+def test_concurrent_processes_share_the_cache(tmp_path):
+    cache_dir = str(tmp_path / "cache")
+    context = multiprocessing.get_context("spawn")
+    workers = [context.Process(target=_store_pages, args=(cache_dir, prefix)) for prefix in "ab"]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+
+    index = HTTPCache(cache_dir)._index
+    bodies = body_files(cache_dir)
+    assert all(worker.exitcode == 0 for worker in workers)
+    assert sum(bodies.values()) <= 1000
+    assert {entry["file"] for entry in index.values()} == set(bodies)
+    # Full (20 bodies of 50 bytes); whichever process stored last kept its newest page
+    assert len(index) == 20
+    assert {"http://site/a-39", "http://site/b-39"} & set(index)
@@ -0,0 +1,82 @@
+import threading
+import time
+
+import storage.database as db
+from pipeline.jobs import JobManager
+from tests.bench_backends import load_fixture
+from tests.server import Response
+
+
+def wait_for(job_id, timeout=60):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        job = next(job for job in db.load_jobs(limit=0) if job["id"] == job_id)
+        if job["status"] in ("done", "failed"):
+            return job
+        time.sleep(0.05)
+    raise AssertionError(f"job {job_id} did not finish")
+
+
+def test_job_parses_on_a_process_pool(site, temp_db, fetcher):
+    db.init_db()
+    site.routes["/page-1.html"] = Response(body=load_fixture("books"))
+    manager = JobManager(workers=1, poll_interval=0.05).start()
+    try:
+        job_id = manager.submit("books", limit=20, base_url=site.url("/page-{}.html"), parse_workers=2)
+        job = wait_for(job_id)
+    finally:
+        manager.stop()
+
+    assert job["status"] == "done", job["error"]
+    assert job["items_parsed"] == 20
+    assert len(db.load_data("scraped_books")) == 20
+
+
+def test_concurrent_claimers_never_share_a_job(temp_db):
+    db.init_db()
+    jobs = {db.enqueue_job("books", {}) for _ in range(60)}
+    claimers = 4
+    start = threading.Barrier(claimers)
+    claimed, errors = [], []
+
+    def claim(owner):
+        try:
+            start.wait()
+            while (job := db.claim_job(owner)) is not None:
+                claimed.append(job["id"])
+        except Exception as e:
+            errors.append(e)
+        finally:
+            db.close_db()
+
+    threads = [threading.Thread(target=claim, args=(f"worker-{n}",)) for n in range(claimers)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert errors == []
+    assert sorted(claimed) == sorted(jobs)
+    assert {job["status"] for job in db.load_jobs(limit=0)} == {"running"}
+
+
+def test_failed_job_is_recorded_and_the_worker_carries_on(temp_db, monkeypatch):
+    db.init_db()
+
+    def run_pipeline(source, on_progress=None, **params):
+        if params["limit"] == 1:
+            raise RuntimeError("site is down")
+        return {"items_parsed": params["limit"]}
+
+    monkeypatch.setattr("pipeline.jobs.run_pipeline", run_pipeline)
+    manager = JobManager(workers=1, poll_interval=0.05).start()
+    try:
+        failing = manager.submit("books", limit=1)
+        passing = manager.submit("books", limit=5)
+        failed, done = wait_for(failing), wait_for(passing)
+    finally:
+        manager.stop()
+
+    assert (failed["status"], failed["error"]) == ("failed", "site is down")
+    assert failed["finished_at"] is not None
+    assert (done["status"], done["items_parsed"]) == ("done", 5)
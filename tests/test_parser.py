@@ -0,0 +1,35 @@
+import pandas as pd
+
+from scraper.backends import get_backend, BOOK_FIELDS
+from scraper.parser import BOOK_CATEGORICAL, ColumnBuffer, concat_chunks
+from tests.bench_backends import load_fixture
+
+
+def test_column_buffer_matches_a_plain_frame():
+    records = get_backend().extract_books(load_fixture("books"))
+    buffer = ColumnBuffer(BOOK_FIELDS, BOOK_CATEGORICAL)
+    buffer.extend(records)
+
+    frame = buffer.frame()
+
+    assert {str(frame[field].dtype) for field in BOOK_CATEGORICAL} == {"category"}
+    pd.testing.assert_frame_equal(frame.astype(object), pd.DataFrame(records, columns=BOOK_FIELDS).astype(object))
+
+
+def test_chunks_keep_their_codes_and_concatenate_as_categoricals():
+    buffer = ColumnBuffer(("title", "rating"), ("rating",))
+    buffer.extend([("a", "3"), ("b", None)])
+    first = buffer.flush()
+    buffer.extend([("c", "5"), ("d", "3")])
+    second = buffer.flush()
+
+    assert list(first["rating"].cat.categories) == ["3"]
+    assert list(second["rating"].cat.categories) == ["3", "5"]
+    assert list(second["rating"].cat.codes) == [1, 0]
+
+    frame = concat_chunks([first, second])
+
+    assert str(frame["rating"].dtype) == "category"
+    assert frame["title"].tolist() == ["a", "b", "c", "d"]
+    assert frame["rating"].astype(object).where(frame["rating"].notna(), None).tolist() == ["3", None, "5", "3"]
+    assert str(pd.concat([first, second])["rating"].dtype) != "category"
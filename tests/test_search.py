@@ -0,0 +1,125 @@
+import sqlite3
+
+import pandas as pd
+import pytest
+
+import storage.database as db
+
+QUOTES = pd.DataFrame({
+    "text": ["The world as we have created it", "A day without sunshine", "Try not to become a man of success"],
+    "author": ["Albert Einstein", "Steve Martin", "Albert Einstein"],
+    "tags": ["change,world", "humor,obvious", "adulthood,success"],
+})
+
+
+@pytest.fixture
+def quotes_db(temp_db):
+    db.init_db()
+    if not rows(temp_db, "SELECT name FROM sqlite_master WHERE name = 'scraped_quotes_fts'"):
+        pytest.skip("this SQLite build has no FTS5")
+    db.save_data(QUOTES, "scraped_quotes", raise_errors=True)
+    return temp_db
+
+
+def rows(path, sql, params=()):
+    conn = sqlite3.connect(path)
+    try:
+        return conn.execute(sql, params).fetchall()
+    finally:
+        conn.close()
+
+
+def execute(path, sql, params=()):
+    conn = sqlite3.connect(path)
+    with conn:
+        conn.execute(sql, params)
+    conn.close()
+
+
+def matches(path, terms):
+    """Texts of the quotes the FTS index matches, in id order."""
+    return [text for (text,) in rows(path, """
+        SELECT q.text FROM scraped_quotes_fts JOIN scraped_quotes AS q ON q.id = scraped_quotes_fts.rowid
+        WHERE scraped_quotes_fts MATCH ? ORDER BY q.id
+    """, (terms,))]
+
+
+def assert_index_in_sync(path):
+    # Raises SQLITE_CORRUPT_VTAB if the index differs from scraped_quotes
+    execute(path, "INSERT INTO scraped_quotes_fts(scraped_quotes_fts, rank) VALUES ('integrity-check', 1)")
+
+
+def test_fts_index_follows_inserts_updates_and_deletes(quotes_db):
+    assert_index_in_sync(quotes_db)
+    assert matches(quotes_db, "author : einstein") == [QUOTES.text[0], QUOTES.text[2]]
+
+    updated = QUOTES.copy()
+    updated.loc[0, "tags"] = "change,thinking"
+    assert db.save_data(updated, "scraped_quotes", raise_errors=True)["updated"] == 1
+    assert_index_in_sync(quotes_db)
+    assert matches(quotes_db, "tags : world") == []
+    assert matches(quotes_db, "tags : thinking") == [QUOTES.text[0]]
+
+    execute(quotes_db, "UPDATE scraped_quotes SET author = 'Anonymous' WHERE text = ?", (QUOTES.text[2],))
+    execute(quotes_db, "DELETE FROM scraped_quotes WHERE text = ?", (QUOTES.text[1],))
+    assert_index_in_sync(quotes_db)
+    assert matches(quotes_db, "author : einstein") == [QUOTES.text[0]]
+    assert matches(quotes_db, "sunshine") == []
+
+
+def test_text_filters_are_answered_from_fts(quotes_db):
+    query = {"author": {"$regex": "einst", "$options": "i"}, "text": {"$regex": "world"}}
+
+    report = db.query_data("scraped_quotes", query, explain=True)
+
+    assert "scraped_quotes_fts MATCH ?" in report["sql"]
+    assert "LIKE" not in report["sql"]
+    assert any("scraped_quotes_fts" in line for line in report["plan"])
+    assert report["rows"] == 1
+    assert list(db.query_data("scraped_quotes", query)["text"]) == [QUOTES.text[0]]
+
+
+def test_filters_on_unindexed_columns_keep_using_like(quotes_db):
+    report = db.query_data("scraped_quotes", {"scraped_at": {"$regex": "20"}}, explain=True)
+
+    assert "MATCH" not in report["sql"]
+    assert "t.scraped_at LIKE ?" in report["sql"]
+    assert report["rows"] == len(QUOTES)
+
+
+def tags(path):
+    return rows(path, """
+        SELECT q.text, t.position, t.tag FROM quote_tags AS t JOIN scraped_quotes AS q ON q.id = t.quote_id
+        ORDER BY q.id, t.position
+    """)
+
+
+def test_quote_tags_follow_inserts_updates_and_deletes(quotes_db):
+    first, second, third = QUOTES.text
+    assert tags(quotes_db) == [
+        (first, 0, "change"), (first, 1, "world"),
+        (second, 0, "humor"), (second, 1, "obvious"),
+        (third, 0, "adulthood"), (third, 1, "success"),
+    ]
+
+    updated = QUOTES.copy()
+    updated.loc[0, "tags"] = "thinking,change"
+    db.save_data(updated, "scraped_quotes", raise_errors=True)
+    execute(quotes_db, "DELETE FROM scraped_quotes WHERE text = ?", (second,))
+
+    assert tags(quotes_db) == [
+        (first, 0, "thinking"), (first, 1, "change"),
+        (third, 0, "adulthood"), (third, 1, "success"),
+    ]
+    assert list(db.get_tag_counts()["tag"]) == ["adulthood", "change", "success", "thinking"]
+
+
+def test_tag_equality_is_an_exact_lookup(quotes_db):
+    db.save_data(pd.DataFrame({"text": ["Lovely"], "author": ["Ann"], "tags": ["lovely"]}), "scraped_quotes", raise_errors=True)
+
+    report = db.query_data("scraped_quotes", {"tags": "World"}, explain=True)
+
+    assert "quote_tags WHERE tag = ?" in report["sql"]
+    assert any("idx_quote_tags_tag" in line for line in report["plan"])
+    assert list(db.query_data("scraped_quotes", {"tags": "World"})["text"]) == [QUOTES.text[0]]
+    assert db.query_data("scraped_quotes", {"tags": "love"}).empty